@@ -0,0 +1,372 @@
+import sys
+import json
+import time
+import tracemalloc
+import argparse
+import itertools
+import cv2
+import chess
+import numpy as np
+from ChessDetector.ChessboardDetector import ChessboardDetector
+
+# Detector stages timed by the benchmark, in pipeline order
+STAGES = ["preprocess_image", "detect_lines", "extract_grid", "extract_contours", "crop_sections",
+          "crop_rects", "determine_colors", "identify_pieces"]
+
+# Positions rendered by default: opening, middlegame, endgame
+DEFAULT_FENS = [
+    chess.STARTING_FEN,
+    "r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQK2R w KQkq - 1 5",
+    "8/5pk1/6p1/8/3R4/6P1/5PK1/8 w - - 0 40",
+]
+
+# Gray levels of the synthetic board. The piece colors are chosen so that each piece falls into the
+# threshold band the detector uses for it on a dark square (see ChessboardDetector.classify_squares).
+DARK_SQUARE = 150
+LIGHT_SQUARE = 200
+GRID_LINE = 60
+BACKGROUND = 90
+WHITE_PIECE = 90
+BLACK_PIECE = 117
+
+# Largest growth of the traced memory over the allocation measurement that still counts as flat
+ALLOCATION_SLACK = 64 * 1024
+
+def render_board(fen, height=1080, perspective=0.0, lighting=0.0, noise=0.0, seed=0):
+    """
+    Renders a synthetic camera frame of a chessboard position.
+
+    The board is drawn head-on with rank 1 at the top of the image and file a on the left, which is the
+    orientation of the detector output. The squares are separated by thin dark lines and the pieces are
+    discs in the middle of their squares.
+
+    Args:
+        fen (str): The position to render.
+        height (int, optional): Frame height in pixels; the frame is 16:9. Defaults to 1080.
+        perspective (float, optional): Random displacement of the board corners, as a fraction of the
+                                       board size. Defaults to 0.0 (head-on view).
+        lighting (float, optional): Strength of a horizontal lighting gradient, 0 for uniform light. Defaults to 0.0.
+        noise (float, optional): Standard deviation of the Gaussian sensor noise in gray levels. Defaults to 0.0.
+        seed (int, optional): Seed of the random perspective and noise. Defaults to 0.
+
+    Returns:
+        tuple: A tuple (frame, expected): the BGR frame and the expected (8, 8) detector output indexed
+               [file, rank], with 0 for an empty square, 1 for a black piece and 2 for a white piece.
+    """
+    rng = np.random.default_rng(seed)
+    board = chess.Board(fen)
+    width = height * 16 // 9
+
+    square = int(height * 0.92) // 8
+    board_size = 8 * square
+    canvas = np.full((board_size, board_size), DARK_SQUARE, np.uint8)
+    expected = np.zeros((8, 8), dtype=int)
+
+    for rank in range(8):
+        for file in range(8):
+            top, left = rank * square, file * square
+            if (rank + file) % 2 == 1:
+                canvas[top:top + square, left:left + square] = LIGHT_SQUARE
+            piece = board.piece_at(chess.square(file, rank))
+            if piece is not None:
+                expected[file, rank] = 2 if piece.color == chess.WHITE else 1
+                color = WHITE_PIECE if piece.color == chess.WHITE else BLACK_PIECE
+                cv2.circle(canvas, (left + square // 2, top + square // 2), square // 4, color, -1, cv2.LINE_AA)
+
+    thickness = max(1, square // 40)
+    for position in range(0, board_size + 1, square):
+        position = min(position, board_size - 1)
+        cv2.line(canvas, (position, 0), (position, board_size - 1), GRID_LINE, thickness)
+        cv2.line(canvas, (0, position), (board_size - 1, position), GRID_LINE, thickness)
+
+    # Place the board in the middle of the frame, with optional perspective
+    x0, y0 = (width - board_size) / 2, (height - board_size) / 2
+    source = np.float32([[0, 0], [board_size, 0], [board_size, board_size], [0, board_size]])
+    target = source + np.float32([x0, y0]) + rng.uniform(-1, 1, (4, 2)).astype(np.float32) * perspective * board_size
+    transform = cv2.getPerspectiveTransform(source, target)
+    frame = cv2.warpPerspective(canvas, transform, (width, height), flags=cv2.INTER_LINEAR,
+                                borderMode=cv2.BORDER_CONSTANT, borderValue=BACKGROUND).astype(np.float32)
+
+    if lighting:
+        frame *= np.linspace(1.0 - lighting, 1.0, width, dtype=np.float32)[None, :]
+    if noise:
+        frame += rng.normal(0.0, noise, frame.shape).astype(np.float32)
+
+    frame = np.clip(frame, 0, 255).astype(np.uint8)
+    return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR), expected
+
+def instrument(detector, timings):
+    """
+    Wraps the stage methods of a detector instance so that every call records its duration.
+
+    run_pipeline() calls the stages through self, so it picks up the wrappers and runs unchanged.
+
+    Args:
+        detector (ChessboardDetector): The detector to instrument.
+        timings (dict): Dictionary receiving a list of durations in seconds per stage name.
+    """
+    for name in STAGES:
+        method = getattr(detector, name)
+
+        def timed(*args, _method=method, _name=name, **kwargs):
+            start = time.perf_counter()
+            result = _method(*args, **kwargs)
+            timings.setdefault(_name, []).append(time.perf_counter() - start)
+            return result
+
+        setattr(detector, name, timed)
+
+def summarize(samples):
+    """
+    Computes latency percentiles of a list of durations.
+
+    Args:
+        samples (list): Durations in seconds.
+
+    Returns:
+        dict: p50, p95 and p99 latencies in milliseconds and the number of samples.
+    """
+    p50, p95, p99 = np.percentile(np.asarray(samples) * 1000.0, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99), "count": len(samples)}
+
+def run_benchmark(heights, perspectives, lightings, noises, fens=DEFAULT_FENS, iterations=5, pyramid_scale=1.0):
+    """
+    Runs the detector over every combination of the rendering parameters.
+
+    Every frame is processed twice: once cold by a fresh detector, so the whole grid search runs, and once
+    warm, reusing the geometry detected on the cold pass. Frames the detector fails on count as entirely
+    misclassified in the accuracy.
+
+    Args:
+        heights (list): Frame heights to render.
+        perspectives (list): Perspective strengths to render.
+        lightings (list): Lighting gradient strengths to render.
+        noises (list): Noise levels to render.
+        fens (list, optional): Positions to render. Defaults to DEFAULT_FENS.
+        iterations (int, optional): Frames per combination, each with its own random seed. Defaults to 5.
+        pyramid_scale (float, optional): PYRAMID_SCALE of the detector. Defaults to 1.0 (full resolution).
+
+    Returns:
+        dict: The report: the benchmark parameters, per stage latency percentiles, cold and warm pipeline latency and throughput,
+              detection rate and square classification accuracy.
+    """
+    timings = {}
+    cold, warm = [], []
+    detections = 0
+    correct_squares = 0
+    frames = 0
+
+    for height, perspective, lighting, noise, fen in itertools.product(heights, perspectives, lightings, noises, fens):
+        for seed in range(iterations):
+            frame, expected = render_board(fen, height, perspective, lighting, noise, seed)
+
+            frame_timings = {}
+            detector = ChessboardDetector()
+            detector.PYRAMID_SCALE = pyramid_scale
+            instrument(detector, frame_timings)
+
+            start = time.perf_counter()
+            detector.push_frame(frame)
+            status = detector.run_pipeline()
+            cold.append(time.perf_counter() - start)
+
+            # Stage latencies are those of the full detection; the warm pass only reports its total
+            for name, durations in frame_timings.items():
+                timings.setdefault(name, []).extend(durations)
+
+            frames += 1
+            if status == 4:
+                detections += 1
+                correct_squares += int((detector._detected == expected).sum())
+
+                start = time.perf_counter()
+                detector.push_frame(frame)
+                detector.run_pipeline()
+                warm.append(time.perf_counter() - start)
+
+    report = {
+        "parameters": {"heights": list(heights), "perspectives": list(perspectives), "lightings": list(lightings),
+                       "noises": list(noises), "fens": list(fens), "iterations": iterations},
+        "pyramid_scale": pyramid_scale,
+        "frames": frames,
+        "detection_rate": detections / frames,
+        "accuracy": correct_squares / (64 * frames),
+        "stages": {name: summarize(timings[name]) for name in STAGES if name in timings},
+        "run_pipeline_cold": summarize(cold),
+        "throughput_cold": len(cold) / sum(cold),
+    }
+    if warm:
+        report["run_pipeline_warm"] = summarize(warm)
+        report["throughput_warm"] = len(warm) / sum(warm)
+    return report
+
+def measure_allocations(height=1080, fens=DEFAULT_FENS, iterations=20, pyramid_scale=1.0, reuse_buffers=True):
+    """
+    Measures the memory allocated by the warm detector pipeline with tracemalloc.
+
+    The positions are rendered on the same board geometry and fed in turn, so every frame changes some
+    squares. After a warm-up round, the traced memory must stay flat: buffers allocated on every frame show
+    up in the per-frame peak, and buffers that are kept show up as growth.
+
+    Args:
+        height (int, optional): Frame height to render. Defaults to 1080.
+        fens (list, optional): Positions fed in turn. Defaults to DEFAULT_FENS.
+        iterations (int, optional): Measured frames. Defaults to 20.
+        pyramid_scale (float, optional): PYRAMID_SCALE of the detector. Defaults to 1.0 (full resolution).
+        reuse_buffers (bool, optional): REUSE_BUFFERS of the detector. Defaults to True.
+
+    Returns:
+        dict: The "growth" of the traced memory between the first and the last measured frame and the largest
+              "peak_per_frame" above the memory at the start of a frame, in bytes, and the number of "iterations".
+    """
+    frames = [render_board(fen, height)[0] for fen in fens]
+    detector = ChessboardDetector()
+    detector.PYRAMID_SCALE = pyramid_scale
+    detector.REUSE_BUFFERS = reuse_buffers
+    for frame in frames:  # Warm-up: grid detection and buffer allocation
+        detector.push_frame(frame)
+        detector.run_pipeline()
+
+    tracemalloc.start()
+    try:
+        current, peaks = [], []
+        for index in range(iterations):
+            detector.push_frame(frames[index % len(frames)])
+            tracemalloc.reset_peak()
+            start = tracemalloc.get_traced_memory()[0]
+            detector.run_pipeline()
+            end, peak = tracemalloc.get_traced_memory()
+            current.append(end)
+            peaks.append(peak - start)
+    finally:
+        tracemalloc.stop()
+
+    return {"growth": current[-1] - current[0], "peak_per_frame": max(peaks), "iterations": iterations}
+
+def check_allocations(allocations, slack=ALLOCATION_SLACK):
+    """
+    Checks that the memory of the pooled pipeline stays flat across frames.
+
+    Args:
+        allocations (dict): Measurements of measure_allocations() by mode ("pooled", "unpooled").
+        slack (int, optional): Largest growth in bytes that still counts as flat. Defaults to ALLOCATION_SLACK.
+
+    Returns:
+        list: Human readable descriptions of the failures, empty if there is none.
+    """
+    failures = []
+    pooled = allocations["pooled"]
+    if pooled["growth"] > slack:
+        failures.append(f"allocations: memory grew by {pooled['growth']} bytes over {pooled['iterations']} frames")
+    if "unpooled" in allocations and pooled["peak_per_frame"] > allocations["unpooled"]["peak_per_frame"]:
+        failures.append("allocations: the pooled pipeline allocates more per frame than the unpooled one")
+    return failures
+
+def compare(report, baseline, tolerance):
+    """
+    Compares a report with a stored baseline.
+
+    The detector settings (pyramid_scale) may differ from the baseline, so a faster configuration can be
+    checked against the accuracy of the full-resolution path.
+
+    Args:
+        report (dict): The report of run_benchmark().
+        baseline (dict): A report stored earlier.
+        tolerance (float): Allowed relative slowdown of the p50 latencies, e.g. 0.2 for 20 percent.
+
+    Returns:
+        list: Human readable descriptions of the regressions, empty if there is none.
+    """
+    if report["parameters"] != baseline.get("parameters"):
+        return ["the baseline was recorded with different benchmark parameters"]
+
+    regressions = []
+
+    timed = dict(report["stages"], run_pipeline_cold=report["run_pipeline_cold"])
+    reference = dict(baseline["stages"], run_pipeline_cold=baseline["run_pipeline_cold"])
+    if "run_pipeline_warm" in report and "run_pipeline_warm" in baseline:
+        timed["run_pipeline_warm"] = report["run_pipeline_warm"]
+        reference["run_pipeline_warm"] = baseline["run_pipeline_warm"]
+
+    for name, stats in timed.items():
+        if name in reference and stats["p50"] > reference[name]["p50"] * (1.0 + tolerance):
+            regressions.append(f"{name}: p50 {stats['p50']:.2f} ms > baseline {reference[name]['p50']:.2f} ms")
+
+    for key in ("detection_rate", "accuracy"):
+        if report[key] < baseline[key] - 1e-9:
+            regressions.append(f"{key}: {report[key]:.4f} < baseline {baseline[key]:.4f}")
+
+    if "allocations" in report and "allocations" in baseline:
+        peak = report["allocations"]["pooled"]["peak_per_frame"]
+        reference = baseline["allocations"]["pooled"]["peak_per_frame"]
+        if peak > reference * (1.0 + tolerance) + ALLOCATION_SLACK:
+            regressions.append(f"allocations: {peak} bytes per frame > baseline {reference} bytes")
+
+    return regressions
+
+def print_report(report):
+    """
+    Prints a report as a table.
+
+    Args:
+        report (dict): The report of run_benchmark().
+    """
+    print(f"{'stage':<20}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'calls':>8}")
+    rows = list(report["stages"].items()) + [("run_pipeline_cold", report["run_pipeline_cold"])]
+    if "run_pipeline_warm" in report:
+        rows.append(("run_pipeline_warm", report["run_pipeline_warm"]))
+    for name, stats in rows:
+        print(f"{name:<20}{stats['p50']:>10.2f}{stats['p95']:>10.2f}{stats['p99']:>10.2f}{stats['count']:>8}")
+    print(f"throughput: {report['throughput_cold']:.1f} frames/s cold, {report.get('throughput_warm', 0.0):.1f} frames/s warm")
+    print(f"pyramid scale: {report['pyramid_scale']}, frames: {report['frames']}, detection rate: {report['detection_rate']:.3f}, accuracy: {report['accuracy']:.3f}")
+    for mode, stats in report.get("allocations", {}).items():
+        print(f"allocations ({mode}): {stats['peak_per_frame'] / 1024:.0f} KiB peak per frame, "
+              f"{stats['growth'] / 1024:.0f} KiB growth over {stats['iterations']} frames")
+
+def main():
+    """
+    Command line entry point. Exits with status 1 if the report regresses from the baseline or the memory
+    of the pooled pipeline does not stay flat.
+    """
+    parser = argparse.ArgumentParser(description="Synthetic-board benchmark of the chessboard detector")
+    parser.add_argument("--heights", type=int, nargs="+", default=[1080, 1440], help="frame heights in pixels")
+    parser.add_argument("--perspectives", type=float, nargs="+", default=[0.0, 0.005], help="corner displacement fractions")
+    parser.add_argument("--lightings", type=float, nargs="+", default=[0.0, 0.2], help="lighting gradient strengths")
+    parser.add_argument("--noises", type=float, nargs="+", default=[0.0, 2.0], help="noise standard deviations")
+    parser.add_argument("--iterations", type=int, default=3, help="frames per parameter combination")
+    parser.add_argument("--pyramid-scale", type=float, default=1.0, help="detector PYRAMID_SCALE")
+    parser.add_argument("--baseline", help="compare with this stored report")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative p50 slowdown")
+    parser.add_argument("--save", help="store the report as a new baseline")
+    parser.add_argument("--allocation-frames", type=int, default=20, help="frames of the allocation measurement, 0 to skip it")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.heights, args.perspectives, args.lightings, args.noises, iterations=args.iterations,
+                           pyramid_scale=args.pyramid_scale)
+    failures = []
+    if args.allocation_frames > 0:
+        report["allocations"] = {
+            mode: measure_allocations(args.heights[0], iterations=args.allocation_frames,
+                                      pyramid_scale=args.pyramid_scale, reuse_buffers=mode == "pooled")
+            for mode in ("pooled", "unpooled")
+        }
+        failures = check_allocations(report["allocations"])
+    print_report(report)
+    for failure in failures:
+        print(f"FAILED {failure}")
+
+    if args.save:
+        with open(args.save, "w") as baseline_file:
+            json.dump(report, baseline_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(report, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import numpy as np
+
+class BufferPool:
+    """
+    This class keeps named NumPy buffers that are reused from one frame to the next.
+
+    A buffer is only allocated again when the requested shape or dtype changes, e.g. when the camera
+    resolution or the board geometry changes. OpenCV functions write into the buffers through their dst
+    arguments, so a steady stream of frames of the same size allocates no new image memory.
+
+    Attributes:
+        _buffers (dict): Buffers by name.
+        _allocations (int): Number of buffers allocated so far.
+
+    Methods:
+        __init__(self): Initializes an empty pool.
+        get(self, name, shape, dtype): Returns the buffer of the given name, shape and dtype.
+        clear(self): Drops every buffer.
+        get_allocations(self): Returns the number of buffers allocated so far.
+        nbytes(self): Returns the total size of the buffers in bytes.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty pool.
+        """
+        self._buffers = {}
+        self._allocations = 0
+
+    def get(self, name, shape, dtype=np.uint8):
+        """
+        Returns the buffer of the given name, allocating it if it does not exist or its shape or dtype changed.
+
+        The content of a returned buffer is undefined; the caller overwrites it.
+
+        Args:
+            name (str): Name of the buffer.
+            shape (tuple): Shape of the buffer.
+            dtype (numpy.dtype, optional): Data type of the buffer. Defaults to numpy.uint8.
+
+        Returns:
+            numpy.ndarray: The C-contiguous buffer.
+        """
+        shape = tuple(int(size) for size in shape)
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self._buffers[name] = buffer
+            self._allocations += 1
+        return buffer
+
+    def clear(self):
+        """
+        Drops every buffer.
+        """
+        self._buffers.clear()
+
+    def get_allocations(self):
+        """
+        Returns the number of buffers allocated so far.
+
+        Returns:
+            int: The number of allocations.
+        """
+        return self._allocations
+
+    def nbytes(self):
+        """
+        Returns the total size of the buffers in bytes.
+
+        Returns:
+            int: The size of the pool.
+        """
+        return sum(buffer.nbytes for buffer in self._buffers.values())
@@ -1,5 +1,12 @@
 import cv2
 import numpy as np
+from ChessDetector.BufferPool import BufferPool
+from Utilities.Metrics import metrics
+
+# Structuring elements of the mask cleaning, created once
+SQUARE_KERNEL = np.ones((3, 3), np.uint8)
+HORIZONTAL_KERNEL = np.ones((1, 3), np.uint8)
+VERTICAL_KERNEL = np.ones((3, 1), np.uint8)
 
 class ChessboardDetector:
     def __init__(self, squares_per_row=8):
@@ -17,10 +24,50 @@ class ChessboardDetector:
             BLACK_S_BLACK_P (int): Threshold value for black square with black piece.
             WHITE_S_BLACK_P (int): Threshold value for white square with black piece.
             _cleaned_mask (numpy.ndarray): Preprocessed image mask after cleaning.
+            _lines (numpy.ndarray): Detected Hough lines as (rho, theta) pairs.
             _marked_image (numpy.ndarray): Image with detected lines marked in green.
             _contour_canvas (numpy.ndarray): Image with contours drawn on a blank canvas.
             _detected (numpy.ndarray): 2D array representing the detected chessboard state.
+            _probabilities (numpy.ndarray): 3D array with the probability of each square state
+                                            (empty, black piece, white piece), indexed like _detected.
             _status (int): Unique ID for the current state of available data.
+            MIN_LINE_GAP (int): Hough lines closer than this many pixels are merged before building the grid.
+            MAX_SKEW (float): Maximum deviation in radians from orthogonality between the two line families.
+            GRID_MARGIN (int): Pixels trimmed from each side of a square computed from the line intersections.
+            GRID_TOLERANCE (float): Largest distance, as a fraction of the square size, between a grid line and
+                                    its expected position in an evenly spaced grid.
+            PROBABILITY_SOFTNESS (float): Width, in gray levels, of the transition around each threshold
+                                          when converting the thresholds into probabilities.
+            CROP_SIZE (int): Side length of the central crop of each square used to find the piece.
+            BLUR_SIZE (int): Size of the Gaussian kernel applied to the central crops.
+            DRIFT_TOLERANCE (float): Mean absolute gray level difference of a corner landmark above which
+                                     the cached board geometry is considered stale.
+            LANDMARK_SIZE (int): Side length in pixels of the landmark patches around the board corners.
+            PYRAMID_SCALE (float): Scale of the downscaled image the lines are searched on (e.g. 0.25), 1.0 to
+                                   search the full-resolution image. The squares are always cropped at full resolution.
+            HOUGH_THRESHOLD (int): Hough accumulator threshold at full resolution, scaled with PYRAMID_SCALE.
+            INCREMENTAL (bool): Reuse the blurred minimum of the squares whose fingerprint did not change.
+            FINGERPRINT_SIZE (int): Number of cells per side of the downsampled fingerprint of a square.
+            FINGERPRINT_TOLERANCE (float): Largest gray level change of a fingerprint cell for which a square
+                                           keeps its previous statistics.
+            FULL_SCAN_INTERVAL (int): With candidate squares set, every FULL_SCAN_INTERVAL-th classification
+                                      recomputes all squares as a consistency check; 0 disables the periodic scan.
+            _candidates (numpy.ndarray): Boolean mask of the squares that can change in the current position,
+                                         indexed by square (a1 = 0, h8 = 63), None to inspect every square.
+            _full_scan (bool): True when the next classification must recompute all squares.
+            _scans_since_full (int): Classifications since the last full scan.
+            REUSE_BUFFERS (bool): Write the intermediate images into the buffers of _buffers instead of allocating
+                                  new arrays for every frame.
+            DEBUG_CANVASES (bool): Draw the contour canvas during the contour based grid extraction; otherwise
+                                   display_images() builds the debug canvases on request.
+            _buffers (BufferPool): Intermediate image buffers, reused while the frame size and geometry stay the same.
+            _board_gray (tuple): Grayscale board region and its integral image for the current frame, built once per frame.
+            _fingerprints (numpy.ndarray): Fingerprint of each square when its statistics were last computed.
+            _thresholds (numpy.ndarray): Last blurred minimum of each square, reused for unchanged squares.
+            _square_counts (dict): Number of squares "classified" and "skipped" by identify_pieces() so far.
+            _square_rects (numpy.ndarray): Cached (x, y, w, h) rectangle of each square, in pipeline order.
+            _geometry_shape (tuple): Shape of the frame the cached geometry was detected on.
+            _landmarks (list): Gray patches around the four outer board corners, used for the drift check.
         """
         self._image = None
         self._squares_per_row = squares_per_row
@@ -29,10 +76,40 @@ class ChessboardDetector:
         self.BLACK_S_BLACK_P = 18
         self.WHITE_S_BLACK_P = 100
         self._cleaned_mask = None
+        self._lines = None
         self._marked_image = None
         self._contour_canvas = None
         self._detected = None
+        self._probabilities = None
         self._status = 0
+        self.MIN_LINE_GAP = 10
+        self.MAX_SKEW = np.pi / 9
+        self.GRID_MARGIN = 5
+        self.GRID_TOLERANCE = 0.15
+        self.PROBABILITY_SOFTNESS = 4.0
+        self.CROP_SIZE = 100
+        self.BLUR_SIZE = 31
+        self.DRIFT_TOLERANCE = 12.0
+        self.LANDMARK_SIZE = 24
+        self.PYRAMID_SCALE = 1.0
+        self.HOUGH_THRESHOLD = 600
+        self.INCREMENTAL = True
+        self.FINGERPRINT_SIZE = 4
+        self.FINGERPRINT_TOLERANCE = 6.0
+        self.FULL_SCAN_INTERVAL = 10
+        self._candidates = None
+        self._full_scan = True
+        self._scans_since_full = 0
+        self.REUSE_BUFFERS = True
+        self.DEBUG_CANVASES = False
+        self._buffers = BufferPool()
+        self._board_gray = None
+        self._fingerprints = None
+        self._thresholds = None
+        self._square_counts = {"classified": 0, "skipped": 0}
+        self._square_rects = None
+        self._geometry_shape = None
+        self._landmarks = None
 
     def read_image(self, image_path):
         """
@@ -60,52 +137,252 @@ class ChessboardDetector:
         Args:
             image_path (str): Path to the input image.
         """
+        image, _ = self.read_image(image_path)
+        self.push_frame(image)
+
+    def push_frame(self, frame):
+        """
+        Pushes a new in-memory frame to the detector for processing.
+
+        The buffer is used as-is, without copying, so the caller must not modify it
+        while the pipeline is running.
+
+        Args:
+            frame (numpy.ndarray): BGR frame, as returned by cv2.VideoCapture.read(). None marks a failed capture.
+        """
         self._cleaned_mask = None
+        self._lines = None
         self._marked_image = None
         self._contour_canvas = None
         self._detected = None
+        self._probabilities = None
+        self._board_gray = None
+
+        self._image = frame
+        self._status = -1 if frame is None else 0
+
+    def _buffer(self, name, shape, dtype=np.uint8):
+        """
+        Returns an output buffer for an intermediate image: the pooled one with REUSE_BUFFERS set, a new one otherwise.
 
-        self._image, self._status = self.read_image(image_path)
+        Args:
+            name (str): Name of the buffer in the pool.
+            shape (tuple): Shape of the buffer.
+            dtype (numpy.dtype, optional): Data type of the buffer. Defaults to numpy.uint8.
 
+        Returns:
+            numpy.ndarray: The buffer, with undefined content.
+        """
+        if self.REUSE_BUFFERS:
+            return self._buffers.get(name, shape, dtype)
+        return np.empty(shape, dtype=dtype)
+
+    @metrics.timed("detector.preprocess_image")
     def preprocess_image(self):
         """
         Preprocesses the input image by converting to grayscale, applying adaptive thresholding,
         and performing erosion and dilation to clean up the mask.
+
+        With REUSE_BUFFERS set, every intermediate image and the cleaned mask live in pooled buffers that the
+        next frame overwrites.
+
+        With a PYRAMID_SCALE below 1, the mask is built from a downscaled copy of the image, and cleaned with
+        thin horizontal and vertical openings instead of the square erosion and dilation.
         """
         if self._status == -1:
             return
-        image_gray = cv2.cvtColor(self._image, cv2.COLOR_BGR2GRAY)  # Convert to grayscale
+        height, width = self._image.shape[:2]
+        # Convert to grayscale
+        image_gray = cv2.cvtColor(self._image, cv2.COLOR_BGR2GRAY, dst=self._buffer("gray", (height, width)))
+        if self.PYRAMID_SCALE < 1.0:
+            # Search the grid on a pyramid level; only the square crops need full resolution
+            height, width = int(round(height * self.PYRAMID_SCALE)), int(round(width * self.PYRAMID_SCALE))
+            image_gray = cv2.resize(image_gray, (width, height), dst=self._buffer("pyramid", (height, width)),
+                                    fx=self.PYRAMID_SCALE, fy=self.PYRAMID_SCALE, interpolation=cv2.INTER_AREA)
         # Apply adaptive thresholding
-        thresholded = cv2.adaptiveThreshold(image_gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 11, 2)
-        kernel = np.ones((3, 3), np.uint8)  # Create a 3x3 kernel
-        self._cleaned_mask = cv2.erode(thresholded, kernel, iterations=1)  # Perform erosion
-        self._cleaned_mask = cv2.dilate(self._cleaned_mask, kernel, iterations=1)  # Perform dilation
+        thresholded = cv2.adaptiveThreshold(image_gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 11, 2,
+                                            dst=self._buffer("thresholded", (height, width)))
+        if self.PYRAMID_SCALE < 1.0:
+            # A square opening would erase the thinned grid lines: keep pixels on horizontal or vertical runs instead
+            horizontal = cv2.morphologyEx(thresholded, cv2.MORPH_OPEN, HORIZONTAL_KERNEL, dst=self._buffer("horizontal", (height, width)))
+            vertical = cv2.morphologyEx(thresholded, cv2.MORPH_OPEN, VERTICAL_KERNEL, dst=self._buffer("vertical", (height, width)))
+            self._cleaned_mask = cv2.bitwise_or(horizontal, vertical, dst=self._buffer("mask", (height, width)))
+        else:
+            eroded = cv2.erode(thresholded, SQUARE_KERNEL, dst=self._buffer("eroded", (height, width)), iterations=1)  # Perform erosion
+            self._cleaned_mask = cv2.dilate(eroded, SQUARE_KERNEL, dst=self._buffer("mask", (height, width)), iterations=1)  # Perform dilation
         self._status = 1  # Update status to 1
 
+    @metrics.timed("detector.detect_lines")
     def detect_lines(self):
         """
-        Detects lines in the preprocessed image using the Hough Line Transform and draws
-        the detected lines on a copy of the original image in green color.
+        Detects lines in the preprocessed image using the Hough Line Transform.
+
+        The lines are kept as (rho, theta) pairs in _lines; draw_lines() renders them only when needed.
+        On a downscaled mask the accumulator threshold shrinks with the line lengths, and the lines are
+        scaled back to full-resolution coordinates (a uniform scaling only changes rho).
         """
         if self._status > 0:
-            self._marked_image = self._image.copy()  # Create a copy of the original image
-            lines = cv2.HoughLines(self._cleaned_mask, 1, np.pi / 180, threshold=600)  # Detect lines using Hough Line Transform
+            scale = min(self.PYRAMID_SCALE, 1.0)
+            threshold = max(1, int(round(self.HOUGH_THRESHOLD * scale)))
+            lines = cv2.HoughLines(self._cleaned_mask, 1, np.pi / 180, threshold=threshold)  # Detect lines using Hough Line Transform
             if lines is not None:
-                for rho, theta in lines[:, 0]:  # Loop through detected lines
-                    a = np.cos(theta)
-                    b = np.sin(theta)
-                    x0 = a * rho
-                    y0 = b * rho
-                    x1 = int(x0 + 2000 * (-b))
-                    y1 = int(y0 + 2000 * (a))
-                    x2 = int(x0 - 2000 * (-b))
-                    y2 = int(y0 - 2000 * (a))
-                    cv2.line(self._marked_image, (x1, y1), (x2, y2), (0, 255, 0), 2)  # Draw line on the marked image
-                self._status = 2  # Update status to 2 if marked image is available
+                self._lines = lines[:, 0]
+                if scale < 1.0:
+                    self._lines[:, 0] /= scale
+                self._status = 2  # Update status to 2 if lines are available
             else:
-                self._marked_image = None
+                self._lines = None
                 self._status = -2
 
+    def draw_lines(self):
+        """
+        Draws the detected lines on a copy of the original image in green color.
+
+        Only the contour based grid extraction and display_images() need the marked image.
+        """
+        if self._status > 1 and self._lines is not None:
+            self._marked_image = self._buffer("marked", self._image.shape)
+            np.copyto(self._marked_image, self._image)  # Copy the original image
+            for rho, theta in self._lines:  # Loop through detected lines
+                a = np.cos(theta)
+                b = np.sin(theta)
+                x0 = a * rho
+                y0 = b * rho
+                x1 = int(x0 + 2000 * (-b))
+                y1 = int(y0 + 2000 * (a))
+                x2 = int(x0 - 2000 * (-b))
+                y2 = int(y0 - 2000 * (a))
+                cv2.line(self._marked_image, (x1, y1), (x2, y2), (0, 255, 0), 2)  # Draw line on the marked image
+
+    def _line_family(self, rhos, thetas, vertical, middle):
+        """
+        Collapses one family of roughly parallel lines into squares_per_row + 1 evenly spaced grid lines.
+
+        Lines are sorted by where they cross the middle of the image and neighbours closer than MIN_LINE_GAP
+        are merged. The grid is the widest evenly spaced sequence of squares_per_row + 1 lines: every pair
+        of lines is tried as the outer board edges, and kept if a line lies within GRID_TOLERANCE of
+        the spacing at each expected position. Extra lines (piece edges, diagonals) do not disturb the fit.
+
+        Args:
+            rhos (numpy.ndarray): Distances of the lines from the origin.
+            thetas (numpy.ndarray): Angles of the line normals, normalized to a continuous range.
+            vertical (bool): True for the family of vertical lines, False for the horizontal one.
+            middle (float): Middle of the image along the direction of the lines.
+
+        Returns:
+            numpy.ndarray: (squares_per_row + 1, 2) array of (rho, theta) pairs in image order, or None.
+        """
+        # Position where each line crosses the middle of the image
+        if vertical:
+            position = (rhos - middle * np.sin(thetas)) / np.cos(thetas)
+        else:
+            position = (rhos - middle * np.cos(thetas)) / np.sin(thetas)
+
+        order = np.argsort(position)
+        position, rhos, thetas = position[order], rhos[order], thetas[order]
+
+        if len(position) < 2:
+            return None
+        group = np.concatenate([[0], np.cumsum(np.diff(position) >= self.MIN_LINE_GAP)])
+        counts = np.bincount(group)
+        position = np.bincount(group, position) / counts
+        rhos = np.bincount(group, rhos) / counts
+        thetas = np.bincount(group, thetas) / counts
+
+        needed = self._squares_per_row + 1
+        if len(position) < needed:
+            return None
+
+        # Candidate outer edges: every pair of lines, with the expected positions of the lines in between
+        first, last = np.triu_indices(len(position), k=needed - 1)
+        spacing = (position[last] - position[first]) / (needed - 1)
+        expected = position[first, None] + spacing[:, None] * np.arange(needed)
+        # The positions are sorted, so the nearest line is one of the two around the insertion point
+        right = np.clip(np.searchsorted(position, expected), 1, len(position) - 1)
+        left = right - 1
+        left_distance = np.abs(expected - position[left])
+        right_distance = np.abs(position[right] - expected)
+        nearest = np.where(left_distance <= right_distance, left, right)
+        distance = np.minimum(left_distance, right_distance)
+        fits = (distance <= self.GRID_TOLERANCE * spacing[:, None]).all(axis=1)
+        if not fits.any():
+            return None
+
+        # The widest fitting sequence is the board; narrower ones are patterns inside it
+        best = np.flatnonzero(fits)[np.argmax(spacing[fits])]
+        lines = nearest[best]
+        return np.stack([rhos[lines], thetas[lines]], axis=1)
+
+    @metrics.timed("detector.extract_grid")
+    def extract_grid(self):
+        """
+        Computes the square rectangles analytically from the detected Hough lines.
+
+        The (rho, theta) pairs are split into two roughly orthogonal families, each family is collapsed to
+        squares_per_row + 1 lines, and the square corners are the intersections of the two families.
+        Each square is the rectangle inscribed in its four corners, shrunk by GRID_MARGIN pixels.
+
+        Returns:
+            list: A list of cropped sections from the chessboard, or an empty list if the lines
+                  do not form a complete grid.
+        """
+        if self._status < 2 or self._lines is None:
+            return []
+
+        rhos = self._lines[:, 0].astype(np.float64)
+        thetas = self._lines[:, 1].astype(np.float64)
+
+        # Lines whose normal is closer to the x axis are the vertical family. Normals pointing
+        # past pi / 2 are flipped so that every family has a continuous angle range.
+        vertical = np.abs(np.cos(thetas)) >= np.abs(np.sin(thetas))
+        flipped = vertical & (thetas > np.pi / 2)
+        rhos = np.where(flipped, -rhos, rhos)
+        thetas = np.where(flipped, thetas - np.pi, thetas)
+
+        # Drop lines far off the direction of their family, e.g. diagonals along rows of pieces
+        keep = np.ones_like(vertical)
+        for family in (vertical, ~vertical):
+            if family.any():
+                keep &= ~family | (np.abs(thetas - np.median(thetas[family])) <= self.MAX_SKEW / 2)
+        rhos, thetas, vertical = rhos[keep], thetas[keep], vertical[keep]
+
+        if vertical.sum() < 2 or (~vertical).sum() < 2:
+            return []
+        if abs(abs(np.median(thetas[~vertical]) - np.median(thetas[vertical])) - np.pi / 2) > self.MAX_SKEW:
+            return []
+
+        height, width = self._image.shape[:2]
+        columns = self._line_family(rhos[vertical], thetas[vertical], True, height / 2)
+        rows = self._line_family(rhos[~vertical], thetas[~vertical], False, width / 2)
+        if columns is None or rows is None:
+            return []
+
+        # Intersect every row line with every column line
+        r1, c1, s1 = rows[:, None, 0], np.cos(rows[:, None, 1]), np.sin(rows[:, None, 1])
+        r2, c2, s2 = columns[None, :, 0], np.cos(columns[None, :, 1]), np.sin(columns[None, :, 1])
+        determinant = c1 * s2 - s1 * c2
+        corners_x = (r1 * s2 - r2 * s1) / determinant
+        corners_y = (c1 * r2 - c2 * r1) / determinant
+
+        # Rectangle inscribed in the four corners of each square, row by row from the top left
+        left = np.maximum(corners_x[:-1, :-1], corners_x[1:, :-1]) + self.GRID_MARGIN
+        right = np.minimum(corners_x[:-1, 1:], corners_x[1:, 1:]) - self.GRID_MARGIN
+        top = np.maximum(corners_y[:-1, :-1], corners_y[:-1, 1:]) + self.GRID_MARGIN
+        bottom = np.minimum(corners_y[1:, :-1], corners_y[1:, 1:]) - self.GRID_MARGIN
+
+        rects = np.stack([left, top, right - left, bottom - top], axis=-1).reshape(-1, 4)
+        if not np.isfinite(rects).all():
+            return []
+        rects = np.round(rects).astype(int)
+        if (rects[:, 2] <= 0).any() or (rects[:, 3] <= 0).any() or (rects[:, :2] < 0).any() \
+                or (rects[:, 0] + rects[:, 2] > width).any() or (rects[:, 1] + rects[:, 3] > height).any():
+            return []
+
+        self._square_rects = rects
+        self._status = 3
+        return self.crop_rects()
+
+    @metrics.timed("detector.extract_contours")
     def extract_contours(self):
         """
         Extracts contours from the marked image containing the detected lines.
@@ -115,19 +392,20 @@ class ChessboardDetector:
         """
         if self._status > 1 and self._marked_image is not None:
             thresh = cv2.inRange(self._marked_image, np.array([0, 254, 0]), np.array([0, 255, 0]))  # Threshold for green lines
-            kernel = np.ones((3, 3), np.uint8)
-            cleaned_lines_mask = cv2.erode(thresh, kernel, iterations=5)  # Erode the mask
-            cleaned_lines_mask = cv2.dilate(thresh, kernel, iterations=5)  # Dilate the mask
+            cleaned_lines_mask = cv2.erode(thresh, SQUARE_KERNEL, iterations=5)  # Erode the mask
+            cleaned_lines_mask = cv2.dilate(thresh, SQUARE_KERNEL, iterations=5)  # Dilate the mask
             edges = cv2.Canny(cleaned_lines_mask, 50, 150)  # Apply Canny edge detection
-            dilated_edges = cv2.dilate(edges, kernel, iterations=1)  # Dilate the edges
+            dilated_edges = cv2.dilate(edges, SQUARE_KERNEL, iterations=1)  # Dilate the edges
             contours, _ = cv2.findContours(dilated_edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)  # Find contours
-            self._contour_canvas = np.zeros_like(self._marked_image)  # Create a blank canvas
-            cv2.drawContours(self._contour_canvas, contours, -1, (0, 255, 0), 2)  # Draw contours on the canvas
+            if self.DEBUG_CANVASES:
+                self._contour_canvas = np.zeros_like(self._marked_image)  # Create a blank canvas
+                cv2.drawContours(self._contour_canvas, contours, -1, (0, 255, 0), 2)  # Draw contours on the canvas
 
             return contours
         else:
             return []
 
+    @metrics.timed("detector.crop_sections")
     def crop_sections(self, contours):
         """
         Crops the sections of the chessboard based on the detected contours.
@@ -139,20 +417,137 @@ class ChessboardDetector:
             list: A list of cropped sections from the chessboard.
         """
         if self._status > 1 and contours:
-            cropped_sections = []
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)  # Get the bounding rectangle for each contour
-                section = self._marked_image[y:y+h, x:x+w].copy()  # Crop the section from the marked image
-                cropped_sections.append(section)
-
-            average_section_size = sum(section.shape[0] * section.shape[1] for section in cropped_sections) / len(cropped_sections)  # Calculate the average section size
-            cropped_sections = [section for section in cropped_sections if (section.shape[0] * section.shape[1]) >= (0.7 * average_section_size)]  # Filter out small sections
-            cropped_sections.reverse()  # Reverse the order of the cropped sections
+            rects = [cv2.boundingRect(contour) for contour in contours]  # Get the bounding rectangle for each contour
+
+            average_section_size = sum(w * h for _, _, w, h in rects) / len(rects)  # Calculate the average section size
+            rects = [rect for rect in rects if (rect[2] * rect[3]) >= (0.7 * average_section_size)]  # Filter out small sections
+            rects.reverse()  # Reverse the order of the cropped sections
+            if len(rects) < 2:
+                return []  # determine_colors() needs two squares
+
+            self._square_rects = np.array(rects, dtype=int).reshape(-1, 4)
             self._status = 3
-            return cropped_sections
+            return self.crop_rects()
         else:
             return []
 
+    def crop_rects(self):
+        """
+        Crops the sections of the chessboard at the square rectangles of the current geometry.
+
+        Sections are cropped from the original image, so the lines drawn by detect_lines never leak into them.
+        With REUSE_BUFFERS set the sections are views into the frame instead of copies.
+
+        Returns:
+            list: A list of cropped sections from the chessboard.
+        """
+        if self.REUSE_BUFFERS:
+            return [self._image[y:y+h, x:x+w] for x, y, w, h in self._square_rects]
+        return [self._image[y:y+h, x:x+w].copy() for x, y, w, h in self._square_rects]
+
+    def _corner_patches(self, image):
+        """
+        Extracts gray patches centered on the four outer corners of the board described by the current geometry.
+
+        Args:
+            image (numpy.ndarray): The BGR image to sample.
+
+        Returns:
+            list: Four grayscale patches (float32), clipped to the image borders.
+        """
+        x0 = self._square_rects[:, 0].min()
+        y0 = self._square_rects[:, 1].min()
+        x1 = (self._square_rects[:, 0] + self._square_rects[:, 2]).max()
+        y1 = (self._square_rects[:, 1] + self._square_rects[:, 3]).max()
+        half = self.LANDMARK_SIZE // 2
+        height, width = image.shape[:2]
+
+        patches = []
+        for cx, cy in ((x0, y0), (x1, y0), (x0, y1), (x1, y1)):
+            left, right = max(cx - half, 0), min(cx + half, width)
+            top, bottom = max(cy - half, 0), min(cy + half, height)
+            patch = cv2.cvtColor(image[top:bottom, left:right], cv2.COLOR_BGR2GRAY)
+            patches.append(patch.astype(np.float32))
+        return patches
+
+    def store_geometry(self):
+        """
+        Caches the current square rectangles, together with the corner landmarks of the current image,
+        so that later frames can skip the grid detection.
+
+        Only a complete grid of squares_per_row * squares_per_row squares is cached.
+        """
+        if self._square_rects is None or len(self._square_rects) != self._squares_per_row ** 2:
+            self._geometry_shape = None
+            self._landmarks = None
+            return
+        self._geometry_shape = self._image.shape
+        self._landmarks = self._corner_patches(self._image)
+
+    def invalidate_geometry(self):
+        """
+        Drops the cached board geometry, forcing the next run_pipeline() to detect the grid again.
+        """
+        self._square_rects = None
+        self._geometry_shape = None
+        self._landmarks = None
+        self._fingerprints = None
+        self._thresholds = None
+
+    def geometry_valid(self):
+        """
+        Checks whether the cached board geometry still applies to the current image.
+
+        The check compares the corner landmarks of the current image with the ones stored at calibration time,
+        which costs four tiny patches instead of a full grid detection.
+
+        Returns:
+            bool: True if the cached geometry can be reused, False if the board or camera has moved.
+        """
+        if self._landmarks is None or self._image is None or self._image.shape != self._geometry_shape:
+            return False
+
+        for reference, patch in zip(self._landmarks, self._corner_patches(self._image)):
+            if np.mean(np.abs(patch - reference)) > self.DRIFT_TOLERANCE:
+                return False
+        return True
+
+    def get_calibration(self):
+        """
+        Returns what the detector learned about the board, to be saved and restored with set_calibration().
+
+        Only the geometry is learned: the piece thresholds are fixed attributes, and the square colors and
+        the blurred square minima are measured again on every frame.
+
+        Returns:
+            dict: The cached "square_rects", "geometry_shape" and "landmarks".
+        """
+        return {
+            "square_rects": self._square_rects,
+            "geometry_shape": self._geometry_shape,
+            "landmarks": self._landmarks,
+        }
+
+    def set_calibration(self, calibration):
+        """
+        Restores a calibration returned by get_calibration(), e.g. when resuming a game after a restart.
+
+        The restored geometry goes through the usual drift check on the next frame, and the next
+        classification is a full scan, since the square fingerprints are not part of the calibration.
+
+        Args:
+            calibration (dict): The calibration; an incomplete geometry is ignored.
+        """
+        self.invalidate_geometry()
+        rects = calibration.get("square_rects")
+        landmarks = calibration.get("landmarks")
+        if rects is None or len(rects) != self._squares_per_row ** 2 or not landmarks or calibration.get("geometry_shape") is None:
+            return
+        self._square_rects = np.asarray(rects, dtype=int).reshape(-1, 4)
+        self._geometry_shape = tuple(calibration["geometry_shape"])
+        self._landmarks = [np.asarray(landmark, dtype=np.float32) for landmark in landmarks]
+        self.request_full_scan()
+
     def determine_colors(self, cropped_sections):
         """
         Determines the colors representing black and white squares based on the cropped sections.
@@ -170,94 +565,364 @@ class ChessboardDetector:
             white = min(color1, color2)  # Assign the lower intensity to white
             return black, white
 
-    def identify_pieces(self, cropped_sections, black, white):
+    def _board_region(self, count):
         """
-        Identifies the pieces on the chessboard and draws them on a canvas.
+        Returns the grayscale board region of the current frame and its integral image.
+
+        Both are built once per frame and shared by square_fingerprints() and square_statistics().
 
         Args:
-            cropped_sections (list): A list of cropped sections from the chessboard.
+            count (int): Number of squares of the current geometry the region has to cover.
+
+        Returns:
+            tuple: (gray, integral, xs, ys, widths, heights), with the square rectangles relative to the region.
+        """
+        if self._board_gray is None or self._board_gray[0] != count:
+            rects = self._square_rects[:count]
+
+            # Convert only the board region to grayscale
+            x0, y0 = rects[:, 0].min(), rects[:, 1].min()
+            x1, y1 = (rects[:, 0] + rects[:, 2]).max(), (rects[:, 1] + rects[:, 3]).max()
+            gray = cv2.cvtColor(self._image[y0:y1, x0:x1], cv2.COLOR_BGR2GRAY, dst=self._buffer("board_gray", (y1 - y0, x1 - x0)))
+            integral = cv2.integral(gray, sum=self._buffer("integral", (y1 - y0 + 1, x1 - x0 + 1), np.float64), sdepth=cv2.CV_64F)
+            self._board_gray = (count, gray, integral, rects[:, 0] - x0, rects[:, 1] - y0, rects[:, 2], rects[:, 3])
+        return self._board_gray[1:]
+
+    def square_fingerprints(self, count=None):
+        """
+        Computes a small downsampled fingerprint of every square in one vectorized pass.
+
+        Each square is split into FINGERPRINT_SIZE x FINGERPRINT_SIZE cells whose mean gray levels are
+        read from the integral image of the board region.
+
+        Args:
+            count (int, optional): Number of squares of the current geometry to process. Defaults to all of them.
+
+        Returns:
+            numpy.ndarray: (count, FINGERPRINT_SIZE, FINGERPRINT_SIZE) array of cell means.
+        """
+        count = len(self._square_rects) if count is None else count
+        _, integral, xs, ys, widths, heights = self._board_region(count)
+
+        # Cell edges of every square, rounded down to whole pixels
+        steps = np.arange(self.FINGERPRINT_SIZE + 1)
+        cols = xs[:, None] + widths[:, None] * steps // self.FINGERPRINT_SIZE
+        rows = ys[:, None] + heights[:, None] * steps // self.FINGERPRINT_SIZE
+        corners = integral[rows[:, :, None], cols[:, None, :]]
+        sums = corners[:, 1:, 1:] - corners[:, :-1, 1:] - corners[:, 1:, :-1] + corners[:, :-1, :-1]
+        areas = np.diff(rows, axis=1)[:, :, None] * np.diff(cols, axis=1)[:, None, :]
+        return sums / areas
+
+    def square_statistics(self, count=None, squares=None):
+        """
+        Computes the per-square statistics used for piece identification for all squares at once.
+
+        The board region is converted to grayscale once. The average intensity of every square is read from
+        an integral image, and the central crop of every square is gathered into a canonical stack of
+        fixed-size tiles, padded the way cv2.GaussianBlur pads a single crop, so one blur call over the stacked
+        tiles reproduces the per-square blurs exactly. The tiles and the blur output are written into
+        pooled buffers.
+
+        Args:
+            count (int, optional): Number of squares of the current geometry to process. Defaults to all of them.
+            squares (numpy.ndarray, optional): Indices of the squares whose blurred minimum is needed.
+                                               Defaults to all of them.
+
+        Returns:
+            tuple: A tuple (avg_intensity, threshold_value) of 1D arrays holding, for each square, the average
+                   intensity of the whole square and the minimum of its blurred central crop (NaN for the
+                   squares left out).
+        """
+        count = len(self._square_rects) if count is None else count
+        gray, integral, xs, ys, widths, heights = self._board_region(count)
+
+        # Average intensity of each square from the integral image
+        sums = integral[ys + heights, xs + widths] - integral[ys, xs + widths] - integral[ys + heights, xs] + integral[ys, xs]
+        avg_intensity = sums / (widths * heights)
+
+        threshold_value = np.full(count, np.nan)
+        if squares is None:
+            squares = np.arange(count)
+        if len(squares) == 0:
+            return avg_intensity, threshold_value
+
+        # Gather the central crop of every requested square into a stack of tiles, each padded by the
+        # kernel radius. The buffers are sized for all squares, so a changing selection reuses them.
+        crop_size = int(min(self.CROP_SIZE, widths.min(), heights.min()))
+        radius = self.BLUR_SIZE // 2
+        tile_size = crop_size + 2 * radius
+        tiles = self._buffer("tiles", (count, tile_size, tile_size))[:len(squares)]
+        tops = ys[squares] + (heights[squares] - crop_size) // 2
+        lefts = xs[squares] + (widths[squares] - crop_size) // 2
+        for tile, top, left in zip(tiles, tops, lefts):
+            cv2.copyMakeBorder(gray[top:top + crop_size, left:left + crop_size], radius, radius, radius, radius,
+                               cv2.BORDER_REFLECT_101, dst=tile)
+
+        # Blur all tiles with a single call
+        blurred = self._buffer("blurred", (count * tile_size, tile_size))[:len(squares) * tile_size]
+        cv2.GaussianBlur(tiles.reshape(-1, tile_size), (self.BLUR_SIZE, self.BLUR_SIZE), 0, dst=blurred)
+        blurred = blurred.reshape(-1, tile_size, tile_size)[:, radius:-radius, radius:-radius]
+
+        threshold_value[squares] = blurred.min(axis=(1, 2))
+        return avg_intensity, threshold_value
+
+    def classify_squares(self, avg_intensity, threshold_value, black, white):
+        """
+        Applies the piece thresholds to the statistics of a batch of squares.
+
+        Args:
+            avg_intensity (numpy.ndarray): Average intensity of each square.
+            threshold_value (numpy.ndarray): Minimum of the blurred central crop of each square.
             black (int): Value representing the black color.
             white (int): Value representing the white color.
 
         Returns:
-            numpy.ndarray: The canvas with the chessboard and pieces drawn on it.
+            numpy.ndarray: 1D array with 0 for an empty square, 1 for a black piece and 2 for a white piece.
         """
+        difference, lower, upper, inner, outer = self._decision_rule(avg_intensity, threshold_value, black, white)
+        return np.where(difference > upper, outer, np.where(difference > lower, inner, 0))
 
-        board = np.zeros((self._squares_per_row, self._squares_per_row), dtype=int)
+    def _decision_rule(self, avg_intensity, threshold_value, black, white):
+        """
+        Maps the piece thresholds onto each square of a batch, shared by classify_squares() and square_probabilities().
+
+        A square is empty up to its lower threshold, holds the inner state between the lower and the upper threshold
+        and the outer state above the upper one. On a black square the inner state is a black piece
+        (BLACK_S_BLACK_P) and the outer one a white piece (BLACK_S_WHITE_P). On a white square the inner state
+        is a white piece (WHITE_S_WHITE_P) and the outer one a black piece (WHITE_S_BLACK_P).
+
+        Args:
+            avg_intensity (numpy.ndarray): Average intensity of each square.
+            threshold_value (numpy.ndarray): Minimum of the blurred central crop of each square.
+            black (int): Value representing the black color.
+            white (int): Value representing the white color.
+
+        Returns:
+            tuple: The difference, lower threshold, upper threshold, inner state and outer state of each square.
+        """
+        difference = np.abs(threshold_value - avg_intensity)
+        black_square = np.abs(avg_intensity - black) > np.abs(avg_intensity - white)  # Determine the square type
+
+        lower = np.where(black_square, self.BLACK_S_BLACK_P, self.WHITE_S_WHITE_P)
+        upper = np.where(black_square, self.BLACK_S_WHITE_P, self.WHITE_S_BLACK_P)
+        inner = np.where(black_square, 1, 2)
+        outer = np.where(black_square, 2, 1)
+        return difference, lower, upper, inner, outer
+
+    def square_probabilities(self, avg_intensity, threshold_value, black, white):
+        """
+        Converts the piece thresholds into a probability for each state of a batch of squares.
+
+        Each threshold of the decision rule of classify_squares() becomes a logistic step of width
+        PROBABILITY_SOFTNESS, so squares far from every threshold get confident probabilities that agree with
+        the classification and borderline squares get split ones.
+
+        Args:
+            avg_intensity (numpy.ndarray): Average intensity of each square.
+            threshold_value (numpy.ndarray): Minimum of the blurred central crop of each square.
+            black (int): Value representing the black color.
+            white (int): Value representing the white color.
 
-        if cropped_sections and black is not None and white is not None:
+        Returns:
+            numpy.ndarray: (n, 3) array with the probabilities of an empty square, a black piece and a white piece.
+        """
+        difference, lower, upper, inner, outer = self._decision_rule(avg_intensity, threshold_value, black, white)
+
+        def step(threshold):
+            return 1.0 / (1.0 + np.exp(-(difference - threshold) / self.PROBABILITY_SOFTNESS))
+
+        above_lower = step(lower)
+        above_upper = step(upper)
+
+        rows = np.arange(len(difference))
+        probabilities = np.zeros((len(difference), 3))
+        probabilities[rows, 0] = 1.0 - above_lower
+        probabilities[rows, inner] += above_lower * (1.0 - above_upper)
+        probabilities[rows, outer] += above_lower * above_upper
+        return probabilities
+
+    def changed_squares(self, count, candidates=None):
+        """
+        Compares the fingerprints of the current frame with the ones of the last computed statistics.
+
+        The reference fingerprint of a square is only replaced when the square is reported as changed, so
+        slow drifts add up until they exceed the tolerance.
+
+        Args:
+            count (int): Number of squares of the current geometry.
+            candidates (numpy.ndarray, optional): Boolean mask of the squares that may be reported as changed;
+                                                  the others keep their reference fingerprint. Defaults to None.
+
+        Returns:
+            numpy.ndarray: Boolean array, True for the squares whose statistics must be recomputed.
+        """
+        fingerprints = self.square_fingerprints(count)
+        if not self.INCREMENTAL or self._fingerprints is None or self._fingerprints.shape != fingerprints.shape:
+            self._fingerprints = fingerprints
+            return np.ones(count, dtype=bool)
+
+        changed = np.abs(fingerprints - self._fingerprints).max(axis=(1, 2)) > self.FINGERPRINT_TOLERANCE
+        if candidates is not None:
+            changed &= candidates[:count]
+        self._fingerprints[changed] = fingerprints[changed]
+        return changed
+
+    def set_candidate_squares(self, squares):
+        """
+        Restricts the classification to the squares that can change in the current position.
+
+        The other squares keep their previous statistics until the next full scan, see FULL_SCAN_INTERVAL
+        and request_full_scan().
+
+        Args:
+            squares (iterable): Square indices (a1 = 0, h8 = 63), e.g. the chess.SquareSet returned by
+                                MoveFinder.candidate_squares(). None inspects every square again.
+        """
+        if squares is None:
+            self._candidates = None
+            return
+        candidates = np.zeros(self._squares_per_row * self._squares_per_row, dtype=bool)
+        candidates[list(squares)] = True
+        self._candidates = candidates
+
+    def request_full_scan(self):
+        """
+        Makes the next classification recompute every square, e.g. after an unresolved move.
+        """
+        self._full_scan = True
 
-            for i, section in enumerate(cropped_sections):
-                gray = cv2.cvtColor(section, cv2.COLOR_BGR2GRAY)  # Convert the section to grayscale
-                avg_intensity = np.mean(gray)  # Calculate the average intensity of the section
-                square_type = "Black Square" if abs(avg_intensity - black) > abs(avg_intensity - white) else "White Square"  # Determine the square type
+    def _select_squares(self, count):
+        """
+        Selects the squares whose statistics must be recomputed on this frame.
+
+        Args:
+            count (int): Number of squares of the current geometry.
 
-                crop_width = 100
-                crop_height = 100
-                mask_height, mask_width = gray.shape
-                start_x = (mask_width - crop_width) // 2  # Calculate the start x-coordinate for cropping
-                end_x = start_x + crop_width  # Calculate the end x-coordinate for cropping
-                start_y = (mask_height - crop_height) // 2  # Calculate the start y-coordinate for cropping
-                end_y = start_y + crop_height  # Calculate the end y-coordinate for cropping
-                cropped_mask = gray[start_y:end_y, start_x:end_x]  # Crop the section
+        Returns:
+            numpy.ndarray: Boolean array, True for the squares to recompute.
+        """
+        candidates = self._candidates
+        if candidates is not None:
+            self._scans_since_full += 1
+            if self.FULL_SCAN_INTERVAL and self._scans_since_full >= self.FULL_SCAN_INTERVAL:
+                self._full_scan = True
+
+        if self._full_scan or self._thresholds is None or len(self._thresholds) != count:
+            self._fingerprints = self.square_fingerprints(count)  # Every reference is reset by a full scan
+            self._full_scan = False
+            self._scans_since_full = 0
+            metrics.count("detector.full_scans")
+            return np.ones(count, dtype=bool)
+
+        return self.changed_squares(count, candidates)
+
+    def get_square_counts(self):
+        """
+        Returns how many squares identify_pieces() classified and skipped so far.
 
-                cropped_mask = cv2.GaussianBlur(cropped_mask, (31, 31), 0)  # Apply Gaussian blur
+        Returns:
+            dict: The "classified" and "skipped" counters.
+        """
+        return dict(self._square_counts)
+
+    @metrics.timed("detector.identify_pieces")
+    def identify_pieces(self, cropped_sections, black, white):
+        """
+        Identifies the pieces on the chessboard.
 
-                threshold_value = np.min(cropped_mask)  # Find the minimum intensity value
+        All squares are classified in one batch: see square_statistics() and classify_squares().
+        With INCREMENTAL set, the expensive blurred minimum is only recomputed for the squares whose
+        fingerprint changed by more than FINGERPRINT_TOLERANCE since it was last computed; the other
+        squares reuse their previous value. With candidate squares set (see set_candidate_squares()), only the
+        candidates are inspected, apart from the periodic or requested full scans.
 
-                vicinity_range = 10
-                binary_mask = np.abs(cropped_mask - threshold_value) <= vicinity_range  # Create a binary mask
-                binary_mask = binary_mask.astype(np.uint8) * 255
+        Args:
+            cropped_sections (list): A list of cropped sections from the chessboard.
+            black (int): Value representing the black color.
+            white (int): Value representing the white color.
 
-                binary_mask = cv2.bitwise_not(binary_mask)  # Invert the binary mask
+        Returns:
+            numpy.ndarray: The canvas with the chessboard and pieces drawn on it.
+        """
 
-                piece_color = 0
+        board = np.zeros((self._squares_per_row, self._squares_per_row), dtype=int)
 
-                if (square_type == "Black Square" and abs(threshold_value - avg_intensity) > self.BLACK_S_WHITE_P) or (
-                        square_type == "White Square" and abs(threshold_value - avg_intensity) > self.WHITE_S_WHITE_P and abs(
-                        threshold_value - avg_intensity) < self.WHITE_S_BLACK_P):
+        if cropped_sections and black is not None and white is not None and len(cropped_sections) <= board.size:
 
-                    piece_color = 2  # Identify the piece as white
+            count = len(cropped_sections)
+            changed = self._select_squares(count)
+            avg_intensity, threshold_value = self.square_statistics(count, np.flatnonzero(changed))
+            if not changed.all():
+                threshold_value[~changed] = self._thresholds[~changed]
+            self._thresholds = threshold_value
 
-                elif (square_type == "Black Square" and abs(threshold_value - avg_intensity) > self.BLACK_S_BLACK_P) > (
-                        square_type == "White Square" and abs(threshold_value - avg_intensity) > self.WHITE_S_BLACK_P):
+            skipped = count - int(changed.sum())
+            self._square_counts["classified"] += count - skipped
+            self._square_counts["skipped"] += skipped
+            metrics.count("detector.squares_skipped", skipped)
 
-                    piece_color = 1  # Identify the piece as black
+            piece_colors = self.classify_squares(avg_intensity, threshold_value, black, white)
 
-                else:
-                    pass  # No piece detected
+            indices = np.arange(len(piece_colors))
+            board[indices % self._squares_per_row, indices // self._squares_per_row] = piece_colors
 
-                board[(i % self._squares_per_row), int(i / self._squares_per_row)] = piece_color
+            # Squares without a section stay undecided
+            probabilities = np.full(board.shape + (3,), 1.0 / 3.0)
+            probabilities[indices % self._squares_per_row, indices // self._squares_per_row] = \
+                self.square_probabilities(avg_intensity, threshold_value, black, white)
 
             self._detected = board
+            self._probabilities = probabilities
             self._status = 4
 
     def display_images(self):
         """
         Displays the cleaned mask, marked image, and contour canvas in separate windows.
+
+        The marked image and the contour canvas are built here if the pipeline skipped them: the analytic grid
+        extraction never draws them, and the contour canvas is only drawn with DEBUG_CANVASES set.
         """
         if self._status >= 2:
+            if self._marked_image is None:
+                self.draw_lines()
+            if self._contour_canvas is None:
+                self._contour_canvas = np.zeros_like(self._image)  # Create a blank canvas
+                for x, y, w, h in self._square_rects if self._square_rects is not None else []:
+                    cv2.rectangle(self._contour_canvas, (x, y), (x + w, y + h), (0, 255, 0), 2)  # Draw the squares
             cv2.imshow("Cleaned Mask", self._cleaned_mask)  # Display the cleaned mask
             cv2.imshow("Marked Image", self._marked_image)  # Display the marked image
             cv2.imshow("Contour Canvas", self._contour_canvas)  # Display the contour canvas
             cv2.waitKey(0)  # Wait for a key press
             cv2.destroyAllWindows()  # Close all windows
 
+    @metrics.timed("detector.run_pipeline")
     def run_pipeline(self):
         """
         Runs the entire pipeline for chessboard detection and piece identification.
 
+        The grid is only searched for when no cached geometry exists or the drift check fails;
+        otherwise the squares are cropped straight from the cached rectangles.
+
         Returns:
             int: The final status code after running the pipeline.
         """
 
-        if self._status == 0:
+        if self._status == 0 and self.geometry_valid():
+            cropped_sections = self.crop_rects()  # Reuse the cached geometry
+            self._status = 3
+        elif self._status == 0:
+            self.invalidate_geometry()
             self.preprocess_image()  # Preprocess the image
         if self._status == 1:
             self.detect_lines()  # Detect lines
         if self._status == 2:
-            contours = self.extract_contours()  # Extract contours
-            cropped_sections = self.crop_sections(contours)  # Crop sections
+            cropped_sections = self.extract_grid()  # Intersect the grid lines
+            if not cropped_sections:
+                self.draw_lines()  # Fall back to re-detecting the drawn lines
+                contours = self.extract_contours()  # Extract contours
+                cropped_sections = self.crop_sections(contours)  # Crop sections
+            if self._status == 3:
+                self.store_geometry()  # Cache the geometry for the next frames
         if self._status == 3:
             black, white = self.determine_colors(cropped_sections)  # Determine colors
             self.identify_pieces(cropped_sections, black, white)  # Identify pieces colors
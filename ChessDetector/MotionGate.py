@@ -0,0 +1,175 @@
+import cv2
+import numpy as np
+from collections import deque
+
+class MotionGate:
+    """
+    This class is responsible for deciding when a camera frame is worth running the chessboard detector on.
+
+    Every frame is reduced to a small grayscale fingerprint. The detector is only triggered once the scene
+    has been still for a number of consecutive frames (no hand over the board) and differs from the last
+    accepted scene. The detections of the settled scene are then combined with a per-square majority vote,
+    so a single noisy frame cannot produce a false move, and their square probabilities are averaged.
+
+    Attributes:
+        _stable_frames (int): Number of consecutive still frames required before the scene counts as settled.
+        _scale (float): Downscaling factor applied to the frames before comparing them.
+        _pixel_threshold (float): Gray level difference above which a fingerprint pixel counts as changed.
+        _motion_fraction (float): Fraction of changed pixels between consecutive fingerprints above which
+                                  the scene counts as moving.
+        _change_fraction (float): Fraction of pixels changed since the last accepted fingerprint above which
+                                  the settled scene counts as a new board.
+        _previous (numpy.ndarray): Fingerprint of the previous frame.
+        _accepted (numpy.ndarray): Fingerprint of the last accepted scene.
+        _prior_accepted (numpy.ndarray): Fingerprint accepted before the last commit, restored by reject().
+        _stable_count (int): Number of consecutive still frames seen so far.
+        _votes (collections.deque): Detections and square probabilities of the current settled scene, at most votes of them.
+
+    Methods:
+        __init__(self, stable_frames, votes, scale, pixel_threshold, motion_fraction, change_fraction): Initializes the gate.
+        fingerprint(self, frame): Reduces a frame to a small grayscale fingerprint.
+        changed_fraction(self, first, second): Fraction of pixels that differ between two fingerprints.
+        update(self, frame): Feeds a frame and tells whether the detector should run on it.
+        vote(self, detected, probabilities): Adds a detection and returns the per-square majority and the average
+                                             probabilities once enough are collected.
+        commit(self): Marks the current scene as accepted.
+        reject(self): Takes back the last commit, so the settled scene is evaluated again.
+        reset(self): Forgets all the state of the gate.
+    """
+
+    def __init__(self, stable_frames=3, votes=3, scale=0.125, pixel_threshold=20, motion_fraction=0.001, change_fraction=0.001):
+        """
+        Initializes the MotionGate object.
+
+        Args:
+            stable_frames (int, optional): Consecutive still frames required to trigger the detector. Defaults to 3.
+            votes (int, optional): Number of detections combined by the majority vote. Defaults to 3.
+            scale (float, optional): Downscaling factor of the fingerprints. Defaults to 0.125.
+            pixel_threshold (float, optional): Gray level difference of a changed pixel. Defaults to 20.
+            motion_fraction (float, optional): Fraction of changed pixels counted as motion. Defaults to 0.001.
+            change_fraction (float, optional): Fraction of changed pixels counted as a new board. Defaults to 0.001.
+        """
+        self._stable_frames = stable_frames
+        self._scale = scale
+        self._pixel_threshold = pixel_threshold
+        self._motion_fraction = motion_fraction
+        self._change_fraction = change_fraction
+        self._previous = None
+        self._accepted = None
+        self._prior_accepted = None
+        self._stable_count = 0
+        self._votes = deque(maxlen=votes)
+
+    def fingerprint(self, frame):
+        """
+        Reduces a frame to a small grayscale fingerprint.
+
+        Args:
+            frame (numpy.ndarray): BGR camera frame.
+
+        Returns:
+            numpy.ndarray: The downscaled grayscale frame as float32.
+        """
+        small = cv2.resize(frame, None, fx=self._scale, fy=self._scale, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.float32)
+
+    def changed_fraction(self, first, second):
+        """
+        Computes the fraction of pixels that differ noticeably between two fingerprints.
+
+        Args:
+            first (numpy.ndarray): A fingerprint.
+            second (numpy.ndarray): Another fingerprint, or None.
+
+        Returns:
+            float: The fraction of changed pixels, 1.0 if the fingerprints cannot be compared.
+        """
+        if second is None or first.shape != second.shape:
+            return 1.0
+        return np.count_nonzero(np.abs(first - second) > self._pixel_threshold) / first.size
+
+    def update(self, frame):
+        """
+        Feeds a new frame to the gate.
+
+        Args:
+            frame (numpy.ndarray): BGR camera frame. None is ignored.
+
+        Returns:
+            bool: True if the scene is settled and differs from the last accepted one,
+                  meaning the detector should run on this frame.
+        """
+        if frame is None:
+            return False
+
+        current = self.fingerprint(frame)
+
+        if self.changed_fraction(current, self._previous) > self._motion_fraction:
+            # Something is moving over the board: start counting again
+            self._stable_count = 0
+            self._votes.clear()
+        else:
+            self._stable_count += 1
+
+        self._previous = current
+
+        if self._stable_count < self._stable_frames:
+            return False
+
+        if self.changed_fraction(current, self._accepted) <= self._change_fraction:
+            return False
+
+        return True
+
+    def vote(self, detected, probabilities=None):
+        """
+        Adds a detection of the current settled scene to the vote.
+
+        Args:
+            detected (numpy.ndarray): 2D array of square states (0 empty, 1 black piece, 2 white piece).
+            probabilities (numpy.ndarray, optional): Square probabilities of the detection. Defaults to None.
+
+        Returns:
+            tuple: The per-square majority of the collected detections and the average of their probabilities
+                   (None if a detection came without them) once enough of them are available, None otherwise.
+                   Ties resolve to the lowest state.
+        """
+        self._votes.append((np.array(detected, copy=True),
+                            None if probabilities is None else np.array(probabilities, copy=True)))
+        if len(self._votes) < self._votes.maxlen:
+            return None
+
+        stacked = np.stack([board for board, _ in self._votes])
+        counts = np.stack([(stacked == state).sum(axis=0) for state in range(3)])
+
+        collected = [square_probabilities for _, square_probabilities in self._votes]
+        average = None if any(item is None for item in collected) else np.mean(collected, axis=0)
+        return counts.argmax(axis=0), average
+
+    def commit(self):
+        """
+        Marks the current scene as accepted, so the detector only runs again once the board changes.
+        """
+        self._prior_accepted = self._accepted
+        self._accepted = self._previous
+        self._votes.clear()
+
+    def reject(self):
+        """
+        Takes back the last commit, e.g. when the voted board could not be resolved to a move.
+
+        The settled scene differs from the accepted one again, so the detector keeps running on it (and collects
+        a new vote) instead of waiting until someone touches the board.
+        """
+        self._accepted = self._prior_accepted
+        self._votes.clear()
+
+    def reset(self):
+        """
+        Forgets all the state of the gate.
+        """
+        self._previous = None
+        self._accepted = None
+        self._prior_accepted = None
+        self._stable_count = 0
+        self._votes.clear()
@@ -1,16 +1,35 @@
 import chess
+import chess.polyglot
+import numpy as np
+from Utilities.Metrics import metrics
 
 class MoveFinder:
     """
     This class is responsible for finding the move made on a chessboard based on the difference between the current and next board states.
 
+    The detected board is turned into white and black occupancy bitboards, which are compared with XOR and
+    popcount against the occupancy expected after each legal move. This recognizes every move type, including
+    castling on both sides, en passant and promotion (always read as a queen promotion, since the detector cannot
+    tell piece types apart).
+
     Attributes:
         _board (chess.Board): The current state of the chessboard.
         _status (int): A status code indicating the current state of the class.
+        _expected_key (int): Zobrist hash of the position the expected occupancies were computed for.
+        _expected (list): (move, white occupancy, black occupancy) for each legal move of that position.
+        _expected_states (numpy.ndarray): Square states expected without a move (row 0) and after each
+                                          legal move, shaped (moves + 1, 64).
+        _states_key (int): Zobrist hash of the position _expected_states was computed for.
 
     Methods:
         __init__(self, board): Initializes the MoveFinder object with the given chessboard.
         set_status(self, new_status): Sets the status of the class.
+        occupancy(self, next_board): Turns a detected board into white and black occupancy bitboards.
+        expected_occupancies(self): Returns the occupancy expected after each legal move of the current position.
+        rank_moves(self, probabilities): Ranks the legal moves by likelihood given per-square probabilities.
+        find_likely_move(self, probabilities, min_confidence): Finds the most likely legal move and its confidence.
+        candidate_squares(self): Returns the squares that can change with the next move or the last one.
+        matches(self, next_board, probabilities, min_confidence): Checks whether a detected board shows the current position.
         find_move(self, next_board): Finds the move made on the chessboard based on the difference between the current and next board states.
         push_board(self, board): Updates the current chessboard with the given board.
     """
@@ -24,6 +43,10 @@ class MoveFinder:
         """
         self._board = board
         self._status = 0
+        self._expected_key = None
+        self._expected = []
+        self._expected_states = None
+        self._states_key = None
 
     def set_status(self, new_status):
         """
@@ -34,6 +57,71 @@ class MoveFinder:
         """
         self._status = new_status
 
+    def occupancy(self, next_board):
+        """
+        Turns a detected board into white and black occupancy bitboards.
+
+        Args:
+            next_board (numpy.ndarray): The detected state of the chessboard, indexed [file, rank], with 0 for
+                                        an empty square, 1 for a black piece and 2 for a white piece.
+
+        Returns:
+            tuple: A tuple (white, black) of bitboards, bit n standing for chess square n.
+        """
+        squares = np.asarray(next_board).T.ravel()  # Square index rank * 8 + file
+        white = int.from_bytes(np.packbits(squares == 2, bitorder="little").tobytes(), "little")
+        black = int.from_bytes(np.packbits(squares == 1, bitorder="little").tobytes(), "little")
+        return white, black
+
+    def expected_occupancies(self):
+        """
+        Returns the occupancy expected after each legal move of the current position.
+
+        The occupancies are computed once per position, from board.occupied_co after making each move,
+        and reused until the position changes.
+
+        Returns:
+            list: A list of (move, white occupancy, black occupancy) tuples.
+        """
+        key = chess.polyglot.zobrist_hash(self._board)
+        if key != self._expected_key:
+            self._expected = []
+            seen = set()
+            for move in self._board.legal_moves:
+                self._board.push(move)
+                occupied = (self._board.occupied_co[chess.WHITE], self._board.occupied_co[chess.BLACK])
+                self._board.pop()
+                # Under-promotions look the same as the queen promotion generated before them
+                if occupied not in seen:
+                    seen.add(occupied)
+                    self._expected.append((move, occupied[0], occupied[1]))
+            self._expected_key = key
+        return self._expected
+
+    def matches(self, next_board, probabilities=None, min_confidence=0.9):
+        """
+        Checks whether a detected board shows the current position, e.g. to verify a resumed game.
+
+        Borderline squares are resolved like find_likely_move() does: with probabilities given, the board also
+        matches when "nothing moved" is the most likely hypothesis of rank_moves().
+
+        Args:
+            next_board (numpy.ndarray): The detected state of the chessboard.
+            probabilities (numpy.ndarray, optional): (8, 8, 3) array of state probabilities, see rank_moves().
+                                                     Defaults to None (exact occupancy only).
+            min_confidence (float, optional): Minimum posterior probability of "nothing moved". Defaults to 0.9.
+
+        Returns:
+            bool: True if the detected board shows the current position.
+        """
+        if self.occupancy(next_board) == (self._board.occupied_co[chess.WHITE], self._board.occupied_co[chess.BLACK]):
+            return True
+        if probabilities is None:
+            return False
+        move, confidence = self.rank_moves(probabilities)[0]
+        return move is None and confidence >= min_confidence
+
+    @metrics.timed("movefinder.find_move")
     def find_move(self, next_board):
         """
         Finds the move made on the chessboard based on the difference between the current and next board states.
@@ -44,46 +132,135 @@ class MoveFinder:
         Returns:
             list or str: A list containing the UCI notation of the move made, or a string 'p1z1' if the move cannot be determined.
         """
-        emptied = set()
-        filled = set()
-
-        length, height = next_board.shape
-
-        for i in range(length):
-            for j in range(height):
-                square_name = chess.square_name(8 * j + i)
-                piece = self._board.piece_at(chess.square(i, j))
-
-                if piece is not None:
-                    if piece.color == chess.WHITE:
-                        color_id = 2
-                    else:
-                        color_id = 1
-
-                    if next_board[i, j] == 0:
-                        emptied.add(square_name)
-                    elif color_id != next_board[i, j]:
-                        filled.add(square_name)
-                    else:
-                        pass
-                else:
-                    if next_board[i, j] != 0:
-                        filled.add(square_name)
-
-        if len(filled) == 1 and len(emptied) == 1:
-            code = f"{list(emptied)[0]}{list(filled)[0]}"
-            return [code]
-
-        elif len(filled) == 2 and len(emptied) == 2:
-            if chess.square_name(0) in emptied and chess.square_name(4) in emptied:
-                code = ["e1c1", "a1d1"]
-            elif chess.square_name(7) in emptied and chess.square_name(4) in emptied:
-                code = ["e1g1", "h1f1"]
-            else:
-                code = "p1z1"
-            return code
-        else:
-            return "p1z1"
+        white, black = self.occupancy(next_board)
+
+        for move, expected_white, expected_black in self.expected_occupancies():
+            if chess.popcount(white ^ expected_white) + chess.popcount(black ^ expected_black) == 0:
+                return [move.uci()]
+
+        return "p1z1"
+
+    def _states(self, white, black):
+        """
+        Expands white and black occupancy bitboards into an array of square states.
+
+        Args:
+            white (int): White occupancy bitboard.
+            black (int): Black occupancy bitboard.
+
+        Returns:
+            numpy.ndarray: 1D array of 64 states (0 empty, 1 black piece, 2 white piece) by square index.
+        """
+        def bits(mask):
+            return np.unpackbits(np.frombuffer(mask.to_bytes(8, "little"), dtype=np.uint8), bitorder="little")
+
+        return bits(black) + 2 * bits(white)
+
+    def expected_states(self):
+        """
+        Returns the square states expected without a move and after each legal move of the current position.
+
+        Returns:
+            tuple: A tuple (moves, states): the list of hypotheses (None for "no move", then the legal moves)
+                   and a (len(moves), 64) array of the square states each of them predicts.
+        """
+        expected = self.expected_occupancies()
+        if self._states_key != self._expected_key:
+            current = (self._board.occupied_co[chess.WHITE], self._board.occupied_co[chess.BLACK])
+            self._expected_states = np.stack([self._states(*current)] +
+                                             [self._states(white, black) for _, white, black in expected])
+            self._states_key = self._expected_key
+        return [None] + [move for move, _, _ in expected], self._expected_states
+
+    def rank_moves(self, probabilities):
+        """
+        Ranks the legal moves of the current position by likelihood given per-square probabilities.
+
+        Each hypothesis (no move, or one of the legal moves) predicts the state of every square; its
+        log-likelihood is the sum over the squares of the log-probability of the predicted state, and the
+        log-likelihoods are normalized into posterior probabilities.
+
+        Args:
+            probabilities (numpy.ndarray): (8, 8, 3) array of state probabilities (empty, black piece,
+                                           white piece), indexed [file, rank] like the detected board.
+
+        Returns:
+            list: (move, probability) tuples sorted from most to least likely, move being the UCI
+                  notation of a legal move or None for "nothing moved".
+        """
+        moves, states = self.expected_states()
+
+        log_probabilities = np.log(np.clip(np.asarray(probabilities), 1e-6, 1.0)).transpose(1, 0, 2).reshape(64, 3)
+        likelihood = log_probabilities[np.arange(64), states].sum(axis=1)
+
+        posterior = np.exp(likelihood - likelihood.max())
+        posterior /= posterior.sum()
+
+        order = np.argsort(-posterior)
+        return [(None if moves[i] is None else moves[i].uci(), float(posterior[i])) for i in order]
+
+    @metrics.timed("movefinder.find_likely_move")
+    def find_likely_move(self, probabilities, min_confidence=0.9):
+        """
+        Finds the most likely legal move given per-square probabilities.
+
+        Args:
+            probabilities (numpy.ndarray): (8, 8, 3) array of state probabilities, see rank_moves().
+            min_confidence (float, optional): Minimum posterior probability of the best move. Defaults to 0.9.
+
+        Returns:
+            tuple: A tuple (move, confidence). move is a list containing the UCI notation of the most likely
+                   move, or the string 'p1z1' if nothing moved or the best move is not confident enough.
+        """
+        move, confidence = self.rank_moves(probabilities)[0]
+        if move is None or confidence < min_confidence:
+            return "p1z1", confidence
+        return [move], confidence
+
+    @staticmethod
+    def _move_squares(board, move):
+        """
+        Returns the squares whose occupancy a move changes.
+
+        Args:
+            board (chess.Board): The position the move is played from.
+            move (chess.Move): The move.
+
+        Returns:
+            list: The from and to squares, plus the rook squares of a castling move and the square
+                  of the pawn captured en passant.
+        """
+        squares = [move.from_square, move.to_square]
+        if board.is_castling(move):
+            rank = chess.square_rank(move.from_square)
+            kingside = board.is_kingside_castling(move)
+            squares += [chess.square(7 if kingside else 0, rank), chess.square(5 if kingside else 3, rank),
+                        chess.square(6 if kingside else 2, rank)]
+        elif board.is_en_passant(move):
+            squares.append(chess.square(chess.square_file(move.to_square), chess.square_rank(move.from_square)))
+        return squares
+
+    def candidate_squares(self):
+        """
+        Returns the squares that can change with the next move or the last one.
+
+        These are the squares touched by the legal moves of the current position and by the last move
+        on the stack, which the robot may still be executing on the physical board.
+
+        Returns:
+            chess.SquareSet: The candidate squares, numbered like the detector sections.
+        """
+        squares = chess.SquareSet()
+        for move in self._board.legal_moves:
+            squares.update(self._move_squares(self._board, move))
+
+        if self._board.move_stack:
+            last_move = self._board.pop()
+            try:
+                squares.update(self._move_squares(self._board, last_move))
+            finally:
+                self._board.push(last_move)
+        return squares
 
     def push_board(self, board):
         """
@@ -0,0 +1,245 @@
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+import cv2
+import chess.pgn
+import numpy as np
+from collections import deque
+from ChessDetector.ChessboardDetector import ChessboardDetector
+from ChessDetector.MoveFinder import MoveFinder
+from MoveMaker.MoveMaker import MoveMaker
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+# Detector of the current worker process, created by _initWorker()
+_detector = None
+
+def iterFrames(source, step=1):
+    """
+    Streams the frames of a recorded game.
+
+    Images of a directory are yielded as paths, so the worker processes read them themselves; the frames of
+    a video are decoded here and yielded as arrays.
+
+    Args:
+        source (str): A directory of archived frames (read in file name order) or a video file.
+        step (int, optional): Only every step-th frame is yielded. Defaults to 1.
+
+    Yields:
+        tuple: (index, name, frame), where frame is an image path or a BGR array.
+    """
+    if os.path.isdir(source):
+        names = sorted(name for name in os.listdir(source) if name.lower().endswith(IMAGE_EXTENSIONS))
+        for index in range(0, len(names), step):
+            yield index, names[index], os.path.join(source, names[index])
+        return
+
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise IOError(f"Couldn't open {source}")
+    try:
+        index = 0
+        while True:
+            if index % step == 0:
+                ret, frame = capture.read()
+            else:
+                ret = capture.grab()  # Skipped frames are not decoded
+            if not ret:
+                break
+            if index % step == 0:
+                yield index, f"{os.path.basename(source)}#{index}", frame
+            index += 1
+    finally:
+        capture.release()
+
+def _initWorker(thresholds):
+    """
+    Initializer of the worker processes: creates the detector of the process.
+
+    Args:
+        thresholds (dict): Detector attributes to override, e.g. {"BLACK_S_WHITE_P": 40}.
+    """
+    global _detector
+    cv2.setNumThreads(1)  # One process per core; OpenCV threads would only compete with the other workers
+    _detector = ChessboardDetector()
+    for name, value in thresholds.items():
+        setattr(_detector, name, value)
+
+def _detectFrame(item):
+    """
+    Runs the detector of the current process on one frame.
+
+    The detector keeps its geometry cache between the frames the process is handed.
+
+    Args:
+        item (tuple): (index, name, frame) as yielded by iterFrames().
+
+    Returns:
+        tuple: (index, name, status, detected, probabilities); detected and probabilities are None
+               unless the pipeline succeeded.
+    """
+    index, name, frame = item
+    if isinstance(frame, str):
+        _detector.push_image(frame)
+    else:
+        _detector.push_frame(frame)
+
+    status = _detector.run_pipeline()
+    if status != 4:
+        return index, name, status, None, None
+    return index, name, status, _detector._detected.copy(), _detector._probabilities.copy()
+
+def detectFrames(frames, processes=None, window=None, thresholds=None):
+    """
+    Runs the detector over a stream of frames, fanned out over a process pool.
+
+    At most window frames are in flight at any time, so a long video never piles up in memory, and
+    the results come back in frame order.
+
+    Args:
+        frames (iterable): (index, name, frame) tuples, as yielded by iterFrames().
+        processes (int, optional): Number of worker processes; 1 runs in this process. Defaults to the number of cores.
+        window (int, optional): Maximum number of frames in flight. Defaults to 4 per process.
+        thresholds (dict, optional): Detector attributes to override. Defaults to None.
+
+    Yields:
+        tuple: (index, name, status, detected, probabilities) for every frame, in order.
+    """
+    processes = processes or os.cpu_count()
+    window = window or 4 * processes
+    thresholds = thresholds or {}
+
+    if processes <= 1:
+        _initWorker(thresholds)
+        for item in frames:
+            yield _detectFrame(item)
+        return
+
+    with multiprocessing.Pool(processes, initializer=_initWorker, initargs=(thresholds,)) as pool:
+        pending = deque()
+        for item in frames:
+            if len(pending) >= window:
+                yield pending.popleft().get()
+            pending.append(pool.apply_async(_detectFrame, (item,)))
+        while pending:
+            yield pending.popleft().get()
+
+def replayGame(results, stable_frames=3):
+    """
+    Rebuilds the move sequence of a game from the per-frame detections, without an engine.
+
+    A board counts once the same detection was seen on stable_frames consecutive frames (so frames with a
+    hand over the board are ignored) and it differs from the last accepted board. Every accepted change is
+    resolved to the move of the side to move with MoveFinder, falling back to the most likely legal move.
+    Both sides' moves are replayed as player moves, since the robot's moves are on the recording as well.
+
+    Args:
+        results (iterable): Per-frame detections, as yielded by detectFrames().
+        stable_frames (int, optional): Consecutive identical detections required to accept a board. Defaults to 3.
+
+    Yields:
+        tuple: (game, record) for every frame: the MoveMaker holding the game so far and a dictionary with the
+               frame "index", "name", detector "status", the detected "board" (None if the detection failed)
+               and the "moves" recognised on this frame in UCI notation.
+    """
+    game = MoveMaker(0, enginePath=None)
+    move_finder = MoveFinder(game.get_board())
+
+    accepted = None
+    candidate = None
+    stable = 0
+
+    for index, name, status, detected, probabilities in results:
+        record = {"index": index, "name": name, "status": int(status),
+                  "board": detected.tolist() if detected is not None else None, "moves": []}
+
+        if detected is None:
+            stable = 0
+        else:
+            if candidate is not None and np.array_equal(detected, candidate):
+                stable += 1
+            else:
+                candidate, stable = detected, 1
+
+            if stable == stable_frames and (accepted is None or not np.array_equal(candidate, accepted)):
+                move_ucis = move_finder.find_move(candidate)
+                if move_ucis == "p1z1":
+                    move_ucis, _ = move_finder.find_likely_move(probabilities)
+
+                if accepted is None and move_ucis == "p1z1":
+                    accepted = candidate  # First board of the recording, possibly the starting position
+                elif move_ucis != "p1z1":
+                    for move_uci in move_ucis:
+                        if game.makePlayerMove(move_uci) == 1:
+                            record["moves"].append(move_uci)
+                    move_finder.push_board(game.get_board())
+                    accepted = candidate
+
+        yield game, record
+
+def writePgn(game, path, source):
+    """
+    Writes the replayed game as PGN.
+
+    Args:
+        game (MoveMaker): The replayed game.
+        path (str): Path of the PGN file.
+        source (str): The recording the game was replayed from, stored in the Site header.
+    """
+    pgn = chess.pgn.Game.from_board(game.get_board())
+    pgn.headers["Event"] = "RoboChess replay"
+    pgn.headers["Site"] = source
+    pgn.headers["Date"] = time.strftime("%Y.%m.%d")
+    with open(path, "w") as pgn_file:
+        print(pgn, file=pgn_file)
+
+def main():
+    """
+    Command line entry point: replays a recording and writes the PGN and the per-frame results.
+    """
+    parser = argparse.ArgumentParser(description="Replay recorded RoboChess frames through the detector")
+    parser.add_argument("source", help="directory of archived frames or a video file")
+    parser.add_argument("--pgn", default="replay.pgn", help="output PGN file")
+    parser.add_argument("--frames", help="output JSON lines file with the per-frame results")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--window", type=int, default=None, help="maximum frames in flight (default: 4 per process)")
+    parser.add_argument("--step", type=int, default=1, help="only process every n-th frame")
+    parser.add_argument("--stable", type=int, default=3, help="consecutive identical detections to accept a board")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="override a detector threshold, e.g. --set BLACK_S_WHITE_P=40")
+    args = parser.parse_args()
+
+    thresholds = {}
+    for assignment in args.set:
+        name, value = assignment.split("=", 1)
+        thresholds[name] = float(value)
+
+    frames_file = open(args.frames, "w") if args.frames else None
+    started = time.monotonic()
+    count = 0
+    game = None
+
+    try:
+        results = detectFrames(iterFrames(args.source, args.step), args.processes, args.window, thresholds)
+        for game, record in replayGame(results, args.stable):
+            count += 1
+            if frames_file is not None:
+                frames_file.write(json.dumps(record, separators=(",", ":")) + "\n")
+    finally:
+        if frames_file is not None:
+            frames_file.close()
+
+    if game is None:
+        print(f"No frames found in {args.source}")
+        return 1
+
+    writePgn(game, args.pgn, args.source)
+    elapsed = time.monotonic() - started
+    print(f"{count} frames in {elapsed:.1f} s ({count / elapsed:.1f} frames/s), {len(game.get_board().move_stack)} moves")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,375 @@
+import math
+import itertools
+from collections import namedtuple
+import chess
+
+# Constants of the SteppersControl firmware (Arduino/main)
+STEPS_PER_REV = 200           # Steps per revolution of both steppers
+STEPS_PER_SQUARE = 50         # Steps per square of goToSquare() on both axes
+X_PULLEY_DIAMETER = 40.0      # Millimetres, x stepper (files)
+Y_PULLEY_DIAMETER = 12.0      # Millimetres, y stepper (ranks)
+X_SPEED = 75                  # Revolutions per minute set by the firmware for the x stepper
+Y_SPEED = 150                 # Revolutions per minute set by the firmware for the y stepper
+X_SQUARE_DELAY = 0.1          # Seconds waited by goToSquare() after every square on the x axis
+Y_SQUARE_DELAY = 0.05         # Seconds waited by goToSquare() after every square on the y axis
+
+# Millimetres moved per step on each axis
+X_MM_PER_STEP = math.pi * X_PULLEY_DIAMETER / STEPS_PER_REV
+Y_MM_PER_STEP = math.pi * Y_PULLEY_DIAMETER / STEPS_PER_REV
+
+# Seconds per step on each axis, including the share of the per-square delay
+X_SECONDS_PER_STEP = 60.0 / (X_SPEED * STEPS_PER_REV) + X_SQUARE_DELAY / STEPS_PER_SQUARE
+Y_SECONDS_PER_STEP = 60.0 / (Y_SPEED * STEPS_PER_REV) + Y_SQUARE_DELAY / STEPS_PER_SQUARE
+
+# Estimated duration of picking up or putting down a piece
+GRAB_TIME = 0.3
+
+# Files of the graveyard lanes next to the board, by color of the captured pieces
+GRAVEYARD_FILES = {chess.WHITE: (8, 9), chess.BLACK: (-1, -2)}
+
+# Action kinds
+TRAVEL = "travel"         # Move the head without a piece
+CARRY = "carry"           # Move the head while holding a piece
+GRAVEYARD = "graveyard"   # Carry a piece to its graveyard slot
+GRAB = "grab"             # Pick up the piece under the head
+RELEASE = "release"       # Put the held piece down
+MANUAL = "manual"         # A square must be set by hand to the piece of the action (None to clear it)
+
+# One step of a plan: the kind, the target in (x, y) steps from the centre of a1, and the piece concerned
+Action = namedtuple("Action", ["kind", "x", "y", "piece"])
+
+# A planned move: its actions, the total steps travelled on each axis and the estimated duration in seconds
+MotionPlan = namedtuple("MotionPlan", ["actions", "x_steps", "y_steps", "time"])
+
+def squareSteps(square):
+    """
+    Returns the position of a square in steps, with the origin at the centre of a1.
+
+    Like the square index of goToSquare(), the file is driven by the x stepper and the rank by the y stepper.
+
+    Args:
+        square (int): The square index (a1 = 0, h8 = 63).
+
+    Returns:
+        tuple: (x, y) position in steps.
+    """
+    return chess.square_file(square) * STEPS_PER_SQUARE, chess.square_rank(square) * STEPS_PER_SQUARE
+
+def travelTime(x_steps, y_steps):
+    """
+    Estimates the duration of a move of the head.
+
+    goToSquare() steps the two axes one after the other, so the durations of the axes add up.
+
+    Args:
+        x_steps (int): Steps on the x axis (sign ignored).
+        y_steps (int): Steps on the y axis (sign ignored).
+
+    Returns:
+        float: The duration in seconds.
+    """
+    return abs(x_steps) * X_SECONDS_PER_STEP + abs(y_steps) * Y_SECONDS_PER_STEP
+
+class MotionPlanner:
+    """
+    This class turns chess moves into sequences of gantry actions.
+
+    A move is planned from the board before and after it, as a set of piece transfers: pieces moved on the
+    board, captured pieces carried to the graveyard and, for a promotion, a spare piece fetched from the
+    graveyard. The transfers are ordered, and the graveyard slots chosen, to minimise the estimated duration,
+    which weighs the travel of each axis by its speed. Pieces are carried along the lines between the
+    squares unless the way along a rank or file is free, so they never run into other pieces.
+
+    Attributes:
+        _slots (dict): Graveyard slots by color of the captured pieces, as lists of (x, y) positions in steps.
+        _graveyard (dict): Piece held by each occupied graveyard slot, by (x, y) position.
+        _position (tuple): Current (x, y) position of the head in steps.
+        grab_time (float): Estimated duration of a grab or a release in seconds.
+
+    Methods:
+        __init__(self, graveyard_files, grab_time): Initializes the planner with the head on a1.
+        planMove(self, before, after, commit): Plans the actions turning the board before a move into the board after it.
+        manualPlan(self, before, after): Plan asking for a whole move to be made by hand.
+        estimateTime(self, actions, start): Estimates the duration of a list of actions.
+        get_position(self): Returns the current position of the head.
+        get_graveyard(self): Returns the pieces in the graveyard.
+        reset(self): Empties the graveyard and puts the head back on a1.
+    """
+
+    def __init__(self, graveyard_files=None, grab_time=GRAB_TIME):
+        """
+        Initializes the planner, with an empty graveyard and the head on a1, where calibrateAxes() leaves it.
+
+        Args:
+            graveyard_files (dict, optional): Files of the graveyard lanes by color of the captured pieces.
+                                              Defaults to GRAVEYARD_FILES (two lanes on each side of the board).
+            grab_time (float, optional): Estimated duration of a grab or a release in seconds. Defaults to GRAB_TIME.
+        """
+        graveyard_files = GRAVEYARD_FILES if graveyard_files is None else graveyard_files
+        self._slots = {color: [(file * STEPS_PER_SQUARE, rank * STEPS_PER_SQUARE) for file in files for rank in range(8)]
+                       for color, files in graveyard_files.items()}
+        self._graveyard = {}
+        self._position = (0, 0)
+        self.grab_time = grab_time
+
+    def get_position(self):
+        """
+        Returns the current position of the head.
+
+        Returns:
+            tuple: (x, y) position in steps.
+        """
+        return self._position
+
+    def get_graveyard(self):
+        """
+        Returns the pieces in the graveyard.
+
+        Returns:
+            dict: Piece by (x, y) slot position.
+        """
+        return dict(self._graveyard)
+
+    def reset(self):
+        """
+        Empties the graveyard and puts the head back on a1, e.g. for a new game.
+        """
+        self._graveyard = {}
+        self._position = (0, 0)
+
+    def _transfers(self, before, after):
+        """
+        Lists the piece transfers turning one position into another.
+
+        Every piece that appears on a square is matched with the nearest piece of the same kind that left
+        a square. Pieces left without a match are captured; pieces appearing without a match (promotions)
+        come from the graveyard.
+
+        Args:
+            before (chess.Board): The position before the move.
+            after (chess.Board): The position after the move.
+
+        Returns:
+            list: (piece, source, target) tuples. A source or target is a square index, "graveyard" for a
+                  captured piece, or a graveyard slot position for a spare piece (None if there is none).
+        """
+        removed = {square: piece for square, piece in before.piece_map().items() if after.piece_at(square) != piece}
+        added = {square: piece for square, piece in after.piece_map().items() if before.piece_at(square) != piece}
+
+        transfers = []
+        spares = {slot: piece for slot, piece in self._graveyard.items()}
+        for target, piece in sorted(added.items()):
+            sources = [square for square, removed_piece in removed.items() if removed_piece == piece]
+            if sources:
+                source = min(sources, key=lambda square: chess.square_distance(square, target))
+                del removed[source]
+            else:
+                slots = [slot for slot, spare in spares.items() if spare == piece]
+                source = min(slots, key=lambda slot: self._cost(slot, squareSteps(target))) if slots else None
+                spares.pop(source, None)
+            transfers.append((piece, source, target))
+
+        for source, piece in sorted(removed.items()):
+            transfers.append((piece, source, "graveyard"))
+        return transfers
+
+    @staticmethod
+    def _cost(start, end):
+        """
+        Returns the estimated travel time between two positions in steps.
+        """
+        return travelTime(end[0] - start[0], end[1] - start[1])
+
+    @staticmethod
+    def _carryPath(source, target, occupied):
+        """
+        Returns the waypoints of a piece carried from one position to another.
+
+        A piece slides straight along a rank or a file when the squares in between are free. Otherwise it
+        leaves its square through a corner and follows the lines between the squares, so it passes between
+        the other pieces, and enters the target square through its corner.
+
+        Args:
+            source (tuple): (x, y) start position in steps.
+            target (tuple): (x, y) end position in steps.
+            occupied (set): Positions in steps of the pieces on the board and in the graveyard.
+
+        Returns:
+            list: (x, y) waypoints, ending with the target.
+        """
+        dx, dy = target[0] - source[0], target[1] - source[1]
+        if dx == 0 or dy == 0:
+            length = max(abs(dx), abs(dy)) // STEPS_PER_SQUARE
+            step_x, step_y = (dx > 0) - (dx < 0), (dy > 0) - (dy < 0)
+            between = {(source[0] + step_x * i * STEPS_PER_SQUARE, source[1] + step_y * i * STEPS_PER_SQUARE)
+                       for i in range(1, length)}
+            if not between & occupied:
+                return [target]
+
+        half = STEPS_PER_SQUARE // 2
+        sign_x = 1 if dx >= 0 else -1
+        sign_y = 1 if dy >= 0 else -1
+        corner = (source[0] + sign_x * half, source[1] + sign_y * half)
+        lane_x = target[0] - sign_x * half if dx != 0 else corner[0]
+        lane_y = target[1] - sign_y * half if dy != 0 else corner[1]
+
+        path = []
+        for waypoint in (corner, (lane_x, corner[1]), (lane_x, lane_y), target):
+            if not path or path[-1] != waypoint:
+                path.append(waypoint)
+        return path
+
+    def _simulate(self, order, before, free_slots):
+        """
+        Builds the actions of one ordering of the transfers and estimates their duration.
+
+        Args:
+            order (tuple): The transfers, in execution order.
+            before (chess.Board): The position before the move.
+            free_slots (dict): Free graveyard slots by color.
+
+        Returns:
+            tuple: (time, actions, graveyard changes) of the ordering, or None if the order is impossible
+                   (a piece put down on a square that is still occupied).
+        """
+        occupied = {squareSteps(square) for square in before.piece_map()} | set(self._graveyard)
+        free_slots = {color: list(slots) for color, slots in free_slots.items()}
+        position = self._position
+        actions = []
+        placed, taken = {}, []
+        time = 0.0
+
+        for index, (piece, source, target) in enumerate(order):
+            if source is None:
+                if squareSteps(target) in occupied:
+                    return None
+                actions.append(Action(MANUAL, *squareSteps(target), piece))
+                occupied.add(squareSteps(target))
+                continue
+
+            start = squareSteps(source) if isinstance(source, int) else source
+            if isinstance(target, int):
+                end = squareSteps(target)
+                if end in occupied:
+                    return None
+            else:
+                # Graveyard slot closest to the way from here to the start of the next transfer
+                candidates = free_slots.get(piece.color)
+                if not candidates:
+                    return None
+                following = order[index + 1][1] if index + 1 < len(order) else None
+                following = squareSteps(following) if isinstance(following, int) else following
+                end = min(candidates, key=lambda slot: self._cost(start, slot) +
+                          (self._cost(slot, following) if following is not None else 0.0))
+                candidates.remove(end)
+                placed[end] = piece
+
+            if isinstance(source, tuple):
+                taken.append(source)
+
+            actions.append(Action(TRAVEL, *start, None))
+            time += self._cost(position, start)
+            actions.append(Action(GRAB, *start, piece))
+            occupied.discard(start)
+
+            path = self._carryPath(start, end, occupied)
+            kind = GRAVEYARD if target == "graveyard" else CARRY
+            for waypoint in path:
+                actions.append(Action(kind, *waypoint, piece))
+            for first, second in zip([start] + path, path):
+                time += self._cost(first, second)
+
+            actions.append(Action(RELEASE, *end, piece))
+            occupied.add(end)
+            position = end
+            time += 2 * self.grab_time
+
+        return time, actions, (placed, taken)
+
+    def planMove(self, before, after, commit=True):
+        """
+        Plans the gantry actions turning the board before a move into the board after it.
+
+        Captures, castling, en passant and promotions come out of the position difference. Every valid
+        ordering of the transfers is tried with the closest free graveyard slots, and the fastest one is kept.
+
+        Args:
+            before (chess.Board): The position before the move.
+            after (chess.Board): The position after the move.
+            commit (bool, optional): Update the graveyard and the head position as if the plan was executed.
+                                     Defaults to True.
+
+        Returns:
+            MotionPlan: The actions, the total steps on each axis and the estimated duration in seconds.
+
+        Raises:
+            ValueError: If no ordering is possible, e.g. because the graveyard of a color is full.
+        """
+        transfers = self._transfers(before, after)
+        occupied_slots = set(self._graveyard)
+        free_slots = {color: [slot for slot in slots if slot not in occupied_slots] for color, slots in self._slots.items()}
+
+        best = None
+        for order in itertools.permutations(transfers):
+            result = self._simulate(order, before, free_slots)
+            if result is not None and (best is None or result[0] < best[0]):
+                best = result
+        if best is None:
+            raise ValueError(f"No executable order for the transition {before.fen()} -> {after.fen()}")
+
+        _, actions, (placed, taken) = best
+        time = self.estimateTime(actions)
+        x_steps, y_steps = 0, 0
+        position = self._position
+        for action in actions:
+            if action.kind in (TRAVEL, CARRY, GRAVEYARD):
+                x_steps += abs(action.x - position[0])
+                y_steps += abs(action.y - position[1])
+                position = (action.x, action.y)
+
+        if commit:
+            for slot in taken:
+                del self._graveyard[slot]
+            self._graveyard.update(placed)
+            self._position = position
+
+        return MotionPlan(actions, x_steps, y_steps, time)
+
+    def manualPlan(self, before, after):
+        """
+        Builds a plan asking for a whole move to be made by hand, e.g. when planMove() finds no executable order.
+
+        The plan holds one manual action per changed square, with the piece the square must hold afterwards
+        (None to clear it). The graveyard and the head position are left unchanged.
+
+        Args:
+            before (chess.Board): The position before the move.
+            after (chess.Board): The position after the move.
+
+        Returns:
+            MotionPlan: The manual actions, with no steps and no duration.
+        """
+        actions = [Action(MANUAL, *squareSteps(square), after.piece_at(square)) for square in chess.SQUARES
+                   if before.piece_at(square) != after.piece_at(square)]
+        return MotionPlan(actions, 0, 0, 0.0)
+
+    def estimateTime(self, actions, start=None):
+        """
+        Estimates the duration of a list of actions.
+
+        Args:
+            actions (list): The actions, as returned in a MotionPlan.
+            start (tuple, optional): (x, y) start position of the head. Defaults to the current position.
+
+        Returns:
+            float: The duration in seconds, manual placements excluded.
+        """
+        position = self._position if start is None else start
+        time = 0.0
+        for action in actions:
+            if action.kind in (TRAVEL, CARRY, GRAVEYARD):
+                time += self._cost(position, (action.x, action.y))
+                position = (action.x, action.y)
+            elif action.kind in (GRAB, RELEASE):
+                time += self.grab_time
+        return time
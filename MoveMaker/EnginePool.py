@@ -0,0 +1,242 @@
+import threading
+import contextlib
+import chess.engine
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+class EnginePool:
+    """
+    This class is responsible for sharing a fixed number of warm Stockfish processes between many games.
+
+    Move requests lease an engine process for the duration of one search. Requests are served in
+    arrival order, and a game is handed the process it used last whenever that process is idle, so the
+    engine keeps the game's hash table (python-chess only sends "ucinewgame" when the game key changes).
+    Processes that crash are restarted and the interrupted search is retried.
+
+    Attributes:
+        _enginePath (str): Path to the UCI engine executable.
+        _options (dict): UCI options applied to every engine process.
+        _workers (list): The engine processes (chess.engine.SimpleEngine), None for a slot whose process
+                         could not be restarted.
+        _idle (list): Indices of the idle engine processes.
+        _affinity (dict): Index of the process each game used last, keyed by game until the game is forgotten.
+        _queue (collections.deque): Waiting lease requests, in arrival order.
+        _condition (threading.Condition): Guards the idle list, the affinity table and the queue.
+        _restarts (int): Number of engine processes restarted after a crash.
+        _closed (bool): True once close() was called.
+
+    Methods:
+        __init__(self, enginePath, size, options): Starts the engine processes.
+        lease(self, game): Context manager leasing an engine process.
+        play(self, board, limit, game, **kwargs): Runs one search on a leased engine process.
+        forget(self, game): Drops the affinity entry of a finished game.
+        getStats(self): Returns the pool statistics.
+        close(self): Quits all engine processes.
+    """
+
+    def __init__(self, enginePath, size=2, options=None):
+        """
+        Initializes the EnginePool object and starts all engine processes concurrently.
+
+        Args:
+            enginePath (str): Path to the UCI engine executable.
+            size (int, optional): Number of engine processes. Defaults to 2.
+            options (dict, optional): UCI options applied to every process, e.g. {"Hash": 64}. Defaults to None.
+        """
+        self._enginePath = enginePath
+        self._options = options or {}
+
+        with ThreadPoolExecutor(max_workers=size) as executor:
+            self._workers = list(executor.map(lambda _: self._spawn(), range(size)))
+
+        self._idle = list(range(size))
+        self._affinity = {}
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._restarts = 0
+        self._closed = False
+
+    def _spawn(self):
+        """
+        Starts and configures one engine process.
+
+        Returns:
+            chess.engine.SimpleEngine: The engine process.
+        """
+        engine = chess.engine.SimpleEngine.popen_uci(self._enginePath)
+        if self._options:
+            engine.configure(self._options)
+        return engine
+
+    def _restart(self, index):
+        """
+        Replaces a crashed engine process.
+
+        No process is started once the pool is closed. If the new process cannot be started, the slot is
+        emptied instead of keeping the dead process, so it is never leased again.
+
+        Args:
+            index (int): Index of the process to replace.
+        """
+        with contextlib.suppress(Exception):
+            self._workers[index].close()
+        self._workers[index] = None
+
+        engine = None
+        if not self._closed:
+            with contextlib.suppress(Exception):
+                engine = self._spawn()
+
+        with self._condition:
+            if engine is not None and self._closed:
+                with contextlib.suppress(Exception):
+                    engine.quit()
+                engine = None
+            self._workers[index] = engine
+            if engine is None and index in self._idle:
+                self._idle.remove(index)
+            if engine is not None:
+                self._restarts += 1
+            # The new process does not know any game anymore
+            for game in [game for game, worker in self._affinity.items() if worker == index]:
+                del self._affinity[game]
+            self._condition.notify_all()
+
+    def _acquire(self, game):
+        """
+        Waits for this request's turn and an idle engine process.
+
+        Args:
+            game (object): Key of the game the request belongs to.
+
+        Returns:
+            int: Index of the leased process.
+        """
+        ticket = object()
+        with self._condition:
+            self._queue.append(ticket)
+            try:
+                self._condition.wait_for(lambda: self._closed or not self._alive() or
+                                         (self._queue[0] is ticket and self._idle))
+            finally:
+                self._queue.remove(ticket)
+                self._condition.notify_all()
+
+            if self._closed:
+                raise chess.engine.EngineTerminatedError("engine pool closed")
+            if not self._alive():
+                raise chess.engine.EngineTerminatedError("no engine process left in the pool")
+
+            # Prefer the process that already holds this game's hash table
+            index = self._affinity.get(game)
+            if index not in self._idle:
+                index = self._idle[0]
+            self._idle.remove(index)
+            if game is not None:
+                self._affinity[game] = index
+            return index
+
+    def _alive(self):
+        """
+        Tells whether the pool still has an engine process. Called with the condition held.
+
+        Returns:
+            bool: True if at least one slot holds a process.
+        """
+        return any(engine is not None for engine in self._workers)
+
+    def _release(self, index):
+        """
+        Returns an engine process to the pool. An emptied slot is not returned.
+
+        Args:
+            index (int): Index of the process.
+        """
+        with self._condition:
+            if self._workers[index] is not None:
+                self._idle.append(index)
+            self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def lease(self, game=None):
+        """
+        Leases an engine process for the duration of the with block.
+
+        A process that terminates while leased is restarted before it returns to the pool.
+
+        Args:
+            game (object, optional): Key of the game the request belongs to. Defaults to None.
+
+        Yields:
+            chess.engine.SimpleEngine: The leased engine process.
+        """
+        index = self._acquire(game)
+        try:
+            yield self._workers[index]
+        except chess.engine.EngineTerminatedError:
+            self._restart(index)
+            raise
+        finally:
+            self._release(index)
+
+    def play(self, board, limit, game=None, **kwargs):
+        """
+        Runs one search on a leased engine process.
+
+        If the process crashes during the search, it is restarted and the search is retried, at most
+        once per process of the pool.
+
+        Args:
+            board (chess.Board): The position to search.
+            limit (chess.engine.Limit): The search limit.
+            game (object, optional): Key of the game the request belongs to. Defaults to None.
+            **kwargs: Further arguments of chess.engine.SimpleEngine.play().
+
+        Returns:
+            chess.engine.PlayResult: The result of the search.
+        """
+        attempts = len(self._workers) + 1
+        for attempt in range(attempts):
+            try:
+                with self.lease(game) as engine:
+                    return engine.play(board, limit, game=game, **kwargs)
+            except chess.engine.EngineTerminatedError:
+                if attempt == attempts - 1 or self._closed:
+                    raise
+
+    def forget(self, game):
+        """
+        Drops the affinity entry of a finished game, so the pool does not keep the game alive.
+
+        Args:
+            game (object): Key of the game.
+        """
+        with self._condition:
+            self._affinity.pop(game, None)
+
+    def getStats(self):
+        """
+        Returns the pool statistics.
+
+        Returns:
+            dict: The number of live processes, idle processes, waiting requests and crash restarts.
+        """
+        with self._condition:
+            return {
+                "size": sum(engine is not None for engine in self._workers),
+                "idle": len(self._idle),
+                "waiting": len(self._queue),
+                "restarts": self._restarts,
+            }
+
+    def close(self):
+        """
+        Quits all engine processes. Waiting requests fail with chess.engine.EngineTerminatedError.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for engine in self._workers:
+            if engine is not None:
+                with contextlib.suppress(Exception):
+                    engine.quit()
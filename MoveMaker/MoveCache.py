@@ -0,0 +1,169 @@
+import dbm
+import struct
+import threading
+import chess
+import chess.polyglot
+from collections import OrderedDict
+
+class MoveCache:
+    """
+    This class is responsible for answering bot moves from earlier searches and from an opening book,
+    so that repeated positions skip the engine entirely.
+
+    Positions are keyed by their Zobrist hash (chess.polyglot.zobrist_hash) and the search depth.
+    Lookups go through an in-memory LRU first, then an optional on-disk store holding every move ever
+    searched, then an optional Polyglot opening book. Moves read from the disk or the book are promoted
+    into the LRU. Every answer is checked for legality, so a hash collision can never produce an illegal move.
+
+    Attributes:
+        _capacity (int): Maximum number of entries of the in-memory LRU.
+        _lru (collections.OrderedDict): Cached moves keyed by (zobrist hash, depth), least recently used first.
+        _store: The on-disk store (a dbm database), None if disabled.
+        _book (chess.polyglot.MemoryMappedReader): The opening book, None if disabled.
+        _lock (threading.Lock): Guards the LRU, the store and the counters, so games on several threads can share one cache.
+        _stats (dict): Hit, miss and eviction counters.
+
+    Methods:
+        __init__(self, path, capacity, bookPath): Opens the on-disk store and the opening book.
+        lookup(self, board, depth): Returns the cached move for a position, or None.
+        store(self, board, depth, move): Caches the move searched for a position.
+        getStats(self): Returns the hit, miss and eviction counters.
+        close(self): Closes the on-disk store and the opening book.
+    """
+
+    KEY_FORMAT = "<QB"
+    MOVE_FORMAT = "<H"
+
+    def __init__(self, path=None, capacity=4096, bookPath=None):
+        """
+        Initializes the MoveCache object.
+
+        Args:
+            path (str, optional): Path of the on-disk store, created if missing. Defaults to None (memory only).
+            capacity (int, optional): Maximum number of entries of the in-memory LRU. Defaults to 4096.
+            bookPath (str, optional): Path of a Polyglot .bin opening book. Defaults to None (no book).
+        """
+        self._capacity = capacity
+        self._lru = OrderedDict()
+        self._store = dbm.open(path, "c") if path is not None else None
+        self._book = chess.polyglot.open_reader(bookPath) if bookPath is not None else None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "diskHits": 0, "bookHits": 0, "misses": 0, "evictions": 0}
+
+    def _remember(self, key, move):
+        """
+        Inserts a move into the in-memory LRU, evicting the least recently used entry if it is full.
+
+        Args:
+            key (tuple): The (zobrist hash, depth) key.
+            move (chess.Move): The move.
+        """
+        self._lru[key] = move
+        self._lru.move_to_end(key)
+        if len(self._lru) > self._capacity:
+            self._lru.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    @staticmethod
+    def _encode(move):
+        """
+        Packs a move into 16 bits: from square, to square and promotion piece type.
+
+        Args:
+            move (chess.Move): The move.
+
+        Returns:
+            bytes: The packed move.
+        """
+        return struct.pack(MoveCache.MOVE_FORMAT, move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12))
+
+    @staticmethod
+    def _decode(data):
+        """
+        Unpacks a move packed by _encode().
+
+        Args:
+            data (bytes): The packed move.
+
+        Returns:
+            chess.Move: The move.
+        """
+        value, = struct.unpack(MoveCache.MOVE_FORMAT, data)
+        return chess.Move(value & 0x3F, (value >> 6) & 0x3F, (value >> 12) or None)
+
+    def lookup(self, board, depth):
+        """
+        Returns the cached move for a position.
+
+        Args:
+            board (chess.Board): The position.
+            depth (int): The search depth the move must have been found with. Book moves match any depth.
+
+        Returns:
+            chess.Move: The cached legal move, or None on a miss.
+        """
+        key = (chess.polyglot.zobrist_hash(board), depth)
+
+        with self._lock:
+            move = self._lru.get(key)
+            if move is not None and board.is_legal(move):
+                self._lru.move_to_end(key)
+                self._stats["hits"] += 1
+                return move
+
+            if self._store is not None:
+                data = self._store.get(struct.pack(self.KEY_FORMAT, *key))
+                if data is not None:
+                    move = self._decode(data)
+                    if board.is_legal(move):
+                        self._remember(key, move)
+                        self._stats["diskHits"] += 1
+                        return move
+
+            if self._book is not None:
+                entry = self._book.get(board)
+                if entry is not None and board.is_legal(entry.move):
+                    self._remember(key, entry.move)
+                    self._stats["bookHits"] += 1
+                    return entry.move
+
+            self._stats["misses"] += 1
+            return None
+
+    def store(self, board, depth, move):
+        """
+        Caches the move searched for a position.
+
+        Args:
+            board (chess.Board): The position, before the move is made.
+            depth (int): The search depth the move was found with.
+            move (chess.Move): The move.
+        """
+        key = (chess.polyglot.zobrist_hash(board), depth)
+
+        with self._lock:
+            self._remember(key, move)
+            if self._store is not None:
+                self._store[struct.pack(self.KEY_FORMAT, *key)] = self._encode(move)
+
+    def getStats(self):
+        """
+        Returns the hit, miss and eviction counters.
+
+        Returns:
+            dict: Counters "hits" (LRU), "diskHits", "bookHits", "misses" and "evictions", and the LRU "size".
+        """
+        with self._lock:
+            return dict(self._stats, size=len(self._lru))
+
+    def close(self):
+        """
+        Closes the on-disk store and the opening book.
+        """
+        with self._lock:
+            if self._store is not None:
+                self._store.close()
+                self._store = None
+            if self._book is not None:
+                self._book.close()
+                self._book = None
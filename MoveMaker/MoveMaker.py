@@ -1,5 +1,10 @@
+import time
+import asyncio
 import chess
 import chess.engine
+from Utilities.Metrics import metrics
+
+STOCKFISH_PATH = "stockfish_15.1_win_x64_popcnt/stockfish-windows-2022-x86-64-modern.exe"
 
 class MoveMaker:
     """
@@ -7,29 +12,55 @@ class MoveMaker:
     and the bot (powered by the Stockfish chess engine), and checking the game status.
 
     Attributes:
-        _stockfish (chess.engine.SimpleEngine): An instance of the Stockfish chess engine.
+        _stockfish (chess.engine.SimpleEngine): An instance of the Stockfish chess engine, None when a pool is used
+                                                or the game runs without an engine.
+        _pool (EnginePool): Shared engine pool serving the bot moves, None when the game owns its engine.
+        _cache (MoveCache): Cache answering repeated positions without the engine, None if disabled.
         _board (chess.Board): A chess board object representing the current game state.
         _stockfishDepth (int): The depth level for the Stockfish engine's analysis.
+        _ponder (bool): Whether the engine keeps searching the expected reply on the player's time.
+        _ponderMove (chess.Move): The player reply the engine is currently pondering on, if any.
+        _ponderHit (bool): Whether the last player move was the pondered one (None if nothing was pondered).
+        _ponderStats (dict): Ponder hits and misses, and the total bot move latency after each of them.
 
     Methods:
-        __init__(self, difficulty): Initializes the MoveMaker object with the specified difficulty level.
+        __init__(self, difficulty, ponder, pool, enginePath, cache): Initializes the MoveMaker object with the specified difficulty level.
         get_board(self): Returns the current state of the chess board.
         getOutcome(self): Return the outcome of the game None if ongoing.
         makePlayerMove(self, move_uci): Makes a move for the player on the chess board.
         makeBotMove(self): Makes a move for the bot using the Stockfish engine.
+        makeBotMoveAsync(self): Coroutine version of makeBotMove that does not block the event loop.
+        restoreMoves(self, moves): Replaces the game with the given moves.
+        getSettings(self): Returns the engine settings of the game.
+        setSettings(self, settings): Applies saved engine settings.
+        getPonderStats(self): Returns the ponder hit statistics.
         endGame(self): Ends the game and quits the Stockfish engine.
     """
 
-    def __init__(self, difficulty):
+    def __init__(self, difficulty, ponder=False, pool=None, enginePath=STOCKFISH_PATH, cache=None):
         """
         Initializes the MoveMaker object.
 
         Args:
             difficulty (int): The difficulty level for the Stockfish engine, which determines
                               the depth of analysis for the bot's moves.
+            ponder (bool, optional): Keep the engine searching the expected player reply after each bot move.
+                                     Needs an engine of its own, so it is ignored when a pool is used.
+                                     Defaults to False.
+            pool (EnginePool, optional): Shared engine pool to lease the engine from for every bot move
+                                         instead of starting a process for this game. Defaults to None.
+            enginePath (str, optional): Path to the Stockfish executable, or None to run without an engine
+                                        (e.g. to replay recorded games); makeBotMove() then only answers
+                                        from the cache. Defaults to STOCKFISH_PATH.
+            cache (MoveCache, optional): Cache of bot moves and opening book consulted before the engine.
+                                         Defaults to None.
         """
-        # Start the Stockfish engine
-        self._stockfish = chess.engine.SimpleEngine.popen_uci("stockfish_15.1_win_x64_popcnt/stockfish-windows-2022-x86-64-modern.exe")
+        # Start the Stockfish engine, unless the moves come from a shared pool or no engine is wanted
+        self._pool = pool
+        self._stockfish = chess.engine.SimpleEngine.popen_uci(enginePath) if pool is None and enginePath is not None else None
+
+        # Bot moves answered without searching
+        self._cache = cache
 
         # Initialize a new chess board
         self._board = chess.Board()
@@ -37,6 +68,12 @@ class MoveMaker:
         # Specify the depth level for Stockfish's analysis
         self._stockfishDepth = difficulty
 
+        # Pondering state and statistics
+        self._ponder = ponder and self._stockfish is not None
+        self._ponderMove = None
+        self._ponderHit = None
+        self._ponderStats = {"hits": 0, "misses": 0, "hitTime": 0.0, "missTime": 0.0}
+
     def get_board(self):
         """
         Returns the current state of the chess board.
@@ -55,6 +92,7 @@ class MoveMaker:
         """
         return self._board.outcome()
 
+    @metrics.timed("movemaker.makePlayerMove")
     def makePlayerMove(self, move_uci):
         """
         Makes a move for the player.
@@ -67,7 +105,8 @@ class MoveMaker:
                  - -1 if the move is illegal
                  - 1 if the move is legal
 
-        If the move is legal, the move is made on the board.
+        If the move is legal, the move is made on the board. When the engine was pondering on another
+        reply, its search is cancelled right away so it stops using the CPU.
         """
         move = chess.Move.from_uci(move_uci)
         if move not in self._board.legal_moves:
@@ -76,27 +115,212 @@ class MoveMaker:
             status = 1
             self._board.push(move)
 
+            if self._ponderMove is not None:
+                self._ponderHit = move == self._ponderMove
+                if not self._ponderHit:
+                    # Any new command cancels the running ponder search
+                    self._stockfish.ping()
+                self._ponderMove = None
+
         return status
 
+    def _cachedBotMove(self):
+        """
+        Answers the bot move from the cache, if possible.
+
+        On a hit a pondering engine is stopped, since its search is not needed anymore.
+
+        Returns:
+            chess.Move: The cached move, or None if the engine has to search.
+        """
+        if self._cache is None:
+            return None
+
+        move = self._cache.lookup(self._board, self._stockfishDepth)
+        if move is not None and self._ponder:
+            self._stockfish.ping()
+            self._ponderHit = None
+            self._ponderMove = None
+        return move
+
+    def _requireEngine(self):
+        """
+        Raises if the bot move needs a search but this game runs without an engine.
+
+        Raises:
+            chess.engine.EngineError: If neither an engine nor a pool is available.
+        """
+        if self._stockfish is None and self._pool is None:
+            raise chess.engine.EngineError("this game was started without an engine")
+
+    def _botMoveFound(self, result, started):
+        """
+        Records the ponder move and the statistics of a finished bot search, and caches its move.
+
+        Args:
+            result (chess.engine.PlayResult): The result of the search.
+            started (float): time.monotonic() value when the search was started.
+        """
+        elapsed = time.monotonic() - started
+        metrics.observe("movemaker.search", elapsed)
+
+        if self._ponderHit:
+            self._ponderStats["hits"] += 1
+            self._ponderStats["hitTime"] += elapsed
+        elif self._ponderHit is not None:
+            self._ponderStats["misses"] += 1
+            self._ponderStats["missTime"] += elapsed
+        self._ponderHit = None
+
+        self._ponderMove = result.ponder if self._ponder else None
+
+        if self._cache is not None:
+            self._cache.store(self._board, self._stockfishDepth, result.move)
+
+    @metrics.timed("movemaker.makeBotMove")
     def makeBotMove(self):
         """
         Makes a move for the bot using the Stockfish engine.
 
         The bot's move is determined by the Stockfish engine, considering the current board
-        position and the specified depth of analysis.
+        position and the specified depth of analysis. Positions found in the cache skip the engine.
+
+        Returns:
+            chess.Move: The move made by the Stockfish engine.
+        """
+        cached_move = self._cachedBotMove()
+        if cached_move is not None:
+            self._board.push(cached_move)
+            return cached_move
+        self._requireEngine()
+
+        started = time.monotonic()
+        if self._pool is not None:
+            result = self._pool.play(self._board, chess.engine.Limit(depth=self._stockfishDepth), game=self)
+        else:
+            result = self._stockfish.play(self._board, chess.engine.Limit(depth=self._stockfishDepth),
+                                          game=self, ponder=self._ponder)
+        self._botMoveFound(result, started)
+        stockfish_move = result.move
+
+        self._board.push(stockfish_move)
+
+        return stockfish_move
+
+    @metrics.timed("movemaker.makeBotMoveAsync")
+    async def makeBotMoveAsync(self):
+        """
+        Makes a move for the bot using the Stockfish engine without blocking the caller's event loop.
+
+        The search runs as a coroutine of the engine's asyncio protocol, on the event loop that
+        python-chess keeps for the engine process. Cancelling this coroutine stops the search.
+        With a shared pool, the blocking pool request runs in a worker thread instead.
+        Positions found in the cache skip the engine.
 
         Returns:
             chess.Move: The move made by the Stockfish engine.
         """
-        result = self._stockfish.play(self._board, chess.engine.Limit(depth=self._stockfishDepth))
+        cached_move = self._cachedBotMove()
+        if cached_move is not None:
+            self._board.push(cached_move)
+            return cached_move
+        self._requireEngine()
+
+        started = time.monotonic()
+        if self._pool is not None:
+            result = await asyncio.to_thread(self._pool.play, self._board.copy(),
+                                             chess.engine.Limit(depth=self._stockfishDepth), game=self)
+            self._botMoveFound(result, started)
+            self._board.push(result.move)
+            return result.move
+
+        search = self._stockfish.protocol.play(self._board.copy(), chess.engine.Limit(depth=self._stockfishDepth),
+                                               game=self, ponder=self._ponder)
+        future = asyncio.run_coroutine_threadsafe(search, self._stockfish.protocol.loop)
+        result = await asyncio.wrap_future(future)
+        self._botMoveFound(result, started)
         stockfish_move = result.move
 
         self._board.push(stockfish_move)
 
         return stockfish_move
 
+    def restoreMoves(self, moves):
+        """
+        Replaces the game with the given moves, e.g. when resuming a game from a snapshot.
+
+        The board is updated in place, so the objects sharing it (MoveFinder) follow the restored game.
+
+        Args:
+            moves (list): The moves of the game in UCI notation.
+
+        Raises:
+            ValueError: If a move is not legal; the board then holds the moves before it.
+        """
+        self._ponderMove = None
+        self._ponderHit = None
+        self._board.reset()
+        for move_uci in moves:
+            self._board.push_uci(move_uci)
+
+    def getSettings(self):
+        """
+        Returns the engine settings of the game, to be saved with the game snapshot.
+
+        Returns:
+            dict: The "difficulty" (search depth) and "ponder" settings.
+        """
+        return {"difficulty": self._stockfishDepth, "ponder": self._ponder}
+
+    def setSettings(self, settings):
+        """
+        Applies engine settings returned by getSettings(), e.g. those of a resumed game.
+
+        Args:
+            settings (dict): The "difficulty" and "ponder" settings; missing keys keep their current value.
+                             Pondering is only enabled when the game owns its engine.
+        """
+        self._stockfishDepth = settings.get("difficulty", self._stockfishDepth)
+        self._ponder = settings.get("ponder", self._ponder) and self._stockfish is not None
+
+    def getPonderStats(self):
+        """
+        Returns the ponder hit statistics.
+
+        The saved time is estimated from the difference between the average bot move latency after
+        a ponder miss (a full search) and after a ponder hit.
+
+        Returns:
+            dict: A dictionary with the keys:
+                  - "hits" / "misses": number of player moves that were / were not the pondered reply
+                  - "hitRate": fraction of ponder hits (None before the first pondered move)
+                  - "avgHitTime" / "avgMissTime": average bot move latency in seconds after a hit / miss
+                  - "savedTime": estimated total latency saved by pondering, in seconds
+        """
+        hits = self._ponderStats["hits"]
+        misses = self._ponderStats["misses"]
+        avgHitTime = self._ponderStats["hitTime"] / hits if hits else None
+        avgMissTime = self._ponderStats["missTime"] / misses if misses else None
+
+        savedTime = None
+        if avgHitTime is not None and avgMissTime is not None:
+            savedTime = (avgMissTime - avgHitTime) * hits
+
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hitRate": hits / (hits + misses) if hits + misses else None,
+            "avgHitTime": avgHitTime,
+            "avgMissTime": avgMissTime,
+            "savedTime": savedTime,
+        }
+
     def endGame(self):
         """
-        Ends the game and quits the Stockfish engine.
+        Ends the game and quits the Stockfish engine. A shared pool is left running for the other games, but
+        forgets this game.
         """
-        self._stockfish.quit()
\ No newline at end of file
+        if self._pool is not None:
+            self._pool.forget(self)
+        if self._stockfish is not None:
+            self._stockfish.quit()
\ No newline at end of file
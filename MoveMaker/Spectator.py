@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import threading
+import contextlib
+import chess
+import chess.engine
+from MoveMaker.MoveMaker import STOCKFISH_PATH
+
+class Spectator:
+    """
+    This class streams a live evaluation of the game for spectators.
+
+    A separate engine process analyses the position with python-chess's engine.analysis() on a background
+    thread, and throttled updates (score, depth, principal variation, nps) are sent as JSON lines over a
+    udpSocket. The game loop only hands over positions with update(), which never blocks: the analysis
+    stops as soon as the bot is to move, so the bot's engine has the CPU to itself, and restarts on the
+    player's turn.
+
+    Attributes:
+        _socket (udpSocket): Socket the updates are sent on.
+        _engine (chess.engine.SimpleEngine): The analysis engine process.
+        _botColor (chess.Color): Color of the bot; no analysis runs while it is to move.
+        _interval (float): Minimum time between two updates in seconds.
+        _limit (chess.engine.Limit): Optional limit of every analysis, None to analyse until stopped.
+        _pending (chess.Board): Position waiting to be analysed, None to stay idle.
+        _generation (int): Incremented by every update(), so a running analysis knows it is outdated.
+        _analysis (chess.engine.SimpleAnalysisResult): The running analysis, None while idle.
+        _lock (threading.Lock): Guards the pending position, the generation and the running analysis.
+        _wakeup (threading.Event): Set when a new position is pending or the stream is closed.
+        _running (bool): True while the worker thread should keep running.
+        _published (int): Number of updates sent.
+        _worker (threading.Thread): The background analysis thread.
+
+    Methods:
+        __init__(self, socket, enginePath, botColor, rate, threads, hashSize, nice, limit): Starts the analysis engine.
+        update(self, board): Hands over the current position of the game.
+        getPublished(self): Returns the number of updates sent.
+        close(self): Stops the analysis and quits the engine.
+    """
+
+    def __init__(self, socket, enginePath=STOCKFISH_PATH, botColor=chess.BLACK, rate=2.0, threads=1, hashSize=16, nice=10, limit=None):
+        """
+        Initializes the Spectator object and starts its engine process and worker thread.
+
+        Args:
+            socket (udpSocket): Socket the updates are sent on.
+            enginePath (str, optional): Path to the UCI engine executable. Defaults to STOCKFISH_PATH.
+            botColor (chess.Color, optional): Color of the bot. Defaults to chess.BLACK.
+            rate (float, optional): Maximum number of updates per second. Defaults to 2.0.
+            threads (int, optional): UCI Threads of the analysis engine. Defaults to 1.
+            hashSize (int, optional): UCI Hash of the analysis engine in MB. Defaults to 16.
+            nice (int, optional): Niceness added to the engine process, so the bot's engine and the
+                                  camera pipeline win when the CPU is short; None to keep the priority.
+                                  Defaults to 10.
+            limit (chess.engine.Limit, optional): Limit of every analysis, e.g. a maximum depth.
+                                                  Defaults to None (analyse until the position changes).
+        """
+        popen_args = {"preexec_fn": lambda: os.nice(nice)} if nice else {}
+        self._engine = chess.engine.SimpleEngine.popen_uci(enginePath, **popen_args)
+        options = {"Threads": threads, "Hash": hashSize}
+        self._engine.configure({name: value for name, value in options.items() if name in self._engine.options})
+
+        self._socket = socket
+        self._botColor = botColor
+        self._interval = 1.0 / rate
+        self._limit = limit
+        self._pending = None
+        self._generation = 0
+        self._analysis = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._running = True
+        self._published = 0
+        self._worker = threading.Thread(target=self._run, name="Spectator", daemon=True)
+        self._worker.start()
+
+    def update(self, board):
+        """
+        Hands over the current position of the game. Returns immediately.
+
+        The running analysis is stopped; a new one starts on the position unless the bot is to move
+        or the game is over.
+
+        Args:
+            board (chess.Board): The current position; a copy is analysed.
+        """
+        analyse = board.turn != self._botColor and not board.is_game_over()
+        with self._lock:
+            self._pending = board.copy() if analyse else None
+            self._generation += 1
+            if self._analysis is not None:
+                self._analysis.stop()  # Only schedules the "stop" command on the engine's event loop
+        self._wakeup.set()
+
+    def _run(self):
+        """
+        Body of the worker thread: analyses the pending positions one after the other.
+        """
+        while self._running:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            with self._lock:
+                board, generation = self._pending, self._generation
+            if board is None or not self._running:
+                continue
+
+            try:
+                with self._engine.analysis(board, self._limit) as analysis:
+                    with self._lock:
+                        if generation != self._generation:
+                            continue  # The position changed while the analysis was starting
+                        self._analysis = analysis
+                    self._publishAll(board, analysis)
+            except (chess.engine.EngineError, chess.engine.EngineTerminatedError):
+                break  # The stream is only for spectators: it ends quietly with its engine
+            finally:
+                with self._lock:
+                    self._analysis = None
+
+    def _publishAll(self, board, analysis):
+        """
+        Sends throttled updates of a running analysis until it is stopped.
+
+        Args:
+            board (chess.Board): The analysed position.
+            analysis (chess.engine.SimpleAnalysisResult): The running analysis.
+        """
+        last = 0.0
+        latest = None
+        for info in analysis:
+            if "score" in info and "pv" in info:
+                latest = info
+            now = time.monotonic()
+            if latest is not None and now - last >= self._interval:
+                self._publish(board, latest)
+                latest = None
+                last = now
+
+    def _publish(self, board, info):
+        """
+        Sends one update.
+
+        The score is given from white's point of view, in centipawns or as moves to mate.
+
+        Args:
+            board (chess.Board): The analysed position.
+            info (dict): The analysis info (chess.engine.InfoDict).
+        """
+        score = info["score"].white()
+        record = {
+            "type": "eval",
+            "time": round(time.time(), 3),
+            "fen": board.fen(),
+            "ply": board.ply(),
+            "depth": info.get("depth"),
+            "cp": score.score(),
+            "mate": score.mate(),
+            "pv": [move.uci() for move in info["pv"]],
+            "nps": info.get("nps"),
+        }
+        self._socket.update_status(json.dumps(record, separators=(",", ":")) + "\n")
+        self._published += 1
+
+    def getPublished(self):
+        """
+        Returns the number of updates sent.
+
+        Returns:
+            int: The number of updates.
+        """
+        return self._published
+
+    def close(self):
+        """
+        Stops the analysis, the worker thread and the engine process.
+        """
+        with self._lock:
+            self._running = False
+            self._pending = None
+            if self._analysis is not None:
+                self._analysis.stop()
+        self._wakeup.set()
+        self._worker.join()
+        with contextlib.suppress(Exception):
+            self._engine.quit()
@@ -0,0 +1,229 @@
+import os
+import sys
+import tty
+import time
+import random
+import select
+import argparse
+import threading
+import chess
+from collections import deque
+from MotionPlanner.MotionPlanner import MotionPlanner, travelTime, GRAB_TIME
+from Utilities.Serial_Link import (serialLink, frameDecoder, encodeFrame, encodeCommands, decodeCommands, COMMAND,
+                                   FRAME_BATCH, FRAME_ACK, FRAME_NAK, FRAME_DONE, COMMAND_MOVE)
+
+class firmwareEmulator:
+    """
+    This class stands in for the SteppersControl firmware on a pseudo-terminal.
+
+    The host opens get_port() like the serial device of the Arduino. The emulator receives the bytes at the
+    line rate, acknowledges the batches in order, answers corrupted frames with a NAK, and executes the
+    batches one after the other with the timing of the firmware (see MotionPlanner.travelTime), reporting
+    each one with a DONE frame. Like the receive buffer of the board, at most buffer_frames batches wait
+    for execution; further batches are dropped unacknowledged until there is room again.
+
+    Attributes:
+        _master (int): Master side of the pseudo-terminal.
+        _slave (int): Slave side, kept open so the terminal survives the host closing its side.
+        _baudrate (int): Emulated line speed.
+        _time_scale (float): Factor applied to the execution time, 0 to execute instantly.
+        _error_rate (float): Probability that a received chunk of bytes is corrupted.
+        _buffer_frames (int): Maximum number of batches waiting for execution.
+        _random (random.Random): Source of the injected errors.
+        _expected (int): Next expected 8-bit sequence number.
+        _queue (collections.deque): Received (seq, commands) batches waiting for execution.
+        _position (tuple): Current (x, y) position of the head in steps.
+        _executed (list): Every executed (opcode, x, y) command.
+        _write_lock (threading.Lock): Serialises the frames written by both threads.
+        _ready (threading.Condition): Signals new batches to the executor thread.
+        _running (bool): True while the threads should keep running.
+    """
+
+    def __init__(self, baudrate=115200, time_scale=1.0, error_rate=0.0, buffer_frames=8, seed=0):
+        """
+        Creates the pseudo-terminal and starts the receiver and executor threads.
+
+        Args:
+            baudrate (int, optional): Emulated line speed. Defaults to 115200, the speed of the firmware.
+            time_scale (float, optional): Factor applied to the execution time. Defaults to 1.0 (real time).
+            error_rate (float, optional): Probability that a received chunk of bytes is corrupted. Defaults to 0.0.
+            buffer_frames (int, optional): Maximum number of batches waiting for execution. Defaults to 8.
+            seed (int, optional): Seed of the injected errors. Defaults to 0.
+        """
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._master)
+        self._baudrate = baudrate
+        self._time_scale = time_scale
+        self._error_rate = error_rate
+        self._buffer_frames = buffer_frames
+        self._random = random.Random(seed)
+        self._expected = 0
+        self._queue = deque()
+        self._position = (0, 0)
+        self._executed = []
+        self._write_lock = threading.Lock()
+        self._ready = threading.Condition()
+        self._running = True
+        self._threads = [threading.Thread(target=self._receive_loop, name="Emulator-receiver", daemon=True),
+                         threading.Thread(target=self._execute_loop, name="Emulator-executor", daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def get_port(self):
+        """
+        Returns the path the host opens as serial device.
+
+        Returns:
+            str: Path of the slave side of the pseudo-terminal.
+        """
+        return os.ttyname(self._slave)
+
+    def get_executed(self):
+        """
+        Returns the commands executed so far.
+
+        Returns:
+            list: (opcode, x, y) tuples.
+        """
+        with self._ready:
+            return list(self._executed)
+
+    def _write(self, seq, kind):
+        """
+        Sends a control frame to the host.
+        """
+        with self._write_lock:
+            os.write(self._master, encodeFrame(seq, kind))
+
+    def _receive_loop(self):
+        """
+        Body of the receiver thread: decodes the incoming frames and acknowledges them.
+        """
+        decoder = frameDecoder()
+        while self._running:
+            readable, _, _ = select.select([self._master], [], [], 0.05)
+            if not readable:
+                continue
+            try:
+                data = os.read(self._master, 4096)
+            except OSError:
+                break
+            time.sleep(len(data) * 10 / self._baudrate)  # 10 bits per byte on the line
+
+            if self._error_rate and self._random.random() < self._error_rate:
+                data = bytearray(data)
+                data[self._random.randrange(len(data))] ^= 0xFF
+
+            for seq, kind, payload in decoder.feed(bytes(data)):
+                if seq is None:
+                    self._write(self._expected, FRAME_NAK)
+                elif kind == FRAME_BATCH:
+                    with self._ready:
+                        if seq == self._expected and len(self._queue) < self._buffer_frames:
+                            self._queue.append((seq, decodeCommands(payload)))
+                            self._expected = (self._expected + 1) & 0xFF
+                            self._ready.notify()
+                        elif seq == self._expected:
+                            continue  # No room: the host resends after its timeout
+                    self._write(self._expected, FRAME_ACK)
+
+    def _execute_loop(self):
+        """
+        Body of the executor thread: runs the queued batches with the timing of the firmware.
+        """
+        while self._running:
+            with self._ready:
+                if not self._ready.wait_for(lambda: self._queue or not self._running, 0.1) or not self._queue:
+                    continue
+                seq, commands = self._queue[0]
+
+            duration = 0.0
+            for opcode, x, y in commands:
+                if opcode == COMMAND_MOVE:
+                    duration += travelTime(x - self._position[0], y - self._position[1])
+                    self._position = (x, y)
+                else:
+                    duration += GRAB_TIME
+            if self._time_scale:
+                time.sleep(duration * self._time_scale)
+
+            with self._ready:
+                self._queue.popleft()
+                self._executed.extend(commands)
+            self._write(seq, FRAME_DONE)
+
+    def close(self):
+        """
+        Stops the threads and closes the pseudo-terminal.
+        """
+        self._running = False
+        with self._ready:
+            self._ready.notify_all()
+        for thread in self._threads:
+            thread.join()
+        os.close(self._master)
+        os.close(self._slave)
+
+def benchmark(plans, window, time_scale, error_rate, per_command=False):
+    """
+    Sends the bot moves of random games through a serialLink to the emulator.
+
+    Args:
+        plans (int): Number of moves to send.
+        window (int): Window of the link, 1 for stop-and-wait.
+        time_scale (float): Execution time factor of the emulator.
+        error_rate (float): Corruption probability of the emulator.
+        per_command (bool, optional): Send every command alone and wait until it is executed, as a
+                                      command-per-round-trip protocol would. Defaults to False.
+
+    Returns:
+        dict: The link statistics, with the elapsed time and the number of plans and commands.
+    """
+    emulator = firmwareEmulator(time_scale=time_scale, error_rate=error_rate)
+    link = serialLink(emulator.get_port(), window=window)
+    planner = MotionPlanner()
+    rng = random.Random(1)
+    board = chess.Board()
+    commands = 0
+    try:
+        started = time.monotonic()
+        for _ in range(plans):
+            if board.is_game_over():
+                board.reset()
+                planner.reset()
+            before = board.copy(stack=False)
+            board.push(rng.choice(list(board.legal_moves)))
+            plan = planner.planMove(before, board)
+            if per_command:
+                encoded = encodeCommands(plan.actions)
+                for offset in range(0, len(encoded), COMMAND.size):
+                    link.send(encoded[offset:offset + COMMAND.size])
+                    link.waitExecuted()
+            else:
+                link.sendPlan(plan)
+                if window == 1:
+                    link.waitAcked()
+        link.waitExecuted()
+        elapsed = time.monotonic() - started
+        commands = len(emulator.get_executed())
+        stats = link.get_stats()
+    finally:
+        link.close()
+        emulator.close()
+    stats.update(plans=plans, commands=commands, elapsed=elapsed)
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the serial link against the firmware emulator")
+    parser.add_argument("--plans", type=int, default=200, help="number of moves to send")
+    parser.add_argument("--windows", type=int, nargs="+", default=[1, 8], help="link windows to compare")
+    parser.add_argument("--time-scale", type=float, default=0.0, help="execution time factor, 0 for instant execution")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of a corrupted chunk")
+    args = parser.parse_args()
+
+    runs = [("per command", 1, True)] + [(f"window {window}", window, False) for window in args.windows]
+    for name, window, per_command in runs:
+        stats = benchmark(args.plans, window, args.time_scale, args.error_rate, per_command)
+        print(f"{name}: {stats['plans'] / stats['elapsed']:.1f} plans/s, {stats['commands']} commands, "
+              f"ack latency {stats['ack_latency'] * 1000:.2f} ms, {stats['resent']} resent, {stats['errors']} errors")
+    sys.exit(0)
@@ -0,0 +1,76 @@
+import os
+import cv2
+import queue
+import threading
+
+class frameArchiver:
+    """
+    This class is responsible for archiving captured frames to disk without blocking the game loop.
+
+    Frames are handed over in memory and written as JPEG images by a background thread.
+    If the disk cannot keep up, new frames are dropped instead of delaying the caller.
+
+    Attributes:
+        _directory (str): The directory in which the frames are saved.
+        _prefix (str): File name prefix of the saved frames.
+        _queue (queue.Queue): Frames waiting to be written, as (index, frame) tuples.
+        _index (int): Index of the next frame to archive.
+        _dropped (int): Number of frames dropped because the queue was full.
+        _writer (threading.Thread): The background writer thread.
+    """
+
+    def __init__(self, directory, prefix="frame", max_pending=8):
+        """
+        Initializes the frameArchiver object and starts the writer thread.
+
+        Args:
+            directory (str): The directory in which the frames are saved. It is created if missing.
+            prefix (str, optional): File name prefix of the saved frames. Defaults to "frame".
+            max_pending (int, optional): Maximum number of frames waiting to be written. Defaults to 8.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._prefix = prefix
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._index = 0
+        self._dropped = 0
+        self._writer = threading.Thread(target=self._write_loop, name="frameArchiver-writer", daemon=True)
+        self._writer.start()
+
+    def submit(self, frame):
+        """
+        Queues a frame for archiving. Never blocks.
+
+        The frame is not copied, so the caller must not modify it afterwards.
+
+        Args:
+            frame (numpy.ndarray): The BGR frame to archive.
+
+        Returns:
+            bool: True if the frame was queued, False if it was dropped.
+        """
+        try:
+            self._queue.put_nowait((self._index, frame))
+        except queue.Full:
+            self._dropped += 1
+            return False
+        self._index += 1
+        return True
+
+    def _write_loop(self):
+        """
+        Body of the writer thread: encodes queued frames until a None sentinel is received.
+        """
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            index, frame = item
+            cv2.imwrite(os.path.join(self._directory, f"{self._prefix}_{index:06d}.jpg"), frame)
+
+    def close(self):
+        """
+        Writes the remaining queued frames and stops the writer thread.
+        """
+        self._queue.put(None)
+        self._writer.join()
@@ -0,0 +1,117 @@
+import os
+import json
+import time
+import zipfile
+import chess
+import numpy as np
+from Utilities.Metrics import metrics
+
+SNAPSHOT_VERSION = 1
+
+class gameSnapshot:
+    """
+    This class keeps a crash-safe snapshot of the running game on disk.
+
+    The snapshot holds the move stack, the board geometry learned by the detector (square rectangles, frame
+    shape and corner landmarks) and the engine settings, in one uncompressed NumPy .npz file
+    of a few kilobytes. Every save writes a temporary file next to the snapshot, flushes it to the disk and
+    renames it over the previous one, so a crash or power loss leaves either the old or the new snapshot,
+    never a torn one.
+
+    Attributes:
+        _path (str): Path of the snapshot file.
+    """
+
+    def __init__(self, path):
+        """
+        Initializes the gameSnapshot object.
+
+        Args:
+            path (str): Path of the snapshot file. Its directory is created if missing.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._path = path
+
+    @metrics.timed("snapshot.save")
+    def save(self, moves, calibration=None, settings=None):
+        """
+        Atomically replaces the snapshot.
+
+        Args:
+            moves (list): The moves of the game in UCI notation.
+            calibration (dict, optional): Calibration of the detector, see ChessboardDetector.get_calibration().
+                                          Defaults to None.
+            settings (dict, optional): Engine settings, see MoveMaker.getSettings(). Defaults to None.
+        """
+        meta = {"version": SNAPSHOT_VERSION, "time": round(time.time(), 3), "moves": list(moves), "settings": settings or {}}
+        arrays = {}
+        if calibration is not None and calibration.get("square_rects") is not None:
+            meta["geometry_shape"] = list(calibration["geometry_shape"]) if calibration.get("geometry_shape") is not None else None
+            arrays["square_rects"] = np.asarray(calibration["square_rects"])
+            for index, landmark in enumerate(calibration.get("landmarks") or []):
+                arrays[f"landmark{index}"] = landmark  # The patches differ in size when clipped at the frame border
+
+        temporary = f"{self._path}.tmp"
+        with open(temporary, "wb") as file:
+            np.savez(file, meta=np.array(json.dumps(meta, separators=(",", ":"))), **arrays)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self._path)
+        self._sync_directory()
+
+    def _sync_directory(self):
+        """
+        Flushes the directory entry of the rename to the disk, where the platform allows it.
+        """
+        try:
+            descriptor = os.open(os.path.dirname(os.path.abspath(self._path)), os.O_RDONLY)
+        except OSError:
+            return  # Directories cannot be opened on Windows; the rename is durable there
+        try:
+            os.fsync(descriptor)
+        except OSError:
+            pass
+        finally:
+            os.close(descriptor)
+
+    def load(self):
+        """
+        Reads the snapshot.
+
+        The moves are replayed on a fresh board, so a snapshot that does not describe a legal game is rejected.
+
+        Returns:
+            dict: The "board" (chess.Board), "moves", "settings" and "calibration" (None if the snapshot has no
+                  geometry) of the snapshot, or None if there is no readable snapshot.
+        """
+        try:
+            with np.load(self._path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                if meta.get("version") != SNAPSHOT_VERSION:
+                    return None
+                calibration = None
+                if "square_rects" in data:
+                    landmarks = [data[f"landmark{index}"] for index in range(4) if f"landmark{index}" in data]
+                    calibration = {
+                        "square_rects": data["square_rects"],
+                        "geometry_shape": tuple(meta["geometry_shape"]) if meta.get("geometry_shape") else None,
+                        "landmarks": landmarks if len(landmarks) == 4 else None,
+                    }
+            board = chess.Board()
+            for move_uci in meta["moves"]:
+                board.push_uci(move_uci)
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            return None  # Missing, torn or illegal snapshot
+
+        return {"board": board, "moves": meta["moves"], "settings": meta["settings"], "calibration": calibration}
+
+    def discard(self):
+        """
+        Deletes the snapshot, e.g. once the game is over.
+        """
+        for path in (self._path, f"{self._path}.tmp"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
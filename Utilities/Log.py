@@ -1,28 +1,67 @@
-from UDP_Socket import udpSocket
-from log_comments import getLogComment
+import json
+import time
+import threading
+from collections import deque
+from Utilities.UDP_Socket import udpSocket
+from Utilities.log_comments import getLogComment, LOG_PRIORITIES, PRIORITY_KEEP
 from datetime import datetime
 
 class Log:
     """
     This class is responsible for logging messages and sending them over a UDP socket.
 
+    It supports two modes of operation:
+        - Text mode (default): every log() call formats a timestamped message and sends it right away.
+        - Structured mode: log() only appends a (timestamp, statusType, code, payload) record to a queue.
+          A background thread batches the records as JSON lines into datagrams of at most mtu bytes.
+          The receiver resolves the messages from the template table in log_comments (see Log_Decoder).
+
     Attributes:
         _socket (udpSocket): An instance of the udpSocket class used for sending messages over UDP.
+        _structured (bool): True in structured mode.
+        _mtu (int): Maximum size of a structured datagram in bytes.
+        _max_pending (int): Queue length above which low-priority records are dropped.
+        _flush_interval (float): Maximum delay before a low-priority record is sent.
+        _queue (collections.deque): Pending records. Appending and popping need no lock.
+        _seq (int): Sequence number of the next record, so the receiver can detect lost datagrams.
+        _dropped (int): Number of records dropped under backpressure and not reported yet.
+        _wakeup (threading.Event): Set to flush the queue right away.
+        _running (bool): True while the sender thread should keep running.
+        _sender (threading.Thread): The background sender thread, None in text mode.
 
     Methods:
-        __init__(self, ip, port): Initializes the Log instance with the specified IP address and port number.
-        log(self, status): Logs a message based on the provided status and sends it over the UDP socket.
+        __init__(self, ip, port, structured, mtu, max_pending, flush_interval): Initializes the Log instance.
+        log(self, status): Logs a message based on the provided status.
+        close(self): Sends the pending records and stops the sender thread.
     """
 
-    def __init__(self, ip, port):
+    def __init__(self, ip, port, structured=False, mtu=1400, max_pending=1024, flush_interval=0.1):
         """
         Initializes the Log instance with the specified IP address and port number.
 
         Args:
             ip (str): The IP address to which the UDP socket should bind.
             port (int): The port number to which the UDP socket should bind.
+            structured (bool, optional): Use the batched structured mode. Defaults to False.
+            mtu (int, optional): Maximum size of a structured datagram in bytes. Defaults to 1400.
+            max_pending (int, optional): Queue length above which low-priority records are dropped. Defaults to 1024.
+            flush_interval (float, optional): Maximum delay in seconds before a low-priority record is sent. Defaults to 0.1.
         """
         self._socket = udpSocket(ip, port)
+        self._structured = structured
+        self._mtu = mtu
+        self._max_pending = max_pending
+        self._flush_interval = flush_interval
+        self._queue = deque()
+        self._seq = 0
+        self._dropped = 0
+        self._wakeup = threading.Event()
+        self._running = structured
+        self._sender = None
+
+        if structured:
+            self._sender = threading.Thread(target=self._send_loop, name="Log-sender", daemon=True)
+            self._sender.start()
 
     def log(self, status):
         """
@@ -30,11 +69,13 @@ class Log:
 
         Args:
             status (list): A list containing two elements:
-                - status[0] (int): A numeric status code.
+                - status[0] (int): A numeric status code. For 'playerMoveStatus' and 'planStatus' a [code, move]
+                  pair, for 'botMoveStatus' the move, for 'bootStatus' optionally a [code, phase timings] pair.
                 - status[1] (str): A string identifier for the log message.
 
         Returns:
-            str: The sealed message that was sent over the UDP socket.
+            str: The sealed message that was sent over the UDP socket in text mode. In structured mode the
+                 queued (timestamp, statusType, code, payload) record, or None if it was dropped.
 
         The log message format is as follows:
         [YYYY/MM/DD/HH:MM:SS] -> <log_message>
@@ -43,6 +84,8 @@ class Log:
             - YYYY/MM/DD/HH:MM:SS is the current timestamp.
             - <log_message> is the log message obtained from the getLogComment function based on the provided status.
         """
+        if self._structured:
+            return self._enqueue(status)
 
         # Get the current timestamp
         current_time = datetime.now()
@@ -60,4 +103,95 @@ class Log:
         self._socket.update_status(sealed_message)
 
         # Return the sealed message
-        return sealed_message
\ No newline at end of file
+        return sealed_message
+
+    def _enqueue(self, status):
+        """
+        Turns a status into a structured record and queues it, dropping it if the queue is backed up
+        and the record has a low priority.
+
+        Args:
+            status (list): The status, as passed to log().
+
+        Returns:
+            tuple: The queued record, or None if it was dropped.
+        """
+        value, statusType = status
+        if statusType in ('playerMoveStatus', 'planStatus') or (statusType == 'bootStatus' and isinstance(value, list)):
+            code, payload = value[0], str(value[1])
+        elif statusType == 'botMoveStatus':
+            code, payload = 0, str(value)
+        else:
+            code, payload = value, None
+
+        priority = LOG_PRIORITIES.get(statusType, 0)
+        if priority < PRIORITY_KEEP and len(self._queue) >= self._max_pending:
+            self._dropped += 1
+            return None
+
+        record = (time.time(), statusType, code, payload)
+        self._queue.append(record)
+        if priority >= PRIORITY_KEEP:
+            self._wakeup.set()  # Game events go out without waiting for the flush interval
+        return record
+
+    def _send_loop(self):
+        """
+        Body of the sender thread: drains the queue every flush interval, or earlier when woken up.
+        """
+        while self._running:
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            self._flush()
+        self._flush()
+
+    def _flush(self):
+        """
+        Sends all queued records, packed as JSON lines into datagrams of at most mtu bytes.
+        """
+        batch = []
+        size = 0
+
+        while self._queue:
+            timestamp, statusType, code, payload = self._queue.popleft()
+            line = json.dumps({"type": "log", "seq": self._seq, "time": round(timestamp, 3), "status": statusType,
+                               "code": code, "payload": payload}, separators=(",", ":")) + "\n"
+            self._seq += 1
+            batch, size = self._pack(batch, size, line)
+
+        if self._dropped:
+            dropped, self._dropped = self._dropped, 0
+            line = json.dumps({"type": "dropped", "time": round(time.time(), 3), "count": dropped}, separators=(",", ":")) + "\n"
+            batch, size = self._pack(batch, size, line)
+
+        if batch:
+            self._socket.update_status("".join(batch))
+
+    def _pack(self, batch, size, line):
+        """
+        Appends a line to the current datagram, sending the datagram first if the line would not fit.
+
+        Args:
+            batch (list): Lines of the current datagram.
+            size (int): Size of the current datagram in bytes.
+            line (str): The line to append.
+
+        Returns:
+            tuple: The new (batch, size) of the current datagram.
+        """
+        length = len(line.encode('utf-8'))
+        if batch and size + length > self._mtu:
+            self._socket.update_status("".join(batch))
+            batch, size = [], 0
+        batch.append(line)
+        return batch, size + length
+
+    def close(self):
+        """
+        Sends the pending records and stops the sender thread. Does nothing in text mode.
+        """
+        if self._sender is not None:
+            self._running = False
+            self._wakeup.set()
+            self._sender.join()
+            self._sender = None
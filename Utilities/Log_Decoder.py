@@ -0,0 +1,133 @@
+import sys
+import json
+import socket
+import argparse
+from datetime import datetime
+from Utilities.log_comments import formatLogComment
+
+def decodeDatagram(data):
+    """
+    Decodes one datagram received on the logging port.
+
+    A datagram is either a legacy text message, a metrics packet or a batch of structured log records,
+    one JSON object per line.
+
+    Args:
+        data (bytes): The received datagram.
+
+    Returns:
+        list: The decoded records as dictionaries. Structured log records get their resolved "message";
+              legacy text messages are returned as {"type": "text", "message": ...}.
+    """
+    text = data.decode('utf-8')
+    if not text.startswith("{"):
+        return [{"type": "text", "message": text.rstrip("\n")}]
+
+    records = []
+    for line in text.splitlines():
+        if not line:
+            continue
+        record = json.loads(line)
+        if record.get("type") == "log":
+            record["message"] = formatLogComment(record["status"], record["code"], record.get("payload"))
+        records.append(record)
+    return records
+
+def formatRecord(record):
+    """
+    Formats a decoded record as one line of text.
+
+    Log records use the format of the text mode of Log: [YYYY/MM/DD/HH:MM:SS] -> <log_message>
+    Spectator evaluations show the score from white's point of view, the depth and the principal variation.
+
+    Args:
+        record (dict): A record returned by decodeDatagram().
+
+    Returns:
+        str: The formatted line.
+    """
+    kind = record.get("type")
+    if kind == "text":
+        return record["message"]
+    timestamp = datetime.fromtimestamp(record["time"]).strftime("%Y/%m/%d/%H:%M:%S")
+    if kind == "log":
+        return f"[{timestamp}] -> {record['message']}"
+    if kind == "dropped":
+        return f"[{timestamp}] -> {record['count']} low-priority records were dropped"
+    if kind == "eval":
+        score = f"#{record['mate']}" if record["mate"] is not None else f"{record['cp'] / 100:+.2f}"
+        return f"[{timestamp}] -> Evaluation {score} at depth {record['depth']}: {' '.join(record['pv'])}"
+    return f"[{timestamp}] -> {json.dumps(record, separators=(',', ':'))}"
+
+class logDecoder:
+    """
+    This class is responsible for receiving the datagrams of the logging port and decoding them.
+
+    It also follows the sequence numbers of the structured records to count the lost ones.
+
+    Attributes:
+        _socket (socket.socket): The bound UDP socket.
+        _next_seq (int): Sequence number expected for the next structured log record, None before the first one.
+        _lost (int): Number of structured log records lost in transit so far.
+    """
+
+    def __init__(self, ip, port):
+        """
+        Initializes the logDecoder object and binds its socket.
+
+        Args:
+            ip (str): The IP address to listen on.
+            port (int): The port number to listen on.
+        """
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind((ip, port))
+        self._next_seq = None
+        self._lost = 0
+
+    def receive(self):
+        """
+        Waits for the next datagram and decodes it.
+
+        Returns:
+            list: The decoded records, see decodeDatagram().
+        """
+        data, _ = self._socket.recvfrom(65535)
+        records = decodeDatagram(data)
+        for record in records:
+            if record.get("type") == "log":
+                if self._next_seq is not None and record["seq"] > self._next_seq:
+                    self._lost += record["seq"] - self._next_seq
+                self._next_seq = record["seq"] + 1
+        return records
+
+    def get_lost(self):
+        """
+        Returns the number of structured log records lost in transit so far.
+
+        Returns:
+            int: The number of lost records.
+        """
+        return self._lost
+
+    def close(self):
+        """
+        Closes the socket.
+        """
+        self._socket.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print the messages sent to the RoboChess logging port")
+    parser.add_argument("--ip", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=10369, help="port to listen on")
+    parser.add_argument("--json", action="store_true", help="print the decoded records as JSON lines")
+    args = parser.parse_args()
+
+    decoder = logDecoder(args.ip, args.port)
+    try:
+        while True:
+            for record in decoder.receive():
+                print(json.dumps(record) if args.json else formatRecord(record))
+    except KeyboardInterrupt:
+        sys.exit(0)
+    finally:
+        decoder.close()
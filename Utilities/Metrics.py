@@ -0,0 +1,272 @@
+import json
+import time
+import bisect
+import inspect
+import functools
+import threading
+import contextlib
+
+class Metrics:
+    """
+    This class is responsible for collecting timings and counters across the game loop and sending them
+    periodically as one compact JSON packet over a UDP socket.
+
+    Timings are measured with the monotonic clock and kept in fixed logarithmic histograms, so recording a
+    sample is a bisection and an increment. Every packet covers the window since the previous one, after
+    which the histograms and counters start over. While disabled, timer() returns a shared no-op context
+    manager and timed() functions only check one flag, so the instrumentation can stay in the code.
+
+    Attributes:
+        _enabled (bool): True while samples are recorded.
+        _lock (threading.Lock): Guards the histograms and counters, which are fed from several threads.
+        _histograms (dict): Per timer name, a list [bucket counts, sample count, total seconds, max seconds].
+        _counters (dict): Counter values by name.
+        _window_start (float): Monotonic time at which the current window started.
+        _socket (udpSocket): Socket the packets are sent over, None if they are only collected.
+        _interval (float): Seconds between two packets.
+        _running (bool): True while the emitter thread should keep running.
+        _wakeup (threading.Event): Set to stop the emitter thread.
+        _emitter (threading.Thread): The background emitter thread.
+
+    Methods:
+        __init__(self): Initializes a disabled registry.
+        start(self, socket, interval): Enables the registry and starts sending packets.
+        stop(self): Sends the last packet and disables the registry.
+        timer(self, name): Context manager timing a block.
+        timed(self, name): Decorator timing every call of a function.
+        observe(self, name, seconds): Records one timing sample.
+        count(self, name, value): Increments a counter.
+        snapshot(self, reset): Returns the percentiles and counters of the current window.
+        packet(self): Returns the current window as a metrics packet, starting a new window.
+    """
+
+    # Upper bounds of the histogram buckets in seconds: 50 us to about 26 s, doubling
+    BUCKETS = tuple(0.00005 * 2 ** index for index in range(20))
+
+    def __init__(self):
+        """
+        Initializes a disabled Metrics registry.
+        """
+        self._enabled = False
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._window_start = time.monotonic()
+        self._socket = None
+        self._interval = 5.0
+        self._running = False
+        self._wakeup = threading.Event()
+        self._emitter = None
+
+    def start(self, socket=None, interval=5.0):
+        """
+        Enables the registry and starts a background thread sending a metrics packet every interval.
+
+        Args:
+            socket (udpSocket, optional): The socket to send the packets over. Defaults to None (collect only).
+            interval (float, optional): Seconds between two packets. Defaults to 5.0.
+        """
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._window_start = time.monotonic()
+        self._socket = socket
+        self._interval = interval
+        self._enabled = True
+
+        if socket is not None and not self._running:
+            self._running = True
+            self._wakeup.clear()
+            self._emitter = threading.Thread(target=self._emit_loop, name="metrics-emitter", daemon=True)
+            self._emitter.start()
+
+    def stop(self):
+        """
+        Stops the emitter thread after sending the last packet, and disables the registry.
+        """
+        if self._running:
+            self._running = False
+            self._wakeup.set()
+            self._emitter.join()
+        self._enabled = False
+
+    def _emit_loop(self):
+        """
+        Body of the emitter thread: sends one packet per interval, and a last one when stopped.
+        """
+        while self._running:
+            self._wakeup.wait(self._interval)
+            self._socket.update_status(self.packet())
+
+    def timer(self, name):
+        """
+        Returns a context manager that records the duration of its block.
+
+        Args:
+            name (str): Name of the timer, e.g. "detector.detect_lines".
+
+        Returns:
+            A context manager; a shared no-op one while the registry is disabled.
+        """
+        if not self._enabled:
+            return _NO_TIMER
+        return _Timer(self, name)
+
+    def timed(self, name):
+        """
+        Decorator recording the duration of every call of a function or coroutine function.
+
+        The enabled flag is checked on every call, so functions decorated at import time follow start() and stop().
+
+        Args:
+            name (str): Name of the timer.
+
+        Returns:
+            callable: The decorator.
+        """
+        def decorator(function):
+            if inspect.iscoroutinefunction(function):
+                @functools.wraps(function)
+                async def async_wrapper(*args, **kwargs):
+                    if not self._enabled:
+                        return await function(*args, **kwargs)
+                    start = time.monotonic()
+                    try:
+                        return await function(*args, **kwargs)
+                    finally:
+                        self.observe(name, time.monotonic() - start)
+                return async_wrapper
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self._enabled:
+                    return function(*args, **kwargs)
+                start = time.monotonic()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.observe(name, time.monotonic() - start)
+            return wrapper
+        return decorator
+
+    def observe(self, name, seconds):
+        """
+        Records one timing sample.
+
+        Args:
+            name (str): Name of the timer.
+            seconds (float): The measured duration.
+        """
+        if not self._enabled:
+            return
+        bucket = bisect.bisect_left(self.BUCKETS, seconds)
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = [[0] * (len(self.BUCKETS) + 1), 0, 0.0, 0.0]
+            histogram[0][bucket] += 1
+            histogram[1] += 1
+            histogram[2] += seconds
+            if seconds > histogram[3]:
+                histogram[3] = seconds
+
+    def count(self, name, value=1):
+        """
+        Increments a counter.
+
+        Args:
+            name (str): Name of the counter, e.g. "frames.detected".
+            value (int, optional): The increment. Defaults to 1.
+        """
+        if not self._enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def _percentile(self, buckets, samples, maximum, fraction):
+        """
+        Estimates a percentile from histogram buckets, as the upper bound of the bucket holding it.
+
+        Args:
+            buckets (list): The bucket counts.
+            samples (int): The number of samples.
+            maximum (float): The largest sample, which bounds the estimate.
+            fraction (float): The percentile as a fraction, e.g. 0.95.
+
+        Returns:
+            float: The estimated percentile in seconds.
+        """
+        rank = fraction * samples
+        seen = 0
+        for index, bucket_count in enumerate(buckets):
+            seen += bucket_count
+            if seen >= rank:
+                return min(self.BUCKETS[index], maximum) if index < len(self.BUCKETS) else maximum
+        return maximum
+
+    def snapshot(self, reset=False):
+        """
+        Summarizes the current window.
+
+        Args:
+            reset (bool, optional): Start a new window afterwards. Defaults to False.
+
+        Returns:
+            dict: "window" (seconds covered), "timers" (per name: sample count "n", "mean", "p50", "p95",
+                  "p99" and "max" in milliseconds) and "counters".
+        """
+        with self._lock:
+            now = time.monotonic()
+            histograms, counters, window = self._histograms, self._counters, now - self._window_start
+            if reset:
+                self._histograms, self._counters, self._window_start = {}, {}, now
+            else:
+                histograms = {name: [list(h[0])] + h[1:] for name, h in histograms.items()}
+                counters = dict(counters)
+
+        timers = {}
+        for name, (buckets, samples, total, maximum) in histograms.items():
+            timers[name] = {
+                "n": samples,
+                "mean": round(total / samples * 1000.0, 3),
+                "p50": round(self._percentile(buckets, samples, maximum, 0.50) * 1000.0, 3),
+                "p95": round(self._percentile(buckets, samples, maximum, 0.95) * 1000.0, 3),
+                "p99": round(self._percentile(buckets, samples, maximum, 0.99) * 1000.0, 3),
+                "max": round(maximum * 1000.0, 3),
+            }
+        return {"window": round(window, 3), "timers": timers, "counters": counters}
+
+    def packet(self):
+        """
+        Builds the metrics packet of the current window and starts a new window.
+
+        Returns:
+            str: A single line of compact JSON: {"type": "metrics", "time": <unix time>, "window": ..., "timers": ..., "counters": ...}
+        """
+        packet = dict(type="metrics", time=round(time.time(), 3), **self.snapshot(reset=True))
+        return json.dumps(packet, separators=(",", ":")) + "\n"
+
+class _Timer:
+    """
+    Context manager recording the monotonic duration of its block into a Metrics registry.
+    """
+
+    __slots__ = ("_metrics", "_name", "_start")
+
+    def __init__(self, metrics, name):
+        self._metrics = metrics
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.monotonic()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._metrics.observe(self._name, time.monotonic() - self._start)
+        return False
+
+_NO_TIMER = contextlib.nullcontext()
+
+# Process-wide registry shared by all instrumented modules
+metrics = Metrics()
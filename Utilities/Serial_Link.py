@@ -0,0 +1,387 @@
+import os
+import time
+import tty
+import struct
+import select
+import termios
+import binascii
+import threading
+
+# Frame layout: start byte, sequence number, frame type, payload length, payload, CRC-16 (CCITT) of
+# everything between the start byte and the CRC
+FRAME_START = 0x7E
+FRAME_HEADER = struct.Struct("<BBBH")
+FRAME_CRC = struct.Struct("<H")
+MAX_PAYLOAD = 250
+
+# Frame types
+FRAME_BATCH = 0x01   # Host -> firmware: a batch of gantry commands
+FRAME_ACK = 0x81     # Firmware -> host: every frame before the given sequence number was received
+FRAME_NAK = 0x82     # Firmware -> host: corrupted frame, resend from the given sequence number
+FRAME_DONE = 0x83    # Firmware -> host: the batch with the given sequence number was executed
+
+# Gantry commands: opcode and absolute (x, y) target in steps from the centre of a1
+COMMAND = struct.Struct("<Bhh")
+COMMAND_MOVE = 1
+COMMAND_GRAB = 2
+COMMAND_RELEASE = 3
+
+# Command of each MotionPlanner action kind; manual placements are not sent
+ACTION_COMMANDS = {"travel": COMMAND_MOVE, "carry": COMMAND_MOVE, "graveyard": COMMAND_MOVE,
+                   "grab": COMMAND_GRAB, "release": COMMAND_RELEASE}
+
+def encodeFrame(seq, kind, payload=b""):
+    """
+    Builds a frame.
+
+    Args:
+        seq (int): Sequence number (0 to 255).
+        kind (int): Frame type, e.g. FRAME_BATCH.
+        payload (bytes, optional): Payload of at most MAX_PAYLOAD bytes. Defaults to b"".
+
+    Returns:
+        bytes: The encoded frame.
+    """
+    frame = FRAME_HEADER.pack(FRAME_START, seq & 0xFF, kind, len(payload)) + payload
+    return frame + FRAME_CRC.pack(binascii.crc_hqx(frame[1:], 0xFFFF))
+
+def encodeCommands(actions):
+    """
+    Encodes the actions of a motion plan as gantry commands.
+
+    Args:
+        actions (list): MotionPlanner actions.
+
+    Returns:
+        bytes: One 5-byte command per action, manual placements left out.
+    """
+    return b"".join(COMMAND.pack(ACTION_COMMANDS[action.kind], action.x, action.y)
+                    for action in actions if action.kind in ACTION_COMMANDS)
+
+def decodeCommands(payload):
+    """
+    Decodes the gantry commands of a batch.
+
+    Args:
+        payload (bytes): Payload of a FRAME_BATCH frame.
+
+    Returns:
+        list: (opcode, x, y) tuples.
+    """
+    return list(COMMAND.iter_unpack(payload))
+
+def openSerial(path, baudrate=115200):
+    """
+    Opens a serial device (or pseudo-terminal) in raw mode.
+
+    Args:
+        path (str): Path of the device, e.g. /dev/ttyACM0.
+        baudrate (int, optional): Line speed. Defaults to 115200, the speed of the firmware.
+
+    Returns:
+        int: The file descriptor.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_NOCTTY)
+    tty.setraw(fd)
+    attributes = termios.tcgetattr(fd)
+    speed = getattr(termios, f"B{baudrate}")
+    attributes[4] = attributes[5] = speed
+    termios.tcsetattr(fd, termios.TCSANOW, attributes)
+    return fd
+
+class frameDecoder:
+    """
+    This class reassembles frames from a byte stream.
+
+    Bytes before a start byte are skipped; a frame with a bad CRC is counted and the search for the next
+    start byte resumes right after the bad one, so the decoder resynchronises by itself.
+
+    Attributes:
+        _buffer (bytearray): Bytes received and not decoded yet.
+        _errors (int): Number of corrupted frames so far.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty decoder.
+        """
+        self._buffer = bytearray()
+        self._errors = 0
+
+    def feed(self, data):
+        """
+        Adds received bytes and returns the frames completed by them.
+
+        Args:
+            data (bytes): The received bytes.
+
+        Returns:
+            list: (seq, kind, payload) tuples for the valid frames, and (None, None, None) for every
+                  corrupted one.
+        """
+        self._buffer += data
+        frames = []
+        while True:
+            start = self._buffer.find(FRAME_START)
+            if start < 0:
+                self._buffer.clear()
+                break
+            del self._buffer[:start]
+            if len(self._buffer) < FRAME_HEADER.size:
+                break
+            _, seq, kind, length = FRAME_HEADER.unpack_from(self._buffer)
+            if length > MAX_PAYLOAD:
+                self._errors += 1
+                frames.append((None, None, None))
+                del self._buffer[:1]
+                continue
+            end = FRAME_HEADER.size + length + FRAME_CRC.size
+            if len(self._buffer) < end:
+                break
+            crc, = FRAME_CRC.unpack_from(self._buffer, end - FRAME_CRC.size)
+            if binascii.crc_hqx(self._buffer[1:end - FRAME_CRC.size], 0xFFFF) != crc:
+                self._errors += 1
+                frames.append((None, None, None))
+                del self._buffer[:1]
+                continue
+            frames.append((seq, kind, bytes(self._buffer[FRAME_HEADER.size:end - FRAME_CRC.size])))
+            del self._buffer[:end]
+        return frames
+
+    def get_errors(self):
+        """
+        Returns the number of corrupted frames so far.
+
+        Returns:
+            int: The number of errors.
+        """
+        return self._errors
+
+class serialLink:
+    """
+    This class sends motion plans to the SteppersControl firmware over a serial line.
+
+    A plan is sent as one or a few framed binary batches instead of one command per round trip. Up to
+    window frames may be unacknowledged at a time (go-back-N): a background thread reads the cumulative
+    acknowledgements, resends from the reported sequence number on a NAK, and resends everything outstanding
+    when the oldest frame times out.
+
+    Attributes:
+        _fd (int): File descriptor of the serial line.
+        _window (int): Maximum number of unacknowledged frames.
+        _timeout (float): Seconds without acknowledgement before the outstanding frames are resent.
+        _decoder (frameDecoder): Decoder of the incoming bytes.
+        _lock (threading.Condition): Guards the send state and signals acknowledgements.
+        _next_seq (int): Sequence number of the next frame (not wrapped).
+        _acked (int): Sequence number (not wrapped) up to which every frame is acknowledged.
+        _executed (int): Highest sequence number (not wrapped) reported as executed, -1 before the first one.
+        _pending (dict): Encoded unacknowledged frames by sequence number (not wrapped).
+        _sent_at (float): Time the oldest unacknowledged frame was last sent.
+        _send_times (dict): First send time of each unacknowledged frame, for the latency statistics.
+        _stats (dict): Frames sent, resent and acknowledged, and the summed acknowledgement latency.
+        _running (bool): True while the reader thread should keep running; once False, the waits return.
+        _reader (threading.Thread): The background reader thread.
+    """
+
+    def __init__(self, path, baudrate=115200, window=8, timeout=0.5):
+        """
+        Opens the serial line and starts the reader thread.
+
+        Args:
+            path (str): Path of the serial device or pseudo-terminal.
+            baudrate (int, optional): Line speed. Defaults to 115200.
+            window (int, optional): Maximum number of unacknowledged frames, at most 127. Defaults to 8.
+            timeout (float, optional): Acknowledgement timeout in seconds. Defaults to 0.5.
+        """
+        if not 0 < window < 128:
+            raise ValueError("The window must hold between 1 and 127 frames")
+        self._fd = openSerial(path, baudrate)
+        self._window = window
+        self._timeout = timeout
+        self._decoder = frameDecoder()
+        self._lock = threading.Condition()
+        self._next_seq = 0
+        self._acked = 0
+        self._executed = -1
+        self._pending = {}
+        self._sent_at = 0.0
+        self._send_times = {}
+        self._stats = {"sent": 0, "resent": 0, "acked": 0, "latency": 0.0}
+        self._running = True
+        self._reader = threading.Thread(target=self._read_loop, name="Serial-reader", daemon=True)
+        self._reader.start()
+
+    def _unwrap(self, seq):
+        """
+        Turns an 8-bit sequence number from the firmware into the closest full sequence number.
+        """
+        delta = (seq - self._acked) & 0xFF
+        if delta >= 128:
+            delta -= 256
+        return self._acked + delta
+
+    def send(self, payload):
+        """
+        Sends one batch, waiting only while the window is full.
+
+        Args:
+            payload (bytes): Encoded gantry commands, at most MAX_PAYLOAD bytes.
+
+        Returns:
+            int: The sequence number (not wrapped) of the frame.
+
+        Raises:
+            OSError: If the link is closed.
+        """
+        with self._lock:
+            self._lock.wait_for(lambda: not self._running or self._next_seq - self._acked < self._window)
+            if not self._running:
+                raise OSError("The serial link is closed")
+            seq = self._next_seq
+            self._next_seq += 1
+            frame = encodeFrame(seq, FRAME_BATCH, payload)
+            if not self._pending:
+                self._sent_at = time.monotonic()
+            self._pending[seq] = frame
+            self._send_times[seq] = time.monotonic()
+            self._stats["sent"] += 1
+            os.write(self._fd, frame)
+        return seq
+
+    def sendPlan(self, plan):
+        """
+        Sends a motion plan, split into as few batches as the frame size allows.
+
+        Args:
+            plan (MotionPlan): The plan, as returned by MotionPlanner.planMove().
+
+        Returns:
+            int: The sequence number (not wrapped) of the last frame of the plan, None for an empty plan.
+        """
+        commands = encodeCommands(plan.actions)
+        chunk = MAX_PAYLOAD - MAX_PAYLOAD % COMMAND.size
+        seq = None
+        for offset in range(0, len(commands), chunk):
+            seq = self.send(commands[offset:offset + chunk])
+        return seq
+
+    def waitAcked(self, seq=None, timeout=None):
+        """
+        Waits until a frame, by default every frame sent so far, is acknowledged.
+
+        Args:
+            seq (int, optional): Sequence number (not wrapped) to wait for. Defaults to the last sent frame.
+            timeout (float, optional): Maximum wait in seconds. Defaults to None (no limit but the link closing).
+
+        Returns:
+            bool: True if the frame was acknowledged, False on timeout or once the link is closed.
+        """
+        with self._lock:
+            target = self._next_seq - 1 if seq is None else seq
+            self._lock.wait_for(lambda: not self._running or self._acked > target, timeout)
+            return self._acked > target
+
+    def waitExecuted(self, seq=None, timeout=None):
+        """
+        Waits until the firmware reports a batch, by default the last one sent, as executed.
+
+        Args:
+            seq (int, optional): Sequence number (not wrapped) to wait for. Defaults to the last sent frame.
+            timeout (float, optional): Maximum wait in seconds. Defaults to None (no limit but the link closing).
+
+        Returns:
+            bool: True if the batch was executed, False on timeout or once the link is closed.
+        """
+        with self._lock:
+            target = self._next_seq - 1 if seq is None else seq
+            self._lock.wait_for(lambda: not self._running or self._executed >= target, timeout)
+            return self._executed >= target
+
+    def _read_loop(self):
+        """
+        Body of the reader thread: handles the acknowledgements and the retransmissions.
+
+        If the serial line fails, the link counts as closed and the waiting callers are woken up.
+        """
+        while self._running:
+            readable, _, _ = select.select([self._fd], [], [], self._timeout / 4)
+            if readable:
+                try:
+                    data = os.read(self._fd, 4096)
+                except OSError:
+                    with self._lock:
+                        self._running = False
+                        self._lock.notify_all()
+                    break
+                for seq, kind, _ in self._decoder.feed(data):
+                    if seq is not None:
+                        self._handle(seq, kind)
+
+            with self._lock:
+                if self._pending and time.monotonic() - self._sent_at > self._timeout:
+                    self._resend(self._acked)
+
+    def _handle(self, seq, kind):
+        """
+        Applies one frame received from the firmware.
+
+        Args:
+            seq (int): The 8-bit sequence number of the frame.
+            kind (int): The frame type.
+        """
+        with self._lock:
+            seq = self._unwrap(seq)
+            if kind == FRAME_ACK and seq > self._acked:
+                now = time.monotonic()
+                for acked in range(self._acked, min(seq, self._next_seq)):
+                    self._pending.pop(acked, None)
+                    sent = self._send_times.pop(acked, None)
+                    if sent is not None:
+                        self._stats["acked"] += 1
+                        self._stats["latency"] += now - sent
+                self._acked = min(seq, self._next_seq)
+                self._sent_at = now
+                self._lock.notify_all()
+            elif kind == FRAME_NAK:
+                self._resend(max(seq, self._acked))
+            elif kind == FRAME_DONE and seq > self._executed:
+                self._executed = seq
+                self._lock.notify_all()
+
+    def _resend(self, start):
+        """
+        Resends every unacknowledged frame from a sequence number on. The caller holds the lock.
+
+        Args:
+            start (int): First sequence number (not wrapped) to resend.
+        """
+        for seq in range(start, self._next_seq):
+            frame = self._pending.get(seq)
+            if frame is not None:
+                os.write(self._fd, frame)
+                self._stats["resent"] += 1
+        self._sent_at = time.monotonic()
+
+    def get_stats(self):
+        """
+        Returns the transfer statistics.
+
+        Returns:
+            dict: Frames "sent", "resent" and "acked", the mean acknowledgement latency "ack_latency" in
+                  seconds and the number of corrupted incoming frames "errors".
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats["ack_latency"] = stats.pop("latency") / stats["acked"] if stats["acked"] else 0.0
+        stats["errors"] = self._decoder.get_errors()
+        return stats
+
+    def close(self):
+        """
+        Stops the reader thread, wakes up the waiting callers and closes the serial line.
+        """
+        with self._lock:
+            self._running = False
+            self._lock.notify_all()
+        self._reader.join()
+        os.close(self._fd)
@@ -1,44 +1,213 @@
 import cv2
+import time
+import threading
+from collections import deque
+from Utilities.Metrics import metrics
 
 class pictureTaker:
     """
-    This class is responsible for capturing an image from a camera and saving it to a file.
+    This class is responsible for capturing images from a camera.
+
+    It supports two modes of operation:
+        - One-shot mode: Take_Picture() opens the camera, captures a single frame, saves it to a file
+          and releases the camera again.
+        - Persistent mode: open() keeps the camera open and starts a background thread that keeps grabbing
+          frames into a small ring buffer, so latest_frame() returns the freshest frame immediately.
 
     Attributes:
         _port (int): The index of the camera port to use.
         _saveFile_name (str): The name of the file to save the captured image.
+        _buffer_size (int): Number of most recent frames kept in the ring buffer.
+        _reconnect_delay (float): Seconds to wait between attempts to reopen a disconnected camera.
+        _capture (cv2.VideoCapture): The camera handle while in persistent mode, None otherwise.
+        _frames (collections.deque): Ring buffer holding the most recent frames.
+        _frame_id (int): Number of frames grabbed since the session was opened.
+        _lock (threading.Lock): Guards the ring buffer and the frame counter.
+        _new_frame (threading.Condition): Notified every time a new frame lands in the ring buffer.
+        _running (bool): True while the background grabber thread should keep running.
+        _grabber (threading.Thread): The background grabber thread.
     """
 
-    def __init__(self, port, saveFile_name):
+    def __init__(self, port, saveFile_name, buffer_size=3, reconnect_delay=0.5):
         """
         Initializes the pictureTaker object.
 
         Args:
             port (int): The index of the camera port to use.
             saveFile_name (str): The name of the file to save the captured image (without extension).
+            buffer_size (int, optional): Number of most recent frames kept in persistent mode. Defaults to 3.
+            reconnect_delay (float, optional): Seconds between reconnection attempts. Defaults to 0.5.
         """
         self._port = port
         self._saveFile_name = f"{saveFile_name}.jpg"
+        self._buffer_size = buffer_size
+        self._reconnect_delay = reconnect_delay
+        self._capture = None
+        self._frames = deque(maxlen=buffer_size)
+        self._frame_id = 0
+        self._lock = threading.Lock()
+        self._new_frame = threading.Condition(self._lock)
+        self._running = False
+        self._grabber = None
+
+    def open(self):
+        """
+        Opens the camera once and starts the background grabber thread.
+
+        Returns:
+            bool: True if the camera was opened successfully, False otherwise.
+        """
+        if self._running:
+            return True
+
+        self._capture = cv2.VideoCapture(self._port)
+        if not self._capture.isOpened():
+            print("Error: Couldn't open camera")
+            self._capture.release()
+            self._capture = None
+            return False
+
+        self._running = True
+        self._grabber = threading.Thread(target=self._grab_loop, name="pictureTaker-grabber", daemon=True)
+        self._grabber.start()
+        return True
+
+    def close(self):
+        """
+        Stops the background grabber thread and releases the camera.
+        """
+        self._running = False
+        with self._new_frame:
+            self._new_frame.notify_all()
+        if self._grabber is not None:
+            self._grabber.join()
+            self._grabber = None
+        if self._capture is not None:
+            self._capture.release()
+            self._capture = None
+        with self._lock:
+            self._frames.clear()
 
+    def is_open(self):
+        """
+        Checks whether the persistent capture session is running.
+
+        Returns:
+            bool: True if the background grabber is running.
+        """
+        return self._running
+
+    def _reopen(self):
+        """
+        Releases a disconnected camera and keeps trying to reopen it until it succeeds or the session is closed.
+
+        Returns:
+            bool: True if the camera was reopened, False if the session was closed meanwhile.
+        """
+        if self._capture is not None:
+            self._capture.release()
+
+        while self._running:
+            self._capture = cv2.VideoCapture(self._port)
+            if self._capture.isOpened():
+                return True
+            self._capture.release()
+            print("Error: Camera disconnected, retrying")
+            time.sleep(self._reconnect_delay)
+        return False
+
+    def _grab_loop(self):
+        """
+        Body of the background grabber thread: reads frames continuously into the ring buffer,
+        reopening the camera reconnect_delay seconds after a read fails.
+        """
+        while self._running:
+            with metrics.timer("camera.read"):
+                ret, frame = self._capture.read()
+            if not ret:
+                metrics.count("camera.read_failures")
+                # A device that opens but cannot deliver frames would otherwise be reopened in a busy loop
+                time.sleep(self._reconnect_delay)
+                if not self._reopen():
+                    break
+                continue
+
+            with self._new_frame:
+                self._frames.append(frame)
+                self._frame_id += 1
+                self._new_frame.notify_all()
+
+    def latest_frame(self):
+        """
+        Returns the freshest frame of the persistent session without waiting for the camera.
+
+        Returns:
+            numpy.ndarray: The most recent BGR frame, or None if no frame has been grabbed yet.
+        """
+        with self._lock:
+            if not self._frames:
+                return None
+            return self._frames[-1]
+
+    @metrics.timed("camera.wait_frame")
+    def wait_frame(self, after_id=0, timeout=None):
+        """
+        Blocks until a frame newer than after_id is available.
+
+        Args:
+            after_id (int, optional): Id of the last frame the caller has seen. Defaults to 0.
+            timeout (float, optional): Maximum number of seconds to wait. Defaults to None (wait forever).
+
+        Returns:
+            tuple: A tuple (frame, frame_id). frame is None if the timeout expired or the session was closed.
+        """
+        with self._new_frame:
+            self._new_frame.wait_for(lambda: self._frame_id > after_id or not self._running, timeout)
+            if self._frame_id > after_id and self._frames:
+                return self._frames[-1], self._frame_id
+            return None, self._frame_id
+
+    def warm_up(self, frames=5, timeout=2.0):
+        """
+        Waits until the persistent session has grabbed a few frames, so the auto exposure and white balance
+        of the camera have settled before the first frame is analysed.
+
+        Args:
+            frames (int, optional): Number of frames to wait for. Defaults to 5.
+            timeout (float, optional): Maximum number of seconds to wait. Defaults to 2.0.
+
+        Returns:
+            bool: True if the frames arrived in time.
+        """
+        with self._new_frame:
+            return self._new_frame.wait_for(lambda: self._frame_id >= frames or not self._running, timeout) and self._running
+
+    @metrics.timed("camera.take_picture")
     def Take_Picture(self):
         """
         Captures an image from the camera and saves it to a file.
 
-        This method opens the specified camera port, captures a single frame from the camera,
-        and saves the captured frame as a JPEG image to the file specified by _saveFile_name.
-
-        If an error occurs while opening the camera or capturing the frame, an appropriate
-        error message is printed, and the program exits.
+        If the persistent session is open, the freshest frame of the ring buffer is saved.
+        Otherwise this method opens the specified camera port, captures a single frame from the camera,
+        saves the captured frame as a JPEG image to the file specified by _saveFile_name and releases the camera.
 
-        After saving the image, the camera is released and closed.
+        Returns:
+            bool: True if an image was saved, False if the camera could not be opened or the capture failed.
         """
+        if self._running:
+            frame = self.latest_frame()
+            if frame is None:
+                print("Error: Failed to capture frame")
+                return False
+            return cv2.imwrite(self._saveFile_name, frame)
+
         # Open the camera specified by self._port
         cap = cv2.VideoCapture(self._port)
 
         # Check if the camera opened successfully
         if not cap.isOpened():
             print("Error: Couldn't open camera")
-            exit()
+            return False
 
         # Capture a single frame from the camera
         ret, frame = cap.read()
@@ -51,4 +220,6 @@ class pictureTaker:
             print("Error: Failed to capture frame")
 
         # Release and close the camera
-        cap.release()
\ No newline at end of file
+        cap.release()
+
+        return ret
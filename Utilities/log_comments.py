@@ -52,7 +52,81 @@ def getLogComment(status,statusType):
             return "Unkown status was given"
 
     elif(statusType == 'bootStatus'):
+        if(isinstance(status, list)):
+            return f"System startup was completed successfully! ({status[1]})"
         return "System startup was completed successfully!"
 
+    elif(statusType == 'resumeStatus'):
+        if(status == 1):
+            return "The game was resumed and the board matches the snapshot!"
+
+        elif(status == 0):
+            return "No game snapshot was found, a new game was started!"
+
+        elif(status == -1):
+            return "The board does not match the resumed game!"
+
+        else:
+            return "Unkown status was given"
+
+    elif(statusType == 'planStatus'):
+        if(status[0] == -1):
+            return f"The robot cannot make the move {status[1]}, please make it by hand!"
+
+        else:
+            return "Unkown status was given"
+
     else:
-        pass
\ No newline at end of file
+        pass
+
+# Precomputed message templates of the structured log, keyed by (statusType, code).
+# "{payload}" is replaced by the record payload (the move for move statuses).
+LOG_TEMPLATES = {
+    ('detectorStatus', -2): "No lines were detected in the image!",
+    ('detectorStatus', -1): "Unable to read given image!",
+    ('detectorStatus', 0): "Image preprocessing failed!",
+    ('detectorStatus', 1): "HoughLines function raised an error!",
+    ('detectorStatus', 2): "Contour detection failed!",
+    ('detectorStatus', 3): "Something went wrong during the piece identification proccess!",
+    ('detectorStatus', 4): "Pieces's colors were successfully detected!",
+    ('playerMoveStatus', -1): "The move {payload} made by the player is illegal!",
+    ('playerMoveStatus', 1): "The move {payload} was made by the player",
+    ('botMoveStatus', 0): "The move {payload} was made by the AI!",
+    ('endgameStatus', 2): "The player wins!",
+    ('endgameStatus', 1): "The AI wins!",
+    ('endgameStatus', 0): "It's a draw!",
+    ('bootStatus', 0): "System startup was completed successfully! ({payload})",
+    ('resumeStatus', 1): "The game was resumed and the board matches the snapshot!",
+    ('resumeStatus', 0): "No game snapshot was found, a new game was started!",
+    ('resumeStatus', -1): "The board does not match the resumed game!",
+    ('planStatus', -1): "The robot cannot make the move {payload}, please make it by hand!",
+}
+
+# Priority of each status type: under backpressure, records below PRIORITY_KEEP are dropped first
+LOG_PRIORITIES = {
+    'detectorStatus': 0,
+    'playerMoveStatus': 1,
+    'botMoveStatus': 1,
+    'endgameStatus': 1,
+    'bootStatus': 1,
+    'resumeStatus': 1,
+    'planStatus': 1,
+}
+PRIORITY_KEEP = 1
+
+def formatLogComment(statusType, code, payload=None):
+    """
+    Resolves a structured log record to its message through the precomputed template table.
+
+    Args:
+        statusType (str): The status type, e.g. 'detectorStatus'.
+        code (int): The numeric status code.
+        payload (str, optional): The record payload, e.g. a move in UCI notation. Defaults to None.
+
+    Returns:
+        str: The log message.
+    """
+    template = LOG_TEMPLATES.get((statusType, code))
+    if template is None:
+        return "Unkown status was given"
+    return template.format(payload=payload)
@@ -1,16 +1,29 @@
+import sys
+import time
+import asyncio
+import argparse
+import chess
+from concurrent.futures import ThreadPoolExecutor
+from Utilities.Log import Log
 from Utilities.UDP_Socket import udpSocket
-from Utilities.log import Log
-from Utilities.Take_Picture import pictureTaker
-from ChessDetector.ChessboardDetector import ChessboardDetector
-from ChessDetector.MoveFinder import MoveFinder
-from MoveMaker.MoveMaker import MoveMaker
+from Utilities.Metrics import metrics
+from MotionPlanner.MotionPlanner import MotionPlanner
 
-def getStatus(game):
+# OpenCV, NumPy and chess.engine take a large part of the startup time: the modules depending on them
+# are imported by the boot phases that need them (see boot()), so the engine process is already starting
+# while they load.
+
+# Time allowed to the gantry for a motion plan: a multiple of its estimated duration plus a margin in seconds
+EXECUTE_TIMEOUT_FACTOR = 2.0
+EXECUTE_TIMEOUT_MARGIN = 10.0
+
+def getStatus(game, logObject):
     """
     Check the game status and determine the winner based on the outcome.
 
     Args:
         game (MoveMaker): The chess game object.
+        logObject (Log): The logger used to report the outcome.
 
     Returns:
         int: 2 if white wins, 1 if black wins, 0 for a draw, -1 if the game is ongoing.
@@ -21,62 +34,514 @@ def getStatus(game):
     # Determine the winner based on the outcome
     if outcome is not None:
         if outcome.winner == chess.WHITE:
-            udp.update_status(getLogComment(2, 'endgameStatus'))
+            logObject.log([2, 'endgameStatus'])
             return 2
         elif outcome.winner == chess.BLACK:
-            udp.update_status(getLogComment(1, 'endgameStatus'))
+            logObject.log([1, 'endgameStatus'])
             return 1
         else:
-            udp.update_status(getLogComment(0, 'endgameStatus'))
+            logObject.log([0, 'endgameStatus'])
             return 0
     else:
         return -1
 
-def main():
+def save_snapshot(snapshot, game, detector):
+    """
+    Writes the game snapshot after a bot move, so a resumed game always has the player to move.
+
+    If the program stops while the bot searches, the snapshot still holds the position before the player's
+    move, which the game loop then finds again on the physical board.
+
+    Args:
+        snapshot (gameSnapshot): The snapshot, or None if disabled.
+        game (MoveMaker): The chess game object.
+        detector (ChessboardDetector): The detector whose calibration is saved.
+    """
+    if snapshot is not None:
+        snapshot.save([move.uci() for move in game.get_board().move_stack], detector.get_calibration(), game.getSettings())
+
+def resume_game(resumed, game, detector, move_finder, logObject, planner=None):
+    """
+    Restores a game from its snapshot and checks the physical board against it.
+
+    The move stack and the engine settings are restored, and the motion planner replays the bot moves to
+    find its graveyard slots and head position again. The board is checked on the detection of the
+    calibration pass of boot(), which ran on the geometry restored from the snapshot. When the board does
+    not match, the game is still resumed: the next frames go through a full scan and the game loop waits
+    until the pieces are put back.
+
+    Args:
+        resumed (dict): The snapshot returned by gameSnapshot.load(), or None to start a new game.
+        game (MoveMaker): The chess game object.
+        detector (ChessboardDetector): The chessboard detector, after its calibration pass.
+        move_finder (MoveFinder): The move finder sharing the board of the game.
+        logObject (Log): The logger.
+        planner (MotionPlanner, optional): The motion planner of the bot moves. Defaults to None.
+
+    Returns:
+        bool: True if the physical board matches the resumed game.
+    """
+    if resumed is None:
+        logObject.log([0, 'resumeStatus'])
+        return False
+
+    game.restoreMoves(resumed["moves"])
+    game.setSettings(resumed["settings"])
+
+    # The snapshot is written once the bot's move is made, not once the robot executed it: after a crash the
+    # last bot move may still be missing from the physical board, and the check below then reports a mismatch
+    if planner is not None:
+        board = chess.Board()
+        for move in resumed["board"].move_stack:
+            before = board.copy(stack=False)
+            board.push(move)
+            if before.turn == chess.BLACK:
+                try:
+                    planner.planMove(before, board)
+                except ValueError:
+                    pass  # The game loop fell back to a manual plan: the move was made by hand
+
+    matches = detector._status == 4 and move_finder.matches(detector._detected, detector._probabilities)
+    if not matches:
+        detector.request_full_scan()
+    logObject.log([1 if matches else -1, 'resumeStatus'])
+    return matches
+
+def start_engine(ponder, cache_path, book_path):
+    """
+    Boot phase: spawns Stockfish and completes the UCI handshake, with the bot move cache opened.
+
+    Returns:
+        tuple: The MoveMaker and the MoveCache (None if disabled).
+    """
+    from MoveMaker.MoveMaker import MoveMaker
+    cache = None
+    if cache_path or book_path:
+        from MoveMaker.MoveCache import MoveCache
+        cache = MoveCache(cache_path, bookPath=book_path)
+    try:
+        return MoveMaker(6, ponder=ponder, cache=cache), cache
+    except Exception:
+        if cache is not None:
+            cache.close()
+        raise
+
+def start_spectator(rate, threads):
+    """
+    Boot phase: starts the process of the spectator engine.
+
+    Returns:
+        Spectator: The idle evaluation stream.
+    """
+    from MoveMaker.Spectator import Spectator
+    return Spectator(udpSocket("127.0.0.1", 10369), rate=rate, threads=threads)
+
+def start_camera():
+    """
+    Boot phase: opens the camera and waits for its exposure to settle.
+
+    Returns:
+        pictureTaker: The persistent camera session.
+
+    Raises:
+        RuntimeError: If the camera cannot be opened; the game loops would otherwise wait for frames forever.
+    """
+    from Utilities.Take_Picture import pictureTaker
+    picTaker = pictureTaker(1, "chessboard")
+    if not picTaker.open():
+        raise RuntimeError("Couldn't open camera")
+    picTaker.warm_up()
+    return picTaker
+
+def start_detector(pyramid_scale, snapshot_path, resume):
+    """
+    Boot phase: creates the detector and the motion gate, and restores the calibration of the snapshot.
+
+    Returns:
+        tuple: The ChessboardDetector, the MotionGate, the gameSnapshot (None if disabled) and the loaded
+               snapshot (None if not resuming or no snapshot exists).
+    """
+    from ChessDetector.ChessboardDetector import ChessboardDetector
+    from ChessDetector.MotionGate import MotionGate
+    from Utilities.Game_Snapshot import gameSnapshot
+    detector = ChessboardDetector()
+    detector.PYRAMID_SCALE = pyramid_scale
+    snapshot = gameSnapshot(snapshot_path) if snapshot_path is not None else None
+    resumed = snapshot.load() if snapshot is not None and resume else None
+    if resumed is not None and resumed["calibration"] is not None:
+        detector.set_calibration(resumed["calibration"])
+    return detector, MotionGate(), snapshot, resumed
+
+def calibrate_detector(detector, picTaker):
+    """
+    Boot phase: runs the detector once on the first settled frame, so the grid is found (or the restored
+    geometry checked) before the game starts instead of on the first move.
+
+    Returns:
+        int: The status of the detector pass.
+    """
+    frame, _ = picTaker.wait_frame(0, timeout=1.0)
+    detector.push_frame(frame)
+    return detector.run_pipeline()
+
+def boot(logObject, ponder=False, cache_path=None, book_path=None, pyramid_scale=1.0, spectator_rate=None,
+         spectator_threads=1, snapshot_path=None, resume=False, planner=None):
+    """
+    Starts the components of a game concurrently and logs the time of each phase in the bootStatus message.
+
+    The phases overlap instead of running one after the other:
+        - engine: Stockfish is spawned and answers the UCI handshake, and the move cache is opened.
+        - spectator: the spectator engine is spawned, if enabled.
+        - camera: the camera is opened and a few frames are grabbed while its exposure settles.
+        - detector: the detector modules are imported and the snapshot is loaded, on the calling thread.
+        - calibration: the detector finds the grid on the first frame once the camera is ready.
+    The game is then resumed from the snapshot if requested; "ready" is the time from the start of the boot
+    until the game loop can accept the first move. Every phase is also recorded as a boot.<phase> metric.
+
+    Args:
+        logObject (Log): The logger.
+        ponder (bool, optional): Let Stockfish think on the player's time. Defaults to False.
+        cache_path (str, optional): On-disk store of the bot move cache. Defaults to None.
+        book_path (str, optional): Polyglot opening book used by the bot move cache. Defaults to None.
+        pyramid_scale (float, optional): Scale of the downscaled frame the board grid is searched on. Defaults to 1.0.
+        spectator_rate (float, optional): Update rate of the spectator stream, None to disable it. Defaults to None.
+        spectator_threads (int, optional): Threads of the spectator engine. Defaults to 1.
+        snapshot_path (str, optional): Path of the game snapshot, None to disable it. Defaults to None.
+        resume (bool, optional): Resume the game of the snapshot. Defaults to False.
+        planner (MotionPlanner, optional): Motion planner replaying the bot moves of a resumed game. Defaults to None.
+
+    Returns:
+        dict: The "game", "cache", "picTaker", "detector", "gate", "move_finder", "snapshot" and "spectator"
+              components, and the "timings" of the phases in seconds.
+
+    Raises:
+        Exception: The first error of a phase, once the components started by the other phases are released.
+    """
+    started = time.monotonic()
+    timings = {}
+
+    def phase(name, function, *args):
+        phase_started = time.monotonic()
+        result = function(*args)
+        timings[name] = time.monotonic() - phase_started
+        metrics.observe(f"boot.{name}", timings[name])
+        return result
+
+    with ThreadPoolExecutor(max_workers=3, thread_name_prefix="boot") as executor:
+        futures = {"engine": executor.submit(phase, "engine", start_engine, ponder, cache_path, book_path),
+                   "camera": executor.submit(phase, "camera", start_camera)}
+        if spectator_rate:
+            futures["spectator"] = executor.submit(phase, "spectator", start_spectator, spectator_rate, spectator_threads)
+
+        error = None
+        try:
+            detector, gate, snapshot, resumed = phase("detector", start_detector, pyramid_scale, snapshot_path, resume)
+            phase("calibration", calibrate_detector, detector, futures["camera"].result())
+        except Exception as exception:
+            error = exception
+
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as exception:
+                error = error or exception
+
+    if error is not None:
+        if "engine" in results:
+            results["engine"][0].endGame()
+            if results["engine"][1] is not None:
+                results["engine"][1].close()
+        if "camera" in results:
+            results["camera"].close()
+        if "spectator" in results:
+            results["spectator"].close()
+        raise error
+
+    from ChessDetector.MoveFinder import MoveFinder
+    game, cache = results["engine"]
+    move_finder = MoveFinder(game.get_board())
+    if resume:
+        resume_game(resumed, game, detector, move_finder, logObject, planner)
+
+    # Only inspect the squares the next move can change
+    detector.set_candidate_squares(move_finder.candidate_squares())
+
+    spectator = results.get("spectator")
+    if spectator is not None:
+        spectator.update(game.get_board())
+
+    timings["ready"] = time.monotonic() - started
+    metrics.observe("boot.ready", timings["ready"])
+    logObject.log([[0, ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items())], 'bootStatus'])
+
+    return {"game": game, "cache": cache, "picTaker": results["camera"], "detector": detector, "gate": gate,
+            "move_finder": move_finder, "snapshot": snapshot, "spectator": spectator, "timings": timings}
+
+def main(archive_directory=None, ponder=False, cache_path=None, book_path=None, metrics_interval=None, structured_log=False, pyramid_scale=1.0, spectator_rate=None, spectator_threads=1, snapshot_path=None, resume=False):
     """
     The main function that orchestrates the chess game detection, move making, and communication.
 
     This function initializes various components, such as the UDP socket for communication, the picture taker
     for capturing images of the chessboard, the chessboard detector for analyzing the chessboard state, and
-    the move maker for handling the game moves.
+    the move maker for handling the game moves. They are started concurrently by boot().
 
-    It then enters a loop where it continuously captures images of the chessboard, analyzes the chessboard state,
-    updates the status via the UDP socket, makes moves based on the detected changes, and checks for the game's
-    end condition.
+    It then enters a loop where it continuously hands the freshest camera frame to a motion gate, runs the
+    detector only on settled frames that differ from the last accepted board, combines a few detections
+    with a per-square majority vote, updates the status via the UDP socket, makes moves based on the detected
+    changes, and checks for the game's end condition.
 
     The loop continues until the game is over, after which it displays the winner.
+
+    Args:
+        archive_directory (str, optional): If given, every analysed frame is also saved there as a JPEG
+                                           image by a background thread. Defaults to None (no archiving).
+        ponder (bool, optional): Let Stockfish think on the player's time. Defaults to False.
+        cache_path (str, optional): On-disk store of the bot move cache. Defaults to None.
+        book_path (str, optional): Polyglot opening book used by the bot move cache. Defaults to None.
+        metrics_interval (float, optional): If given, stage timings and counters are sent over the UDP
+                                            channel every metrics_interval seconds. Defaults to None (disabled).
+        structured_log (bool, optional): Send batched structured log records instead of one text message
+                                         per event. Defaults to False.
+        pyramid_scale (float, optional): Scale of the downscaled frame the board grid is searched on.
+                                         Defaults to 1.0 (full resolution).
+        spectator_rate (float, optional): If given, a second engine analyses the game on the player's time and
+                                          sends its evaluation over the UDP channel at most spectator_rate
+                                          times per second. Defaults to None (disabled).
+        spectator_threads (int, optional): Threads of the spectator engine. Defaults to 1.
+        snapshot_path (str, optional): If given, a crash-safe snapshot of the game is written there after every
+                                       bot move. Defaults to None (no snapshot).
+        resume (bool, optional): Resume the game of the snapshot instead of starting a new one. Defaults to False.
     """
 
     # Initialize the UDP socket for communication
-    logObject = Log("127.0.0.1", 10369)
+    logObject = Log("127.0.0.1", 10369, structured=structured_log)
 
-    # Initialize the picture taker for capturing images of the chessboard
-    picTaker = pictureTaker(1, "chessboard")
+    # Periodic metrics packets on the same UDP channel
+    if metrics_interval is not None:
+        metrics.start(udpSocket("127.0.0.1", 10369), metrics_interval)
 
-    # Initialize the chessboard detector for analyzing the chessboard state
-    detector = ChessboardDetector()
+    # Start the engine, the camera and the detector concurrently
+    components = boot(logObject, ponder, cache_path, book_path, pyramid_scale, spectator_rate, spectator_threads, snapshot_path, resume)
+    game, cache, picTaker = components["game"], components["cache"], components["picTaker"]
+    detector, gate, move_finder = components["detector"], components["gate"], components["move_finder"]
+    snapshot, spectator = components["snapshot"], components["spectator"]
 
-    # Initialize the move maker for handling the game moves
-    game = MoveMaker(6)
+    # Optional archival sink, kept off the hot path
+    archiver = None
+    if archive_directory is not None:
+        from Utilities.Frame_Archiver import frameArchiver
+        archiver = frameArchiver(archive_directory)
 
-    move_finder = MoveFinder(game.get_board())
+    frame_id = 0
+
+    try:
+        while True:
+            # Wait for a frame newer than the last analysed one
+            frame, frame_id = picTaker.wait_frame(frame_id)
+
+            if archiver is not None and frame is not None:
+                archiver.submit(frame)
+
+            # Skip frames while something moves over the board or nothing has changed
+            if not gate.update(frame):
+                continue
+            metrics.count("frames.settled")
+
+            detector.push_frame(frame)
+
+            # Analyze the chessboard state
+            detector_status = detector.run_pipeline()
+
+            # Update the status via the UDP socket
+            logObject.log([detector_status, 'detectorStatus'])
+
+            if detector_status != 4:
+                metrics.count("detector.failures")
+                continue
 
-    logObject.log([0, 'bootStatus'])
+            # Wait for enough detections of the settled board
+            voted = gate.vote(detector._detected, detector._probabilities)
+            if voted is None:
+                continue
+            detected, probabilities = voted
+            gate.commit()
 
+            # Get the delta of the board (the move made)
+            move_ucis = move_finder.find_move(detected)
+
+            if move_ucis == "p1z1":
+                # Resolve borderline squares to the most likely legal move
+                move_ucis, _ = move_finder.find_likely_move(probabilities)
+
+            if move_ucis == "p1z1":
+                if not move_finder.matches(detected, probabilities):
+                    metrics.count("moves.unresolved")
+                    gate.reject()  # Keep evaluating the settled scene instead of waiting for the next change
+                    detector.request_full_scan()  # Check the whole board on the next frame
+                continue
+
+            for move_uci in move_ucis:
+                # Make the player's move
+                move_status = game.makePlayerMove(move_uci)
+                # Update the status via the UDP socket
+                logObject.log([[move_status, move_uci], 'playerMoveStatus'])
+
+            if spectator is not None:
+                spectator.update(game.get_board())  # The bot is to move: the analysis stops
+
+            if getStatus(game, logObject) > -1:
+                if snapshot is not None:
+                    snapshot.discard()
+                return 0
+
+            # Make the bot's move
+            botMove = game.makeBotMove()
+
+            logObject.log([botMove, 'botMoveStatus'])
+
+            if getStatus(game, logObject) > -1:
+                if snapshot is not None:
+                    snapshot.discard()
+                return 0
+
+            save_snapshot(snapshot, game, detector)
+
+            move_finder.push_board(game.get_board())
+            detector.set_candidate_squares(move_finder.candidate_squares())
+            if spectator is not None:
+                spectator.update(game.get_board())
+    finally:
+        if spectator is not None:
+            spectator.close()
+        game.endGame()
+        picTaker.close()
+        if archiver is not None:
+            archiver.close()
+        if cache is not None:
+            cache.close()
+        metrics.stop()
+        logObject.close()
+
+def put_latest(queue, item):
+    """
+    Puts an item into a bounded asyncio queue, dropping the oldest item if the queue is full.
+
+    Args:
+        queue (asyncio.Queue): The bounded queue.
+        item: The item to put.
+    """
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(item)
+
+async def capture_frames(picTaker, gate, archiver, frames):
+    """
+    Camera stage of the asynchronous game loop.
+
+    Waits for new frames of the persistent camera session in a worker thread, archives them if requested
+    and forwards the settled ones to the detector stage.
+
+    Args:
+        picTaker (pictureTaker): The open camera session.
+        gate (MotionGate): The motion gate deciding which frames are settled.
+        archiver (frameArchiver): Optional archival sink, or None.
+        frames (asyncio.Queue): Bounded queue feeding the detector stage.
+    """
+    loop = asyncio.get_running_loop()
+    frame_id = 0
     while True:
-        # Take a picture of the chessboard
-        picTaker.Take_Picture()
+        frame, frame_id = await loop.run_in_executor(None, picTaker.wait_frame, frame_id, 1.0)
+        if frame is None:
+            continue
 
-        detector.push_image(picTaker._saveFile_name)
+        if archiver is not None:
+            archiver.submit(frame)
 
-        # Analyze the chessboard state
-        detector_status = detector.run_pipeline()
+        if gate.update(frame):
+            metrics.count("frames.settled")
+            put_latest(frames, frame)
 
-        # Update the status via the UDP socket
-        logObject.log([detector_status, 'detectorStatus'])
+async def detect_boards(detector, gate, logObject, frames, boards):
+    """
+    Detector stage of the asynchronous game loop.
+
+    Runs the detector pipeline in a dedicated worker thread and forwards the majority vote of each settled
+    board to the game stage.
+
+    Args:
+        detector (ChessboardDetector): The chessboard detector.
+        gate (MotionGate): The motion gate holding the per-square vote.
+        logObject (Log): The logger.
+        frames (asyncio.Queue): Bounded queue of settled frames.
+        boards (asyncio.Queue): Bounded queue feeding the game stage with (board, probabilities) tuples.
+    """
+    loop = asyncio.get_running_loop()
+
+    def detect(frame):
+        detector.push_frame(frame)
+        return detector.run_pipeline(), detector._detected, detector._probabilities
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="detector") as executor:
+        while True:
+            frame = await frames.get()
+            detector_status, detected, probabilities = await loop.run_in_executor(executor, detect, frame)
+
+            # Update the status via the UDP socket
+            logObject.log([detector_status, 'detectorStatus'])
+
+            if detector_status != 4:
+                metrics.count("detector.failures")
+                continue
+
+            # Wait for enough detections of the settled board; the game stage rejects it if it is unresolved
+            voted = gate.vote(detected, probabilities)
+            if voted is not None:
+                gate.commit()
+                put_latest(boards, voted)
+
+async def play_moves(game, move_finder, logObject, boards, bot_moves, detector=None, planner=None, spectator=None, snapshot=None, gate=None):
+    """
+    Game stage of the asynchronous game loop.
+
+    Turns detected boards into player moves and lets the engine answer, while the camera and detector
+    stages keep running.
+
+    Args:
+        game (MoveMaker): The chess game object.
+        move_finder (MoveFinder): The move finder.
+        logObject (Log): The logger.
+        boards (asyncio.Queue): Bounded queue of (detected board, square probabilities) tuples.
+        bot_moves (asyncio.Queue): Queue of (bot move, motion plan) tuples for the robot stage.
+        detector (ChessboardDetector, optional): Detector whose candidate squares follow the game. Defaults to None.
+        planner (MotionPlanner, optional): Planner turning the bot moves into gantry actions. Defaults to None.
+        spectator (Spectator, optional): Live evaluation stream following the game. Defaults to None.
+        snapshot (gameSnapshot, optional): Snapshot written after every bot move, in a worker thread.
+                                           Needs the detector. Defaults to None.
+        gate (MotionGate, optional): Gate whose commit is taken back when a voted board cannot be resolved.
+                                     Defaults to None.
+
+    Returns:
+        int: The game status returned by getStatus once the game is over.
+    """
+    while True:
+        detected, probabilities = await boards.get()
 
         # Get the delta of the board (the move made)
-        move_ucis = move_finder.find_move(detector._detected)
+        move_ucis = move_finder.find_move(detected)
+
+        if move_ucis == "p1z1":
+            # Resolve borderline squares to the most likely legal move
+            move_ucis, _ = move_finder.find_likely_move(probabilities)
+
+        if move_ucis == "p1z1":
+            if not move_finder.matches(detected, probabilities):
+                metrics.count("moves.unresolved")
+                if gate is not None:
+                    gate.reject()  # Keep evaluating the settled scene instead of waiting for the next change
+                if detector is not None:
+                    detector.request_full_scan()  # Check the whole board on the next frame
+            continue
 
         for move_uci in move_ucis:
             # Make the player's move
@@ -84,20 +549,206 @@ def main():
             # Update the status via the UDP socket
             logObject.log([[move_status, move_uci], 'playerMoveStatus'])
 
-        if getStatus(game) > -1:
-            game.endGame()
-            return 0
+        if spectator is not None:
+            spectator.update(game.get_board())  # The bot is to move: the analysis stops
+
+        status = getStatus(game, logObject)
+        if status > -1:
+            return status
 
-        # Make the bot's move
-        botMove = game.makeBotMove()
+        # Make the bot's move without blocking the other stages
+        before = game.get_board().copy(stack=False)
+        botMove = await game.makeBotMoveAsync()
 
         logObject.log([botMove, 'botMoveStatus'])
 
-        if getStatus(game) > -1:
-            game.endGame()
-            return 0
+        # Plan the gantry actions; the estimated duration tells how long the board stays unsettled
+        plan = None
+        if planner is not None:
+            try:
+                plan = planner.planMove(before, game.get_board())
+                metrics.observe("robot.estimated_time", plan.time)
+            except ValueError:
+                # E.g. a full graveyard: the operator has to make the move by hand
+                metrics.count("planner.failures")
+                logObject.log([[-1, botMove], 'planStatus'])
+                plan = planner.manualPlan(before, game.get_board())
+
+        await bot_moves.put((botMove, plan))
+
+        status = getStatus(game, logObject)
+        if status > -1:
+            return status
+
+        if snapshot is not None:
+            await asyncio.to_thread(save_snapshot, snapshot, game, detector)
 
         move_finder.push_board(game.get_board())
+        if detector is not None:
+            detector.set_candidate_squares(move_finder.candidate_squares())
+        if spectator is not None:
+            spectator.update(game.get_board())
+
+async def execute_moves(bot_moves, execute=None):
+    """
+    Robot stage of the asynchronous game loop.
+
+    Args:
+        bot_moves (asyncio.Queue): Queue of (bot move, motion plan) tuples.
+        execute (callable, optional): Coroutine function carrying out a move and its motion plan on the
+                                      physical board. Defaults to None (moves are only consumed).
+    """
+    while True:
+        botMove, plan = await bot_moves.get()
+        if execute is not None:
+            await execute(botMove, plan)
+
+def plan_sender(link):
+    """
+    Builds the execute callable of the robot stage for a serial link to the gantry.
+
+    Args:
+        link (serialLink): The link to the SteppersControl firmware.
+
+    Returns:
+        callable: Coroutine function sending a motion plan and waiting until the firmware executed it.
+                  It raises TimeoutError if the firmware does not report the plan as executed within
+                  EXECUTE_TIMEOUT_FACTOR times its estimated duration plus EXECUTE_TIMEOUT_MARGIN seconds.
+    """
+    async def execute(botMove, plan):
+        if plan is None:
+            return
+        seq = await asyncio.to_thread(link.sendPlan, plan)
+        if seq is None:
+            return
+        timeout = plan.time * EXECUTE_TIMEOUT_FACTOR + EXECUTE_TIMEOUT_MARGIN
+        if not await asyncio.to_thread(link.waitExecuted, seq, timeout):
+            metrics.count("robot.timeouts")
+            raise TimeoutError(f"The gantry did not execute {botMove} within {timeout:.1f} s")
+    return execute
+
+async def main_async(archive_directory=None, ponder=False, cache_path=None, book_path=None, metrics_interval=None, structured_log=False, pyramid_scale=1.0, serial_port=None, spectator_rate=None, spectator_threads=1, snapshot_path=None, resume=False):
+    """
+    Asynchronous version of main().
+
+    The camera, the detector, the game logic (with the Stockfish search) and the robot run as concurrent
+    tasks joined by bounded queues, so the next frames are captured and pre-validated while the engine
+    searches and the robot acts. The components are started concurrently by boot(), in a worker thread.
+    Once the game is over, or as soon as one of the stages fails, every task is cancelled and all resources
+    are released.
+
+    Args:
+        archive_directory (str, optional): If given, every captured frame is also saved there as a JPEG
+                                           image by a background thread. Defaults to None (no archiving).
+        ponder (bool, optional): Let Stockfish think on the player's time. Defaults to False.
+        cache_path (str, optional): On-disk store of the bot move cache. Defaults to None.
+        book_path (str, optional): Polyglot opening book used by the bot move cache. Defaults to None.
+        metrics_interval (float, optional): If given, stage timings and counters are sent over the UDP
+                                            channel every metrics_interval seconds. Defaults to None (disabled).
+        structured_log (bool, optional): Send batched structured log records instead of one text message
+                                         per event. Defaults to False.
+        pyramid_scale (float, optional): Scale of the downscaled frame the board grid is searched on.
+                                         Defaults to 1.0 (full resolution).
+        serial_port (str, optional): Serial device of the gantry firmware; the planned bot moves are sent
+                                     there. Defaults to None (bot moves are not executed).
+        spectator_rate (float, optional): If given, a second engine analyses the game on the player's time and
+                                          sends its evaluation over the UDP channel at most spectator_rate
+                                          times per second. Defaults to None (disabled).
+        spectator_threads (int, optional): Threads of the spectator engine. Defaults to 1.
+        snapshot_path (str, optional): If given, a crash-safe snapshot of the game is written there after every
+                                       bot move. Defaults to None (no snapshot).
+        resume (bool, optional): Resume the game of the snapshot instead of starting a new one. Defaults to False.
+
+    Returns:
+        int: 0 once the game is over.
+
+    Raises:
+        Exception: The error of the first stage that failed.
+    """
+    logObject = Log("127.0.0.1", 10369, structured=structured_log)
+
+    if metrics_interval is not None:
+        metrics.start(udpSocket("127.0.0.1", 10369), metrics_interval)
+
+    planner = MotionPlanner()
+    components = await asyncio.to_thread(boot, logObject, ponder, cache_path, book_path, pyramid_scale, spectator_rate,
+                                         spectator_threads, snapshot_path, resume, planner)
+    game, cache, picTaker = components["game"], components["cache"], components["picTaker"]
+    detector, gate, move_finder = components["detector"], components["gate"], components["move_finder"]
+    snapshot, spectator = components["snapshot"], components["spectator"]
+
+    archiver = None
+    if archive_directory is not None:
+        from Utilities.Frame_Archiver import frameArchiver
+        archiver = frameArchiver(archive_directory)
+
+    link = None
+    if serial_port is not None:
+        from Utilities.Serial_Link import serialLink
+        link = serialLink(serial_port)
+
+    frames = asyncio.Queue(maxsize=2)
+    boards = asyncio.Queue(maxsize=1)
+    bot_moves = asyncio.Queue(maxsize=1)
+
+    tasks = [
+        asyncio.create_task(capture_frames(picTaker, gate, archiver, frames), name="capture"),
+        asyncio.create_task(detect_boards(detector, gate, logObject, frames, boards), name="detect"),
+        asyncio.create_task(execute_moves(bot_moves, plan_sender(link) if link is not None else None), name="robot"),
+    ]
+
+    play = asyncio.create_task(play_moves(game, move_finder, logObject, boards, bot_moves, detector, planner,
+                                          spectator, snapshot, gate), name="play")
+    tasks.append(play)
+
+    try:
+        # The other stages run until they are cancelled: if one of them ends first, it failed
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        if play not in done:
+            stage = done.pop()
+            stage.result()  # Raises the error of the stage
+            raise RuntimeError(f"The {stage.get_name()} stage stopped")
+        play.result()
+        if snapshot is not None:
+            snapshot.discard()  # The game is over
+        return 0
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if spectator is not None:
+            spectator.close()
+        game.endGame()
+        picTaker.close()
+        if archiver is not None:
+            archiver.close()
+        if cache is not None:
+            cache.close()
+        if link is not None:
+            link.close()
+        metrics.stop()
+        logObject.close()
 
 if __name__ == "__main__":
-   main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="RoboChess game orchestrator")
+    parser.add_argument("--archive", metavar="DIRECTORY", help="save every captured frame to this directory")
+    parser.add_argument("--ponder", action="store_true", help="let the engine think on the player's time")
+    parser.add_argument("--cache", metavar="PATH", help="persistent cache of the bot moves")
+    parser.add_argument("--book", metavar="PATH", help="Polyglot opening book for the bot")
+    parser.add_argument("--metrics", metavar="SECONDS", type=float, help="send timing metrics over UDP at this interval")
+    parser.add_argument("--structured-log", action="store_true", help="send batched JSON log records instead of text messages")
+    parser.add_argument("--pyramid", metavar="SCALE", type=float, default=1.0, help="search the board grid on a frame downscaled by SCALE, e.g. 0.25")
+    parser.add_argument("--serial", metavar="DEVICE", help="send the planned bot moves to the gantry firmware on this serial device")
+    parser.add_argument("--spectator", metavar="RATE", type=float, help="stream a live engine evaluation over UDP, at most RATE updates per second")
+    parser.add_argument("--spectator-threads", metavar="N", type=int, default=1, help="threads of the spectator engine")
+    parser.add_argument("--snapshot", metavar="PATH", default="robochess_snapshot.npz", help="crash-safe snapshot of the game, written after every bot move")
+    parser.add_argument("--resume", action="store_true", help="resume the game of the snapshot after a crash or restart")
+    parser.add_argument("--sync", action="store_true", help="run the serial game loop instead of the asynchronous one")
+    args = parser.parse_args()
+
+    if args.sync:
+        sys.exit(main(args.archive, args.ponder, args.cache, args.book, args.metrics, args.structured_log, args.pyramid,
+                      spectator_rate=args.spectator, spectator_threads=args.spectator_threads,
+                      snapshot_path=args.snapshot, resume=args.resume))
+    sys.exit(asyncio.run(main_async(args.archive, args.ponder, args.cache, args.book, args.metrics, args.structured_log, args.pyramid, args.serial,
+                                    args.spectator, args.spectator_threads, args.snapshot, args.resume)))